@@ -0,0 +1,159 @@
+import threading
+from typing import Hashable
+
+import pandas as pd
+from loguru import logger
+
+from data import to_native
+
+# Grouping of the claim aggregates: name -> column of the claims, joined with
+# their account for State. Day groups on the calendar date of CreatedDate.
+GROUP_BY: dict[str, str] = {
+    "account": "AccountId",
+    "policy": "HAN",
+    "status": "Status",
+    "state": "State",
+    "day": "CreatedDate",
+}
+
+
+def aggregate_claims(tables: dict[str, pd.DataFrame], group_by: str) -> list[dict]:
+    """Counts the claims and sums their BillAmount per group, in one vectorized groupby.
+    Params:
+        tables(dict[str, pd.DataFrame]): Sheets to read, normally a snapshot.
+        group_by(str): One of `GROUP_BY`.
+    Returns:
+        list[dict]: One {"key", "claims", "total", "mean"} row per group, by key.
+    """
+    claims_df: pd.DataFrame = tables["Claims"]
+    if group_by == "state":
+        # Plain objects on both sides, mapping a categorical through a
+        # categorical Series pairs their codes rather than their values.
+        states: pd.Series = (
+            tables["Accounts"].set_index("AccountId")["State"].astype(object)
+        )
+        keys: pd.Series = claims_df["AccountId"].astype(object).map(states)
+    elif group_by == "day":
+        keys = pd.to_datetime(
+            claims_df["CreatedDate"], utc=True, format="ISO8601", errors="coerce"
+        ).dt.strftime("%Y-%m-%d")
+    else:
+        keys = claims_df[GROUP_BY[group_by]]
+
+    amounts: pd.Series = pd.to_numeric(claims_df["BillAmount"], errors="coerce")
+    grouped_df: pd.DataFrame = (
+        amounts.groupby(keys.astype(object).rename("key"), dropna=False)
+        .agg(claims="size", total="sum", mean="mean")
+        .reset_index()
+    )
+    grouped_df = grouped_df.astype(object).where(grouped_df.notna(), None)
+    return grouped_df.to_dict(orient="records")
+
+
+class ClaimRollups:
+    def __init__(self):
+        """BillAmount totals of the claims per account and per policy (HAN).
+
+        `build` computes them once from the Claims sheet and afterwards, as a
+        listener, every claim insert, update and delete is folded in by
+        subtracting the old row and adding the new one, so reading a rollup
+        never touches the sheet.
+        """
+        self._accounts: dict[Hashable, dict] = {}
+        self._policies: dict[Hashable, dict] = {}
+        self._lock = threading.Lock()
+
+    def build(self, tables: dict[str, pd.DataFrame]) -> None:
+        claims_df: pd.DataFrame = tables["Claims"]
+        amounts: pd.Series = pd.to_numeric(claims_df["BillAmount"], errors="coerce")
+        with self._lock:
+            self._accounts = self._rollup(claims_df["AccountId"], claims_df, amounts)
+            self._policies = self._rollup(claims_df["HAN"], claims_df, amounts)
+        logger.info(
+            f"Claim rollups built for {len(self._accounts)} accounts "
+            f"and {len(self._policies)} policies."
+        )
+
+    def publish(self, version: int) -> None:
+        pass
+
+    def apply(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> None:
+        if sheet_name != "Claims":
+            return
+        with self._lock:
+            if old_row is not None:
+                self._add(self._accounts, old_row["AccountId"], old_row, -1)
+                self._add(self._policies, old_row["HAN"], old_row, -1)
+            if new_row is not None:
+                self._add(self._accounts, new_row["AccountId"], new_row, 1)
+                self._add(self._policies, new_row["HAN"], new_row, 1)
+
+    def account(self, account_id: Hashable) -> dict:
+        """Returns {"claims", "total", "by_status"} of the claims of an account."""
+        with self._lock:
+            return self._copy(self._accounts.get(account_id))
+
+    def policy(self, han: Hashable) -> dict:
+        """Returns {"claims", "total", "by_status"} of the claims of a policy."""
+        with self._lock:
+            return self._copy(self._policies.get(han))
+
+    @staticmethod
+    def _rollup(
+        keys: pd.Series, claims_df: pd.DataFrame, amounts: pd.Series
+    ) -> dict[Hashable, dict]:
+        frame: pd.DataFrame = pd.DataFrame(
+            {
+                "key": keys.astype(object),
+                "status": claims_df["Status"].astype(object),
+                "amount": amounts.fillna(0),
+            }
+        )
+        grouped_df: pd.DataFrame = (
+            frame.groupby(["key", "status"], dropna=False)["amount"]
+            .agg(claims="size", total="sum")
+            .reset_index()
+        )
+        rollups: dict[Hashable, dict] = {}
+        for key, status, claims, total in grouped_df.itertuples(index=False):
+            rollup: dict = rollups.setdefault(key, ClaimRollups._empty())
+            rollup["claims"] += to_native(claims)
+            rollup["total"] += to_native(total)
+            rollup["by_status"][status] = {
+                "claims": to_native(claims),
+                "total": to_native(total),
+            }
+        return rollups
+
+    @staticmethod
+    def _add(rollups: dict[Hashable, dict], key: Hashable, row: dict, sign: int):
+        amount = to_native(row["BillAmount"])
+        amount = sign * (0 if amount is None else amount)
+        rollup: dict = rollups.setdefault(key, ClaimRollups._empty())
+        status: dict = rollup["by_status"].setdefault(
+            row["Status"], {"claims": 0, "total": 0}
+        )
+        for totals in [rollup, status]:
+            totals["claims"] += sign
+            totals["total"] += amount
+        if status["claims"] == 0:
+            del rollup["by_status"][row["Status"]]
+        if rollup["claims"] == 0:
+            del rollups[key]
+
+    @staticmethod
+    def _empty() -> dict:
+        return {"claims": 0, "total": 0, "by_status": {}}
+
+    @staticmethod
+    def _copy(rollup: dict | None) -> dict:
+        if rollup is None:
+            return ClaimRollups._empty()
+        return {
+            **rollup,
+            "by_status": {
+                status: dict(totals) for status, totals in rollup["by_status"].items()
+            },
+        }
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+import pandas as pd
+
+from config import CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, CACHE_NEGATIVE_TTL_SECONDS
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        negative_ttl: float = CACHE_NEGATIVE_TTL_SECONDS,
+    ):
+        """LRU cache of encoded account lookups, kept exact by following the writes.
+
+        Entries are evicted least recently used first once there are more than
+        `max_entries` of them or they hold more than `max_bytes`. As a listener
+        it drops the entry of every account an insert, update or delete
+        touches, directly by AccountId for accounts and claims and through the
+        HANs of the cached rows for policies. Unknown accounts are cached as
+        None for `negative_ttl` seconds, or until the account is created.
+
+        Responses are keyed by the snapshot version they were read from, and
+        only cached if no newer version was published since, see `put`.
+        """
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.negative_ttl: float = negative_ttl
+        # account id -> (encoded rows or None, HANs of the rows, expiry or None)
+        self._entries: OrderedDict[
+            Hashable, tuple[bytes | None, frozenset, float | None]
+        ] = OrderedDict()
+        self._accounts_by_han: dict[Hashable, set[Hashable]] = {}
+        self._bytes: int = 0
+        self._version: int = 0
+        self._stats: dict[str, int] = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+        self._lock = threading.Lock()
+
+    def get(self, account_id: Hashable) -> tuple[bool, bytes | None]:
+        """Returns whether the account is cached, and its cached response."""
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if (
+                entry is not None
+                and entry[2] is not None
+                and entry[2] < time.monotonic()
+            ):
+                self._remove(account_id)
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(account_id)
+            self._stats["hits" if entry[0] is not None else "negative_hits"] += 1
+            return True, entry[0]
+
+    def put(
+        self,
+        account_id: Hashable,
+        content: bytes | None,
+        hans: set[Hashable],
+        version: int | None = None,
+    ) -> None:
+        """Caches the response of an account, None if it does not exist.
+
+        `version` is the snapshot version `content` was read from. If a newer
+        one was published since, `content` may be stale and is not cached. A
+        response of the latest version is, and dropped by its changes if it
+        is read before they come in.
+        """
+        if self.max_entries <= 0:
+            return
+        size: int = len(content) if content is not None else 0
+        if size > self.max_bytes:
+            return
+        expiry: float | None = (
+            time.monotonic() + self.negative_ttl if content is None else None
+        )
+        with self._lock:
+            if version is not None and version < self._version:
+                return
+            self._remove(account_id)
+            self._entries[account_id] = (content, frozenset(hans), expiry)
+            self._bytes += size
+            for han in hans:
+                self._accounts_by_han.setdefault(han, set()).add(account_id)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self, account_id: Hashable) -> None:
+        with self._lock:
+            if self._remove(account_id):
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._accounts_by_han.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hit, miss, eviction and invalidation counters and the current size."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes}
+
+    def build(self, tables: dict[str, pd.DataFrame]) -> None:
+        self.clear()
+
+    def publish(self, version: int) -> None:
+        """Called before the changes of a new snapshot version come in."""
+        with self._lock:
+            self._version = version
+
+    def apply(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> None:
+        """Drops the cached responses an insert, update or delete makes stale."""
+        for row in (old_row, new_row):
+            if row is None:
+                continue
+            match sheet_name:
+                case "Accounts" | "Claims":
+                    self.invalidate(row["AccountId"])
+                case "Policies":
+                    with self._lock:
+                        account_ids: set = set(
+                            self._accounts_by_han.get(row["HAN"], ())
+                        )
+                    for account_id in account_ids:
+                        self.invalidate(account_id)
+
+    def _remove(self, account_id: Hashable) -> bool:
+        entry = self._entries.pop(account_id, None)
+        if entry is None:
+            return False
+        content, hans, _ = entry
+        self._bytes -= len(content) if content is not None else 0
+        for han in hans:
+            account_ids: set | None = self._accounts_by_han.get(han)
+            if account_ids is not None:
+                account_ids.discard(account_id)
+                if not account_ids:
+                    del self._accounts_by_han[han]
+        return True
@@ -0,0 +1,374 @@
+import asyncio
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+
+import pandas as pd
+from loguru import logger
+
+from config import (
+    CLUSTER_AUTHKEY,
+    CLUSTER_HOST,
+    CLUSTER_PORT,
+    REPLICA_PUBLISH_CHANGES,
+    REPLICA_PUBLISH_MS,
+    SNAPSHOT_INTERVAL_SECONDS,
+)
+from path import SNAPSHOT_DIR
+from storage import ArrowBackend
+from store import TableStore
+
+MANIFEST_NAME: str = "manifest.json"
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(True)
+
+
+class ReplicaBackend(ArrowBackend):
+    """Reads the tables from the Arrow snapshot published by the owner process
+    through a read only memory map. Replicas never write anything back."""
+
+    def save(self, data: dict[str, pd.DataFrame]) -> dict:
+        return {"status": 200, "message": "Replicas do not save"}
+
+    def replace(self, data: dict[str, pd.DataFrame]) -> dict:
+        return self.save(data)
+
+
+class ClusterOwner:
+    def __init__(
+        self,
+        store: TableStore,
+        address: tuple[str, int] = (CLUSTER_HOST, CLUSTER_PORT),
+        authkey: bytes = CLUSTER_AUTHKEY,
+        folder: Path = SNAPSHOT_DIR,
+        interval: float = SNAPSHOT_INTERVAL_SECONDS,
+    ):
+        """Shares the tables of the owner process with the worker processes.
+
+        Every `interval` seconds the latest store snapshot is written as Arrow
+        files into `folder`, for workers to memory map when they join. As a
+        listener it also streams every change, numbered with
+        `TableStore.sequence`, to the connected workers, which apply them to
+        their replica. A joining worker gets the latest snapshot and then
+        every change made after it. A snapshot is only deleted once it is
+        neither the latest nor one a joining worker has yet to report loaded.
+        """
+        self.store: TableStore = store
+        self.address: tuple[str, int] = address
+        self.authkey: bytes = authkey
+        self.folder: Path = folder
+        self.interval: float = interval
+        self._manifest: dict | None = None
+        self._backlog: list[tuple] = []
+        # Sequence each joining worker has been sent up to, see `_catch_up`.
+        self._joining: dict[int, int] = {}
+        # Snapshot folder each joining worker is loading, until it reports loaded.
+        self._loading: dict[int, str] = {}
+        self._outbox: queue.Queue = queue.Queue()
+        self._workers: list[Connection] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._listener: Listener | None = None
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Writes a first snapshot, then starts accepting workers."""
+        if not self.authkey:
+            raise ValueError("The cluster owner needs an authkey, set CLUSTER_AUTHKEY.")
+        self._stopped.clear()
+        self.write_snapshot()
+        self._listener = Listener(self.address, authkey=self.authkey)
+        for target, name in [
+            (self._accept, "cluster-accept"),
+            (self._broadcast, "cluster-broadcast"),
+            (self._run, "cluster-snapshot"),
+        ]:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Cluster owner listening on {self.address}.")
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._outbox.put(None)
+        if self._listener is not None:
+            self._listener.close()
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers.clear()
+
+    def build(self, tables: dict[str, pd.DataFrame]) -> None:
+        pass
+
+    def publish(self, version: int) -> None:
+        pass
+
+    def apply(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> None:
+        change: tuple = (self.store.sequence, sheet_name, old_row, new_row)
+        with self._lock:
+            self._backlog.append(change)
+        self._outbox.put(change)
+
+    def write_snapshot(self) -> None:
+        """Writes the latest store snapshot if it is newer than the last one written."""
+        snapshot = self.store.snapshot()
+        if self._manifest is not None and self._manifest["version"] == snapshot.version:
+            return
+        name: str = f"v{snapshot.version:08d}"
+        ArrowBackend(self.folder / name).save(dict(snapshot.tables))
+        manifest: dict = {
+            "version": snapshot.version,
+            "sequence": snapshot.sequence,
+            "folder": name,
+        }
+        temp_path: Path = self.folder / f"{MANIFEST_NAME}.tmp"
+        temp_path.write_text(json.dumps(manifest))
+        os.replace(temp_path, self.folder / MANIFEST_NAME)
+
+        with self._lock:
+            self._manifest = manifest
+            # Joining workers may still need changes older than this snapshot.
+            floor: int = min([snapshot.sequence, *self._joining.values()])
+            self._backlog = [change for change in self._backlog if change[0] > floor]
+            keep: set[str] = {name, *self._loading.values()}
+        # A loaded replica maps the files, which outlive their deletion.
+        for folder in self.folder.glob("v*"):
+            if folder.name not in keep:
+                shutil.rmtree(folder, ignore_errors=True)
+
+    def _accept(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                worker: Connection = self._listener.accept()
+            except OSError:
+                if not self._stopped.is_set():
+                    logger.exception("Accepting a worker failed.")
+                continue
+            # Joins run side by side, a worker loading a large snapshot holds up no other.
+            threading.Thread(
+                target=self._join, args=(worker,), name="cluster-join", daemon=True
+            ).start()
+
+    def _join(self, worker: Connection) -> None:
+        try:
+            manifest: dict = self._catch_up(worker)
+            # ("loaded", version) once the worker no longer reads the snapshot.
+            worker.recv()
+        except (EOFError, OSError) as e:
+            logger.warning(f"Worker left while joining: {e}")
+            return
+        finally:
+            with self._lock:
+                self._joining.pop(id(worker), None)
+                self._loading.pop(id(worker), None)
+        logger.info(f"Worker joined at version {manifest['version']}.")
+
+    def _catch_up(self, worker: Connection) -> dict:
+        """Sends a joining worker the latest snapshot and the changes made after
+        it, then adds it to the workers the broadcast reaches.
+
+        The changes are sent without holding the lock, so `apply` and with it
+        the store's writer never wait on a slow worker. Each round sends what
+        the backlog gained during the previous one. The worker is added in the
+        same locked step that finds nothing left to send, so every later
+        change reaches it through the broadcast. The broadcast may repeat a
+        change already sent from the backlog, which the worker skips by its
+        sequence number.
+
+        The snapshot is kept until the worker reports it loaded, see `_join`.
+        """
+        with self._lock:
+            manifest: dict = self._manifest
+            sent: int = manifest["sequence"]
+            self._joining[id(worker)] = sent
+            self._loading[id(worker)] = manifest["folder"]
+        worker.send(("snapshot", manifest))
+        while True:
+            with self._lock:
+                changes: list[tuple] = [
+                    change for change in self._backlog if change[0] > sent
+                ]
+                if not changes:
+                    self._workers.append(worker)
+                    del self._joining[id(worker)]
+                    return manifest
+            for change in changes:
+                worker.send(("change", change))
+            sent = changes[-1][0]
+            with self._lock:
+                self._joining[id(worker)] = sent
+
+    def _broadcast(self) -> None:
+        while True:
+            change: tuple | None = self._outbox.get()
+            if change is None:
+                return
+            with self._lock:
+                workers: list[Connection] = list(self._workers)
+            for worker in workers:
+                try:
+                    worker.send(("change", change))
+                except OSError:
+                    logger.warning("Worker disconnected.")
+                    with self._lock:
+                        if worker in self._workers:
+                            self._workers.remove(worker)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(timeout=self.interval):
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.error(f"Writing the shared snapshot failed: {e}")
+
+
+class ClusterWorker:
+    def __init__(
+        self,
+        store: TableStore,
+        address: tuple[str, int] = (CLUSTER_HOST, CLUSTER_PORT),
+        authkey: bytes = CLUSTER_AUTHKEY,
+        folder: Path = SNAPSHOT_DIR,
+        publish_changes: int = REPLICA_PUBLISH_CHANGES,
+        publish_ms: float = REPLICA_PUBLISH_MS,
+    ):
+        """Keeps a read only replica of the owner's tables in a worker process.
+
+        `store` must use a `ReplicaBackend`. On `start` it loads the snapshot
+        the owner points it to and then applies the owner's stream of changes,
+        publishing a new store snapshot whenever the stream goes idle, and
+        every `publish_changes` changes or `publish_ms` milliseconds while it
+        does not, so a steady stream cannot hold back reads. If the owner goes
+        away the worker keeps serving what it has and reloads once the owner
+        is back.
+        """
+        self.store: TableStore = store
+        self.address: tuple[str, int] = address
+        self.authkey: bytes = authkey
+        self.folder: Path = folder
+        self.publish_changes: int = publish_changes
+        self.publish_ms: float = publish_ms
+        self._connection: Connection | None = None
+        self._applied: int = 0
+        self._published: int = 0
+        self._caught_up = threading.Condition()
+        # (sequence, loop, future) of every `wait` in progress.
+        self._waiters: list[tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._stopped = threading.Event()
+        self._receiver: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Loads the replica, then follows the owner in the background."""
+        if not self.authkey:
+            raise ValueError("A cluster worker needs an authkey, set CLUSTER_AUTHKEY.")
+        self._stopped.clear()
+        self._connect()
+        self._receiver = threading.Thread(
+            target=self._run, name="cluster-receiver", daemon=True
+        )
+        self._receiver.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._connection is not None:
+            self._connection.close()
+
+    def wait_for(self, sequence: int, timeout: float) -> bool:
+        """Waits until the replica has applied the owner's change number `sequence`."""
+        with self._caught_up:
+            return self._caught_up.wait_for(
+                lambda: self._published >= sequence, timeout=timeout
+            )
+
+    async def wait(self, sequence: int, timeout: float) -> bool:
+        """Same as `wait_for`, without holding a thread while it waits."""
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        waiter: tuple = (sequence, loop, future)
+        with self._caught_up:
+            if self._published >= sequence:
+                return True
+            self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._caught_up:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _connect(self) -> None:
+        connection: Connection = Client(self.address, authkey=self.authkey)
+        kind, manifest = connection.recv()
+        self.store.backend.folder = self.folder / manifest["folder"]
+        self.store.load()
+        # The owner keeps the snapshot folder until it hears this.
+        connection.send(("loaded", manifest["version"]))
+        with self._caught_up:
+            self._applied = self._published = manifest["sequence"]
+            self._wake_up()
+        self._connection = connection
+        logger.info(f"Replica loaded at version {manifest['version']}.")
+
+    def _run(self) -> None:
+        unpublished: int = 0
+        published_at: float = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                kind, change = self._connection.recv()
+                sequence, sheet_name, old_row, new_row = change
+                if sequence > self._applied:
+                    result: dict = self.store.apply_change(sheet_name, old_row, new_row)
+                    if result["status"] != 200:
+                        logger.error(
+                            f"Replica could not apply change {sequence}: {result['message']}"
+                        )
+                    self._applied = sequence
+                    unpublished += 1
+                if (
+                    unpublished >= self.publish_changes
+                    or (time.monotonic() - published_at) * 1000 >= self.publish_ms
+                    or not self._connection.poll()
+                ):
+                    self._publish()
+                    unpublished = 0
+                    published_at = time.monotonic()
+            except (EOFError, OSError):
+                if self._stopped.is_set():
+                    return
+                logger.warning("Lost the owner, reconnecting.")
+                self._reconnect()
+
+    def _publish(self) -> None:
+        self.store.publish()
+        with self._caught_up:
+            self._published = self._applied
+            self._wake_up()
+
+    def _wake_up(self) -> None:
+        """Wakes the waits the published changes satisfy, under `_caught_up`."""
+        self._caught_up.notify_all()
+        for waiter in [w for w in self._waiters if w[0] <= self._published]:
+            self._waiters.remove(waiter)
+            _, loop, future = waiter
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def _reconnect(self) -> None:
+        while not self._stopped.wait(timeout=1):
+            try:
+                self._connect()
+                return
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"Owner not reachable yet: {e}")
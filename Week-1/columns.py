@@ -0,0 +1,94 @@
+import pandas as pd
+
+from table import intern_strings, to_category
+
+# Non unique columns rows are looked up by.
+SECONDARY_KEYS: dict[str, list[str]] = {
+    "Accounts": [],
+    "Claims": ["AccountId"],
+    "Policies": ["Policy Name"],
+}
+# Repetitive string columns, kept dictionary encoded as pandas categoricals.
+CATEGORICAL_COLUMNS: dict[str, list[str]] = {
+    "Accounts": ["City", "State"],
+    "Claims": ["HAN", "Status", "AccountId"],
+    "Policies": [],
+}
+# Unique string ids. Their values are interned, so an id repeated as a foreign
+# key or category elsewhere is the same string object.
+INTERNED_COLUMNS: dict[str, list[str]] = {
+    "Accounts": ["AccountId"],
+    "Claims": ["Id"],
+    "Policies": ["HAN"],
+}
+# Columns held as native timestamps, naive in UTC.
+TIMESTAMP_COLUMNS: dict[str, list[str]] = {
+    "Accounts": [],
+    "Claims": ["CreatedDate"],
+    "Policies": [],
+}
+# Timestamp column each sheet is kept sorted by, with the columns whose groups
+# get their own time order too (None for the whole sheet).
+TIME_KEYS: dict[str, tuple[str, list[str | None]]] = {
+    "Claims": ("CreatedDate", [None, "AccountId"]),
+}
+
+
+def to_timestamps(values: pd.Series) -> pd.Series:
+    """Parses ISO 8601 times, or converts datetimes, to naive UTC timestamps.
+    Times without an offset are taken as UTC, unreadable ones become NaT."""
+    return pd.to_datetime(
+        values, utc=True, format="ISO8601", errors="coerce"
+    ).dt.tz_localize(None)
+
+
+def to_timestamp(value) -> pd.Timestamp | None:
+    """Same as `to_timestamps` for one value, None if it is missing or unreadable."""
+    timestamp = pd.to_datetime(value, utc=True, format="ISO8601", errors="coerce")
+    return None if pd.isna(timestamp) else timestamp.tz_localize(None)
+
+
+def encode_columns(sheet_name: str, sheet_df: pd.DataFrame) -> pd.DataFrame:
+    """Parses the timestamps, interns the ids and dictionary encodes the
+    repetitive columns of a sheet. Columns already in shape are kept as
+    they are, so a memory mapped sheet stays mapped."""
+    columns: dict[str, pd.Series] = dict(sheet_df.items())
+    for column in TIMESTAMP_COLUMNS[sheet_name]:
+        if columns[column].dtype != "datetime64[ns]":
+            columns[column] = to_timestamps(columns[column])
+    for column in INTERNED_COLUMNS[sheet_name]:
+        columns[column] = pd.Series(
+            intern_strings(columns[column].tolist()),
+            index=columns[column].index,
+            dtype=object,
+        )
+    for column in CATEGORICAL_COLUMNS[sheet_name]:
+        columns[column] = to_category(columns[column])
+    encoded_df: pd.DataFrame = pd.DataFrame(columns, copy=False)
+    encoded_df.index = pd.RangeIndex(len(encoded_df))
+    return encoded_df
+
+
+def encode_row(sheet_name: str, row: dict) -> dict:
+    """Parses the timestamps and interns the ids of one new row. Its
+    categorical columns are encoded by the table it goes into."""
+    row = dict(row)
+    for column in TIMESTAMP_COLUMNS[sheet_name]:
+        row[column] = to_timestamp(row[column])
+    for column in INTERNED_COLUMNS[sheet_name]:
+        row[column] = intern_strings([row[column]])[0]
+    return row
+
+
+def encode_rows(sheet_name: str, rows_df: pd.DataFrame) -> pd.DataFrame:
+    """Same as `encode_row` for a frame of new rows, keeping its index."""
+    rows_df = rows_df.copy()
+    for column in TIMESTAMP_COLUMNS[sheet_name]:
+        rows_df[column] = to_timestamps(rows_df[column])
+    for column in INTERNED_COLUMNS[sheet_name]:
+        rows_df[column] = pd.Series(
+            intern_strings(rows_df[column].tolist()),
+            index=rows_df.index,
+            dtype=object,
+        )
+    return rows_df
@@ -0,0 +1,90 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Seconds between two background flushes of the in-memory tables to disk.
+FLUSH_INTERVAL_SECONDS: float = float(os.getenv("FLUSH_INTERVAL_SECONDS", "5"))
+# Number of pending writes that triggers a flush before the interval elapses.
+FLUSH_BATCH_SIZE: int = int(os.getenv("FLUSH_BATCH_SIZE", "100"))
+# Where the tables are persisted: "xlsx" (cleaned.xlsx), "parquet", "arrow" or "mysql".
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "xlsx")
+
+# MySQL settings, used when STORAGE_BACKEND is "mysql".
+MYSQL_CONFIG: dict = {
+    "host": os.getenv("HOST", "localhost"),
+    "user": os.getenv("MYSQL_USERNAME"),
+    "password": os.getenv("MYSQL_PASSWORD"),
+    "database": os.getenv("MYSQL_DATABASE", "bfhl"),
+}
+MYSQL_POOL_SIZE: int = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+
+# Threads that run blocking storage and log calls off the event loop.
+IO_MAX_WORKERS: int = int(os.getenv("IO_MAX_WORKERS", "4"))
+# Calls allowed to wait for or run on those threads before requests get a 503.
+IO_MAX_PENDING: int = int(os.getenv("IO_MAX_PENDING", "64"))
+
+# Most mutations the writer applies before committing them together.
+COMMIT_MAX_BATCH: int = int(os.getenv("COMMIT_MAX_BATCH", "256"))
+# Mutations allowed to wait for the writer before requests get a 503.
+COMMIT_MAX_PENDING: int = int(os.getenv("COMMIT_MAX_PENDING", "1024"))
+# Answer writes only once their batch is saved. "false" falls back to write-behind.
+COMMIT_DURABLE: bool = os.getenv("COMMIT_DURABLE", "true").lower() == "true"
+
+# Append every change to a write-ahead log and replay it on startup.
+WAL_ENABLED: bool = os.getenv("WAL_ENABLED", "true").lower() == "true"
+# "always" fsyncs every record, "batch" once per commit group, "never" leaves it to the OS.
+WAL_FSYNC: str = os.getenv("WAL_FSYNC", "batch")
+
+# Buffered audit rows that trigger a write to the log segments.
+AUDIT_FLUSH_SIZE: int = int(os.getenv("AUDIT_FLUSH_SIZE", "500"))
+# Seconds between two writes of the buffered audit rows.
+AUDIT_FLUSH_INTERVAL_SECONDS: float = float(
+    os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "2")
+)
+
+# Rows per in-memory chunk of a table. A change copies its chunk once per published version.
+TABLE_CHUNK_ROWS: int = int(os.getenv("TABLE_CHUNK_ROWS", "16384"))
+
+# Most records accepted by one bulk insert request.
+BULK_MAX_RECORDS: int = int(os.getenv("BULK_MAX_RECORDS", "100000"))
+
+# Rows per page of the list endpoints when no limit is given, and the largest limit allowed.
+PAGE_SIZE: int = int(os.getenv("PAGE_SIZE", "100"))
+PAGE_MAX_SIZE: int = int(os.getenv("PAGE_MAX_SIZE", "1000"))
+# Rows read from the store and written out at a time by the export endpoints.
+EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+# Bounds of the GET /account/{account_id} response cache. 0 entries disables it.
+CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Seconds an unknown account id is remembered as missing.
+CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("CACHE_NEGATIVE_TTL_SECONDS", "5"))
+
+# Account search: most indexed words a prefix or misspelled query word expands
+# to, and the least trigram similarity (0 to 1) of a misspelled match.
+SEARCH_MAX_EXPANSIONS: int = int(os.getenv("SEARCH_MAX_EXPANSIONS", "50"))
+SEARCH_MIN_SIMILARITY: float = float(os.getenv("SEARCH_MIN_SIMILARITY", "0.4"))
+# Most accounts one search reads from the postings of the words it matches.
+SEARCH_MAX_POSTINGS: int = int(os.getenv("SEARCH_MAX_POSTINGS", "10000"))
+
+# "single" runs everything in one process. For several processes start one "owner",
+# which holds the tables and applies every write, and any number of "worker"s,
+# which serve reads from a replica and forward writes to the owner.
+DEPLOY_MODE: str = os.getenv("DEPLOY_MODE", "single")
+# HTTP address of the owner, used by the workers to forward writes.
+OWNER_URL: str = os.getenv("OWNER_URL", "http://127.0.0.1:8001")
+# Address and key of the owner's change stream the workers subscribe to. The key
+# has no default, the owner and the workers refuse to start without one.
+CLUSTER_HOST: str = os.getenv("CLUSTER_HOST", "127.0.0.1")
+CLUSTER_PORT: int = int(os.getenv("CLUSTER_PORT", "6001"))
+CLUSTER_AUTHKEY: bytes = os.getenv("CLUSTER_AUTHKEY", "").encode()
+# Seconds between two Arrow snapshots written by the owner for joining workers.
+SNAPSHOT_INTERVAL_SECONDS: float = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "5"))
+# A worker publishes the changes it applied once the owner's stream goes idle, or
+# after this many changes or milliseconds while it stays busy.
+REPLICA_PUBLISH_CHANGES: int = int(os.getenv("REPLICA_PUBLISH_CHANGES", "1000"))
+REPLICA_PUBLISH_MS: float = float(os.getenv("REPLICA_PUBLISH_MS", "50"))
+# Seconds a worker waits for its replica to catch up with a write it forwarded.
+REPLICA_WAIT_SECONDS: float = float(os.getenv("REPLICA_WAIT_SECONDS", "2"))
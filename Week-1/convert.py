@@ -0,0 +1,35 @@
+import argparse
+
+import pandas as pd
+from loguru import logger
+
+from data import SHEETS
+from storage import StorageBackend, StorageBackendFactory
+
+
+def convert(source: str = "xlsx", target: str = "parquet") -> dict:
+    """Copies every table from one storage backend to another."""
+    source_backend: StorageBackend = StorageBackendFactory.get_backend(source)
+    target_backend: StorageBackend = StorageBackendFactory.get_backend(target)
+
+    tables: dict[str, pd.DataFrame] = {
+        sheet: source_backend.load(sheet) for sheet in SHEETS
+    }
+    result: dict = target_backend.replace(tables)
+    if result["status"] == 200:
+        logger.info(f"Converted {SHEETS} from {source} to {target}.")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert the cleaned tables between storage backends."
+    )
+    parser.add_argument(
+        "--source", default="xlsx", choices=["xlsx", "parquet", "arrow", "mysql"]
+    )
+    parser.add_argument(
+        "--target", default="parquet", choices=["xlsx", "parquet", "arrow", "mysql"]
+    )
+    args = parser.parse_args()
+    print(convert(source=args.source, target=args.target))
@@ -0,0 +1,56 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from loguru import logger
+
+from config import IO_MAX_PENDING, IO_MAX_WORKERS
+
+
+class ExecutorSaturated(Exception):
+    """Raised when too many calls are already waiting for the I/O executor."""
+
+
+class IOExecutor:
+    def __init__(
+        self, max_workers: int = IO_MAX_WORKERS, max_pending: int = IO_MAX_PENDING
+    ):
+        """Runs blocking storage calls on a dedicated, bounded thread pool.
+
+        At most `max_pending` calls may be queued or running at once. Past that
+        `run` fails fast with ExecutorSaturated instead of letting the queue,
+        and every caller's latency, grow without bound.
+        """
+        self.max_workers: int = max_workers
+        self.max_pending: int = max_pending
+        self._pending: int = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="io"
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Awaits `func(*args, **kwargs)` run on the I/O threads."""
+        # Only ever touched from the event loop thread, so no lock is needed.
+        if self._pending >= self.max_pending:
+            logger.warning(
+                f"I/O executor saturated with {self._pending} pending calls."
+            )
+            raise ExecutorSaturated(
+                f"Server busy: {self._pending} storage calls pending. Try again later."
+            )
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,112 @@
+import csv
+import datetime
+import io
+import json
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from storage import import_pyarrow
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Media type of every export format.
+EXPORT_FORMATS: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def dumps(content: Any) -> bytes:
+    """Encodes to JSON bytes, with numpy scalars as plain numbers, NaN as null
+    and timestamps in ISO 8601. Uses orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(
+            content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY
+        )
+    # Rows from the store hold None rather than NaN, which json would write as NaN.
+    return json.dumps(content, default=_default).encode()
+
+
+def stream_rows(
+    chunks: Iterable[list[dict]], export_format: str, dtypes: dict[str, str]
+) -> Iterator[bytes]:
+    """Encodes chunks of rows as they come, so the export is never held in memory whole.
+    Params:
+        chunks(Iterable[list[dict]]): Rows to write, see `TableStore.iter_rows`.
+        export_format(str): One of `EXPORT_FORMATS`.
+        dtypes(dict[str, str]): Column to pandas dtype mapping, gives the
+            column order and the Arrow schema.
+    Returns:
+        Iterator[bytes]: The encoded output, one piece per chunk.
+    """
+    match export_format:
+        case "ndjson":
+            return _ndjson(chunks)
+        case "csv":
+            return _csv(chunks, list(dtypes.keys()))
+        case "arrow":
+            return _arrow(chunks, dtypes)
+        case _:
+            raise ValueError(f"Export format {export_format} not supported.")
+
+
+def _ndjson(chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _default(value: Any) -> Any:
+    if value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv(chunks: Iterable[list[dict]], columns: list[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _arrow(chunks: Iterable[list[dict]], dtypes: dict[str, str]) -> Iterator[bytes]:
+    pa = import_pyarrow()
+    schema = pa.schema(
+        [(column, _arrow_type(pa, dtype)) for column, dtype in dtypes.items()]
+    )
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    # Closing the writer adds the end of stream marker.
+    yield buffer.getvalue()
+
+
+def _arrow_type(pa, dtype: str):
+    if dtype.startswith("int"):
+        return pa.int64()
+    if dtype.startswith("float"):
+        return pa.float64()
+    if dtype == "bool":
+        return pa.bool_()
+    if dtype.startswith("datetime64"):
+        return pa.timestamp("ns")
+    return pa.string()
@@ -0,0 +1,375 @@
+import bisect
+import copy
+from itertools import chain
+from typing import Any, Hashable, Iterable, Iterator
+
+import pandas as pd
+
+# Number of dicts a `VersionedMap` spreads its keys over.
+MAP_SHARDS: int = 4096
+# Entries per block of a time index group, a block is split at twice as many.
+TIME_BLOCK_SIZE: int = 1024
+
+
+class VersionedMap:
+    def __init__(self, items: Iterable[tuple[Hashable, Any]] = ()):
+        """Dict that hands out read only versions of itself without copying it.
+
+        Keys are spread over `MAP_SHARDS` plain dicts by hash. `freeze` returns
+        a version sharing those dicts, and the next write to one of them copies
+        that shard first, so a version costs a copy of the shards written
+        after it rather than of the whole map. Values must not be changed in
+        place once frozen.
+        """
+        self._shards: list[dict] = [{} for _ in range(MAP_SHARDS)]
+        self._owned: set[int] = set(range(MAP_SHARDS))
+        for key, value in items:
+            self._shards[hash(key) % MAP_SHARDS][key] = value
+        self._len: int = sum(map(len, self._shards))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self._shards[hash(key) % MAP_SHARDS].get(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        shard: dict = self._writable(hash(key) % MAP_SHARDS)
+        if key not in shard:
+            self._len += 1
+        shard[key] = value
+
+    def pop(self, key: Hashable) -> None:
+        number: int = hash(key) % MAP_SHARDS
+        if key in self._shards[number]:
+            del self._writable(number)[key]
+            self._len -= 1
+
+    def keys(self) -> Iterator[Hashable]:
+        return chain.from_iterable(self._shards)
+
+    def freeze(self) -> "VersionedMap":
+        """Returns the map as it is now. Later writes leave it untouched."""
+        frozen: VersionedMap = copy.copy(self)
+        frozen._shards = list(self._shards)
+        frozen._owned = set()
+        self._owned = set()
+        return frozen
+
+    def rollback(self, frozen: "VersionedMap") -> None:
+        """Drops every write made since `freeze` returned `frozen`."""
+        self._shards = list(frozen._shards)
+        self._owned = set()
+        self._len = frozen._len
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._shards[hash(key) % MAP_SHARDS]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _writable(self, number: int) -> dict:
+        if number not in self._owned:
+            self._shards[number] = dict(self._shards[number])
+            self._owned.add(number)
+        return self._shards[number]
+
+
+class UniqueIndex:
+    def __init__(self, column: str):
+        """Maps every value of a unique key column to the label of its row."""
+        self.column: str = column
+        self._rows: VersionedMap = VersionedMap()
+
+    def build(self, data: pd.DataFrame) -> None:
+        self._rows = VersionedMap(zip(data[self.column].tolist(), data.index.tolist()))
+
+    def add(self, key: Hashable, label: int) -> None:
+        self._rows.set(key, label)
+
+    def remove(self, key: Hashable, label: int) -> None:
+        if self._rows.get(key) == label:
+            self._rows.pop(key)
+
+    def get(self, key: Hashable) -> int | None:
+        return self._rows.get(key)
+
+    def keys(self) -> Iterator[Hashable]:
+        return self._rows.keys()
+
+    def freeze(self) -> "UniqueIndex":
+        """Returns a read only copy of the index as it is now, see `VersionedMap`."""
+        frozen: UniqueIndex = copy.copy(self)
+        frozen._rows = self._rows.freeze()
+        return frozen
+
+    def rollback(self, frozen: "UniqueIndex") -> None:
+        self._rows.rollback(frozen._rows)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class MultiIndex:
+    def __init__(self, column: str):
+        """Maps every value of a non unique column to the sorted labels of its rows."""
+        self.column: str = column
+        self._rows: VersionedMap = VersionedMap()
+
+    def build(self, data: pd.DataFrame) -> None:
+        rows: dict[Hashable, list[int]] = {}
+        for key, label in zip(data[self.column].tolist(), data.index.tolist()):
+            rows.setdefault(key, []).append(label)
+        self._rows = VersionedMap(
+            (key, tuple(sorted(labels))) for key, labels in rows.items()
+        )
+
+    def add(self, key: Hashable, label: int) -> None:
+        labels: tuple[int, ...] = self._rows.get(key, ())
+        if labels and labels[-1] > label:
+            position: int = bisect.bisect_left(labels, label)
+            labels = (*labels[:position], label, *labels[position:])
+        elif not labels or labels[-1] != label:
+            labels = (*labels, label)
+        self._rows.set(key, labels)
+
+    def remove(self, key: Hashable, label: int) -> None:
+        labels: tuple[int, ...] | None = self._rows.get(key)
+        if labels is None or label not in labels:
+            return
+        if len(labels) == 1:
+            self._rows.pop(key)
+        else:
+            self._rows.set(key, tuple(other for other in labels if other != label))
+
+    def get(self, key: Hashable) -> tuple[int, ...]:
+        return self._rows.get(key, ())
+
+    def keys(self) -> Iterator[Hashable]:
+        return self._rows.keys()
+
+    def freeze(self) -> "MultiIndex":
+        """Returns a read only copy of the index as it is now, see `VersionedMap`."""
+        frozen: MultiIndex = copy.copy(self)
+        frozen._rows = self._rows.freeze()
+        return frozen
+
+    def rollback(self, frozen: "MultiIndex") -> None:
+        self._rows.rollback(frozen._rows)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class Timeline:
+    def __init__(self, entries: list[tuple[int, int]], generation: int):
+        """The sorted entries of one group of a `TimeIndex`, in blocks of
+        `TIME_BLOCK_SIZE`, so an insert or a delete shifts one block.
+
+        A timeline belongs to the index `generation` it was created in. Once
+        the index is frozen it is copied before its next change, along with
+        the blocks that change touches, see `TimeIndex.freeze`.
+        """
+        self.generation: int = generation
+        self.blocks: list[list[tuple[int, int]]] = [
+            entries[start : start + TIME_BLOCK_SIZE]
+            for start in range(0, len(entries), TIME_BLOCK_SIZE)
+        ]
+        self.lasts: list[tuple[int, int]] = [block[-1] for block in self.blocks]
+        self._owned: set[int] = {id(block) for block in self.blocks}
+
+    def copy(self, generation: int) -> "Timeline":
+        """Returns a copy sharing every block until it is written."""
+        timeline: Timeline = copy.copy(self)
+        timeline.generation = generation
+        timeline.blocks = list(self.blocks)
+        timeline.lasts = list(self.lasts)
+        timeline._owned = set()
+        return timeline
+
+    def add(self, entry: tuple[int, int]) -> None:
+        if not self.blocks:
+            self.blocks.append([entry])
+            self.lasts.append(entry)
+            self._owned.add(id(self.blocks[0]))
+            return
+        number: int = min(bisect.bisect_left(self.lasts, entry), len(self.blocks) - 1)
+        block: list[tuple[int, int]] = self._writable(number)
+        bisect.insort(block, entry)
+        self.lasts[number] = block[-1]
+        if len(block) > 2 * TIME_BLOCK_SIZE:
+            tail: list[tuple[int, int]] = block[TIME_BLOCK_SIZE:]
+            del block[TIME_BLOCK_SIZE:]
+            self.blocks.insert(number + 1, tail)
+            self.lasts[number] = block[-1]
+            self.lasts.insert(number + 1, tail[-1])
+            self._owned.add(id(tail))
+
+    def remove(self, entry: tuple[int, int]) -> None:
+        number: int = bisect.bisect_left(self.lasts, entry)
+        if number == len(self.blocks):
+            return
+        position: int = bisect.bisect_left(self.blocks[number], entry)
+        if self.blocks[number][position] != entry:
+            return
+        block: list[tuple[int, int]] = self._writable(number)
+        del block[position]
+        if block:
+            self.lasts[number] = block[-1]
+        else:
+            del self.blocks[number]
+            del self.lasts[number]
+
+    def position(self, entry: tuple[int, int], right: bool = False) -> int:
+        """Where `entry` would be inserted, counted from the oldest entry."""
+        bound = bisect.bisect_right if right else bisect.bisect_left
+        number: int = bound(self.lasts, entry)
+        if number == len(self.blocks):
+            return len(self)
+        return sum(map(len, self.blocks[:number])) + bound(self.blocks[number], entry)
+
+    def slice(self, start: int, stop: int) -> list[tuple[int, int]]:
+        """Returns the entries from position `start` included to `stop` excluded."""
+        entries: list[tuple[int, int]] = []
+        offset: int = 0
+        for block in self.blocks:
+            if offset >= stop:
+                break
+            if offset + len(block) > start:
+                entries.extend(block[max(start - offset, 0) : stop - offset])
+            offset += len(block)
+        return entries
+
+    def newest(self, count: int) -> list[tuple[int, int]]:
+        """Returns the `count` most recent entries, newest first."""
+        entries: list[tuple[int, int]] = []
+        for block in reversed(self.blocks):
+            entries.extend(reversed(block[-(count - len(entries)) :]))
+            if len(entries) >= count:
+                break
+        return entries
+
+    def __len__(self) -> int:
+        return sum(map(len, self.blocks))
+
+    def _writable(self, number: int) -> list[tuple[int, int]]:
+        if id(self.blocks[number]) not in self._owned:
+            self.blocks[number] = list(self.blocks[number])
+            self._owned.add(id(self.blocks[number]))
+        return self.blocks[number]
+
+
+class TimeIndex:
+    def __init__(self, column: str, group_column: str | None = None):
+        """Keeps the labels of the rows sorted by a timestamp column, in one
+        `Timeline` per value of `group_column` if given, so a time range or the
+        most recent rows are found by binary search. Rows without a time are
+        left out.
+
+        Entries are (nanoseconds since the epoch, label) pairs, which also
+        orders rows created at the same instant.
+        """
+        self.column: str = column
+        self.group_column: str | None = group_column
+        self._generation: int = 0
+        self._groups: VersionedMap = VersionedMap()
+
+    def build(self, data: pd.DataFrame) -> None:
+        times: pd.Series = pd.to_datetime(data[self.column])
+        entries_df: pd.DataFrame = pd.DataFrame(
+            {
+                "group": (
+                    data[self.group_column].astype(object)
+                    if self.group_column is not None
+                    else None
+                ),
+                "time": times.to_numpy(dtype="datetime64[ns]").astype("int64"),
+                "label": data.index,
+            }
+        )[times.notna().to_numpy()].sort_values(["time", "label"])
+        entries: dict[Hashable, list[tuple[int, int]]] = {}
+        for group, time, label in entries_df.itertuples(index=False):
+            entries.setdefault(group, []).append((time, label))
+        self._generation += 1
+        self._groups = VersionedMap(
+            (group, Timeline(group_entries, self._generation))
+            for group, group_entries in entries.items()
+        )
+
+    def add(self, row: dict, label: int) -> None:
+        entry: tuple[int, int] | None = self._entry(row, label)
+        if entry is not None:
+            self._writable(self._group(row)).add(entry)
+
+    def remove(self, row: dict, label: int) -> None:
+        entry: tuple[int, int] | None = self._entry(row, label)
+        if entry is None or self._group(row) not in self._groups:
+            return
+        timeline: Timeline = self._writable(self._group(row))
+        timeline.remove(entry)
+        if not timeline.blocks:
+            self._groups.pop(self._group(row))
+
+    def between(
+        self,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        group: Hashable = None,
+        after: tuple[int, int] | None = None,
+        limit: int | None = None,
+    ) -> tuple[list[tuple[int, int]], int]:
+        """Returns the entries from `start` included to `end` excluded, oldest
+        first, resuming after the entry `after` and stopping at `limit`, with the
+        number of entries left from there on."""
+        timeline: Timeline | None = self._groups.get(group)
+        if timeline is None:
+            return [], 0
+        low: int = timeline.position((start.value, -1))
+        if after is not None:
+            low = max(low, timeline.position(after, right=True))
+        high: int = timeline.position((end.value, -1))
+        stop: int = high if limit is None else min(high, low + limit)
+        return timeline.slice(low, stop), max(high - low, 0)
+
+    def latest(self, count: int, group: Hashable = None) -> list[int]:
+        """Returns the labels of the `count` most recent rows, newest first."""
+        timeline: Timeline | None = self._groups.get(group)
+        if timeline is None or not count:
+            return []
+        return [label for _, label in timeline.newest(count)]
+
+    def freeze(self) -> "TimeIndex":
+        """Returns a read only copy of the index as it is now. The timelines
+        changed afterwards are copied first, see `Timeline`."""
+        frozen: TimeIndex = copy.copy(self)
+        frozen._groups = self._groups.freeze()
+        self._generation += 1
+        return frozen
+
+    def rollback(self, frozen: "TimeIndex") -> None:
+        """Drops every change made since `freeze` returned `frozen`. Its
+        timelines are copied before their next change too."""
+        self._groups.rollback(frozen._groups)
+        self._generation += 1
+
+    def _writable(self, group: Hashable) -> Timeline:
+        timeline: Timeline | None = self._groups.get(group)
+        if timeline is None:
+            timeline = Timeline([], self._generation)
+            self._groups.set(group, timeline)
+        elif timeline.generation != self._generation:
+            timeline = timeline.copy(self._generation)
+            self._groups.set(group, timeline)
+        return timeline
+
+    def _group(self, row: dict) -> Hashable:
+        return row[self.group_column] if self.group_column is not None else None
+
+    def _entry(self, row: dict, label: int) -> tuple[int, int] | None:
+        time = row[self.column]
+        if time is None or pd.isna(time):
+            return None
+        return (pd.Timestamp(time).value, label)
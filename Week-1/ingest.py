@@ -0,0 +1,333 @@
+import codecs
+import datetime
+import json
+from typing import IO, Iterator
+from uuid import uuid4
+
+import indiapins
+import pandas as pd
+from loguru import logger
+
+from config import BULK_MAX_RECORDS
+from data import PRIMARY_KEYS
+from store import TableStore
+
+# Fields a bulk insert needs for every record, per sheet.
+REQUIRED_FIELDS: dict[str, list[str]] = {
+    "Accounts": ["Name", "Age", "City", "State", "Pincode"],
+    "Claims": ["HAN", "BillAmount", "Status", "AccountId"],
+    "Policies": ["HAN", "Policy Name"],
+}
+# Request fields named differently from their sheet column.
+FIELD_NAMES: dict[str, str] = {"PolicyName": "Policy Name"}
+CLAIM_STATUSES: list[str] = ["Paid", "Not Paid"]
+# Records parsed at a time, so an upload over `BULK_MAX_RECORDS` is refused
+# before it is read whole.
+READ_CHUNK_ROWS: int = 1000
+READ_CHUNK_BYTES: int = 64 * 1024
+
+
+def read_records(source: IO[bytes], content_type: str) -> pd.DataFrame:
+    """Parses an uploaded batch of records.
+    Params:
+        source(IO[bytes]): The request body.
+        content_type(str): "application/json" for an array of objects,
+            "application/x-ndjson" for one object per line, or "text/csv".
+    Returns:
+        pd.DataFrame: One row per record, every value kept as sent.
+    """
+    media_type: str = content_type.split(";")[0].strip().lower()
+    match media_type:
+        case "application/json":
+            chunks: Iterator[pd.DataFrame] = _read_json_array(source)
+        case "application/x-ndjson" | "application/jsonl":
+            chunks = pd.read_json(
+                source, lines=True, dtype=False, chunksize=READ_CHUNK_ROWS
+            )
+        case "text/csv":
+            try:
+                chunks = pd.read_csv(
+                    source, dtype=str, keep_default_na=False, chunksize=READ_CHUNK_ROWS
+                )
+            except pd.errors.EmptyDataError:
+                chunks = iter([])
+        case _:
+            raise ValueError(
+                f"Content type {media_type} not supported. Use application/json, application/x-ndjson or text/csv."
+            )
+    records: list[pd.DataFrame] = []
+    count: int = 0
+    for chunk_df in chunks:
+        count += len(chunk_df)
+        if count > BULK_MAX_RECORDS:
+            raise ValueError(
+                f"Too many records. At most {BULK_MAX_RECORDS} per request."
+            )
+        records.append(chunk_df)
+    if not records:
+        return pd.DataFrame()
+    # Chunks infer their types on their own, the whole upload infers them again.
+    records_df: pd.DataFrame = pd.concat(
+        [chunk_df.astype(object) for chunk_df in records], ignore_index=True
+    ).infer_objects()
+    return records_df.rename(columns=FIELD_NAMES)
+
+
+def ingest(store: TableStore, sheet_name: str, records: pd.DataFrame) -> dict:
+    """Validates a batch of new records and inserts the valid ones in one write.
+
+    Every rule is checked for the whole batch at once, and references to other
+    sheets are looked up in the store's key indexes. Invalid records are
+    skipped and reported by their position in the upload.
+    Returns:
+        dict: Status, number of records inserted, their ids and the errors.
+    """
+    if records.empty:
+        return {"status": 200, "message": "Nothing to insert", "inserted": 0}
+
+    records = records.reset_index(drop=True)
+    errors: dict[int, str] = {}
+    missing: list[str] = [
+        field for field in REQUIRED_FIELDS[sheet_name] if field not in records.columns
+    ]
+    if missing:
+        return {"status": 400, "message": f"Missing fields {missing}."}
+
+    match sheet_name:
+        case "Accounts":
+            valid_df: pd.DataFrame = _validate_accounts(records, errors)
+        case "Claims":
+            valid_df = _validate_claims(store, records, errors)
+        case "Policies":
+            valid_df = _validate_policies(store, records, errors)
+
+    error_list: list[dict] = [
+        {"row": row, "error": message} for row, message in sorted(errors.items())
+    ]
+    if valid_df.empty:
+        return {
+            "status": 400,
+            "message": "No valid records.",
+            "inserted": 0,
+            "errors": error_list,
+        }
+
+    result: dict = store.insert_many(sheet_name, valid_df)
+    if result["status"] != 200:
+        return result
+    logger.info(
+        f"{len(valid_df)} records inserted into {sheet_name}, {len(errors)} rejected."
+    )
+    return {
+        "status": 200,
+        "message": "success",
+        "inserted": len(valid_df),
+        "ids": valid_df[PRIMARY_KEYS[sheet_name]].tolist(),
+        "errors": error_list,
+    }
+
+
+def _reject(
+    records: pd.DataFrame, mask: pd.Series, message: str, errors: dict[int, str]
+) -> pd.DataFrame:
+    """Drops the records where `mask` is True, remembering why."""
+    for row in records.index[mask].tolist():
+        errors.setdefault(row, message)
+    return records[~mask]
+
+
+def _blank(records: pd.DataFrame, fields: list[str]) -> pd.Series:
+    """True where any of the fields is missing or only whitespace."""
+    text: pd.DataFrame = (
+        records[fields].astype(str).apply(lambda column: column.str.strip())
+    )
+    return (records[fields].isna() | text.eq("")).any(axis=1)
+
+
+def _validate_accounts(records: pd.DataFrame, errors: dict[int, str]) -> pd.DataFrame:
+    fields: list[str] = REQUIRED_FIELDS["Accounts"]
+    records = _reject(
+        records, _blank(records, fields), "Fields can not be empty", errors
+    )
+
+    # Same rules as POST /account/, whose Age is an integer.
+    age: pd.Series = pd.to_numeric(records["Age"], errors="coerce")
+    records = _reject(
+        records, ~(age == age.round()), "Invalid Age. Must be a whole number.", errors
+    )
+    records = _reject(
+        records,
+        ~(age[records.index] > 0),
+        "Invalid Age. Cannot be less than or equal to 0.",
+        errors,
+    )
+
+    pincode: pd.Series = pd.to_numeric(records["Pincode"], errors="coerce")
+    records = _reject(
+        records,
+        ~pincode[records.index].map(_valid_pincode).astype(bool),
+        "Invalid Pincode. Must be in the format ######",
+        errors,
+    )
+
+    return pd.DataFrame(
+        {
+            "AccountId": [uuid4().hex for _ in range(len(records))],
+            "Name": records["Name"].astype(str).str.capitalize(),
+            "Age": pd.to_numeric(records["Age"]).astype(int),
+            "City": records["City"].astype(str).str.capitalize(),
+            "State": records["State"].astype(str).str.capitalize(),
+            "Pincode": pd.to_numeric(records["Pincode"]).astype(int),
+        },
+        index=records.index,
+    )
+
+
+def _valid_pincode(pincode: float) -> bool:
+    """Checks a Pincode as POST /account/ does, with `indiapins.isvalid`."""
+    if pd.isna(pincode) or pincode != round(pincode):
+        return False
+    try:
+        indiapins.isvalid(str(int(pincode)))
+    except ValueError:
+        return False
+    return True
+
+
+def _read_json_array(source: IO[bytes]) -> Iterator[pd.DataFrame]:
+    """Parses a JSON array of objects `READ_CHUNK_ROWS` records at a time."""
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder("utf-8")()
+    text: str = ""
+    position: int = 0
+    at_end: bool = False
+    started: bool = False
+    records: list[dict] = []
+
+    def read_more() -> None:
+        nonlocal text, position, at_end
+        data: bytes = source.read(READ_CHUNK_BYTES)
+        at_end = not data
+        text, position = text[position:] + reader.decode(data, final=at_end), 0
+
+    def skip_space() -> bool:
+        """Moves past whitespace, reading more, False once nothing is left."""
+        nonlocal position
+        while True:
+            while position < len(text) and text[position].isspace():
+                position += 1
+            if position < len(text):
+                return True
+            if at_end:
+                return False
+            read_more()
+
+    while True:
+        if not skip_space():
+            if started:
+                raise ValueError("Unterminated JSON array.")
+            return
+        if not started:
+            if text[position] != "[":
+                raise ValueError("Expected a JSON array of records.")
+            started = True
+            position += 1
+            if skip_space() and text[position] == "]":
+                break
+            continue
+        try:
+            record, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            if at_end:
+                raise ValueError("Invalid JSON array of records.")
+            # The record continues in the next read.
+            read_more()
+            continue
+        if not isinstance(record, dict):
+            raise ValueError("Expected a JSON array of records.")
+        records.append(record)
+        position = end
+        if len(records) >= READ_CHUNK_ROWS:
+            yield pd.DataFrame.from_records(records)
+            records = []
+        if not skip_space():
+            raise ValueError("Unterminated JSON array.")
+        if text[position] == "]":
+            break
+        if text[position] != ",":
+            raise ValueError("Invalid JSON array of records.")
+        position += 1
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def _validate_claims(
+    store: TableStore, records: pd.DataFrame, errors: dict[int, str]
+) -> pd.DataFrame:
+    fields: list[str] = REQUIRED_FIELDS["Claims"]
+    records = _reject(
+        records, _blank(records, fields), "Fields can not be empty", errors
+    )
+    records = _reject(
+        records,
+        ~store.contains("Policies", records["HAN"]),
+        "Invalid HAN number.",
+        errors,
+    )
+    records = _reject(
+        records,
+        ~store.contains("Accounts", records["AccountId"]),
+        "Account is not registered.",
+        errors,
+    )
+    records = _reject(
+        records,
+        ~records["Status"].isin(CLAIM_STATUSES),
+        f"Status value not valid. Options{CLAIM_STATUSES}",
+        errors,
+    )
+    bill_amount: pd.Series = pd.to_numeric(records["BillAmount"], errors="coerce")
+    records = _reject(
+        records,
+        ~(bill_amount >= 0),
+        "Invalid bill amount. Bill amount cannot be less than 0.",
+        errors,
+    )
+
+    bill_amount = pd.to_numeric(records["BillAmount"])
+    created_date: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+    return pd.DataFrame(
+        {
+            "Id": [uuid4().hex for _ in range(len(records))],
+            "CreatedDate": created_date,
+            "CaseNumber": [uuid4().hex[:10].upper() for _ in range(len(records))],
+            "HAN": records["HAN"],
+            "BillAmount": bill_amount,
+            "Status": records["Status"],
+            "AccountId": records["AccountId"],
+        },
+        index=records.index,
+    )
+
+
+def _validate_policies(
+    store: TableStore, records: pd.DataFrame, errors: dict[int, str]
+) -> pd.DataFrame:
+    fields: list[str] = REQUIRED_FIELDS["Policies"]
+    records = _reject(
+        records, _blank(records, fields), "Empty HAN or Policy Name", errors
+    )
+    records = _reject(
+        records,
+        store.contains("Policies", records["HAN"]) | records["HAN"].duplicated(),
+        "HAN number already exists.",
+        errors,
+    )
+    records = _reject(
+        records,
+        store.contains("Policies", records["Policy Name"], column="Policy Name")
+        | records["Policy Name"].duplicated(),
+        "Policy Name already exists.",
+        errors,
+    )
+    return records[fields]
@@ -1,88 +1,165 @@
 import datetime
+import json
+import threading
 from pathlib import Path
 
-import openpyxl
 import pandas as pd
 from loguru import logger
 
+from config import AUDIT_FLUSH_INTERVAL_SECONDS, AUDIT_FLUSH_SIZE
+from path import LOG_DIR
+
+# Column holding the id of the modified row, per sheet.
+ID_COLUMNS: dict[str, str] = {
+    "Accounts": "AccountId",
+    "Policies": "HAN",
+    "Claims": "Id",
+}
+
 
 class Log:
-    def __init__(self):
-        """Check if file exists. IF not create one if yes do nothing"""
-        self.log_save_file: Path = Path(".").resolve() / "data" / "logs" / "logs.xlsx"
+    def __init__(
+        self,
+        folder: Path = LOG_DIR,
+        flush_size: int = AUDIT_FLUSH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+    ):
+        """Buffers audit rows in memory and appends them to daily JSONL segments.
+
+        Rows are written once `flush_size` of them are buffered, every
+        `flush_interval` seconds by the background thread, and on `stop`.
+        `export` builds the old logs.xlsx layout from the segments on demand.
+        """
+        self.folder: Path = folder
+        self.log_save_file: Path = folder / "logs.xlsx"
+        self.flush_size: int = flush_size
+        self.flush_interval: float = flush_interval
+        self._buffer: list[tuple[str, dict]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher: threading.Thread | None = None
         self._check_folder()
-        self._check_file()
 
     def _check_folder(self):
-        if self.log_save_file.parent.exists():
+        if self.folder.exists():
             logger.info("Log directory already exists.")
         else:
             logger.warning(
-                f"Log directory is missing. Creating a new one in {self.log_save_file.parent}."
+                f"Log directory is missing. Creating a new one in {self.folder}."
             )
-            self.log_save_file.parent.mkdir(parents=True, exist_ok=True)
+            self.folder.mkdir(parents=True, exist_ok=True)
 
-    def _check_file(self):
-        if (self.log_save_file).is_file():
-            logger.info("Log File already exists.")
-        else:
-            logger.warning(
-                f"Log File does not exists. Creating a new one in {self.log_save_file}"
-            )
+    def start(self) -> None:
+        """Starts the background thread writing the buffered rows."""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._stopped.clear()
+        self._flusher = threading.Thread(
+            target=self._run, name="audit-log-flusher", daemon=True
+        )
+        self._flusher.start()
 
-            wb = openpyxl.Workbook()
-            sheets: list[str] = ["Accounts", "Policies", "Claims"]
-            for idx, sheet in enumerate(sheets):
-                wb.create_sheet(sheet, index=idx)
-                ws = wb[sheet]
-                match sheet:
-                    case "Accounts":
-                        ws.append(
-                            ["Timestamp", "AccountId", "Column", "OldValue", "NewValue"]
-                        )
-                    case "Policies":
-                        ws.append(
-                            ["Timestamp", "HAN", "Column", "OldValue", "NewValue"]
-                        )
-                    case "Claims":
-                        ws.append(["Timestamp", "Id", "Column", "OldValue", "NewValue"])
-
-            wb.save(self.log_save_file)
-
-    def _write(self, sheet_name, new_row):
-        try:
-            wb = openpyxl.load_workbook(self.log_save_file)
-        except FileNotFoundError as e:
-            logger.error(f"The Log file not found: {e}")
-        else:
-            ws = wb[sheet_name]
-            ws.append(new_row)
-            try:
-                wb.save(self.log_save_file)
-            except PermissionError:
-                logger.error(
-                    "The file is open in another program. Close the file and try again."
-                )
-            else:
-                logger.info(f"Log file for sheet {sheet_name} written successfully")
+    def stop(self) -> None:
+        """Stops the background thread and writes whatever is still buffered."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
 
     def write_log(
         self, sheet_name: str, id: str, column_name: str, old_value: any, new_value: any
-    ) -> dict:
-        """Check if the sheet exists or not. If not then creates it. If it does then appends it."""
+    ) -> None:
+        """Buffers one audit row. Nothing touches the disk on the caller's thread
+        unless the buffer is full and no background thread is running."""
 
-        valid_sheets: list[str] = ["Accounts", "Claims", "Policies"]
-        if sheet_name not in valid_sheets:
+        if sheet_name not in ID_COLUMNS:
             logger.error(f"Sheet name {sheet_name} not valid.")
+            return
 
-        new_row: tuple = (
-            datetime.datetime.now(),
-            id,
-            column_name,
-            old_value,
-            new_value,
-        )
-        self._write(sheet_name=sheet_name, new_row=new_row)
+        new_row: dict = {
+            "Timestamp": datetime.datetime.now(),
+            ID_COLUMNS[sheet_name]: id,
+            "Column": column_name,
+            "OldValue": old_value,
+            "NewValue": new_value,
+        }
+        with self._lock:
+            self._buffer.append((sheet_name, new_row))
+            full: bool = len(self._buffer) >= self.flush_size
+        if full:
+            if self._flusher is not None:
+                self._wakeup.set()
+            else:
+                self.flush()
+
+    def flush(self) -> None:
+        """Appends the buffered rows to today's segment of each sheet."""
+        with self._write_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+
+            lines: dict[str, list[str]] = {}
+            for sheet_name, row in rows:
+                lines.setdefault(sheet_name, []).append(json.dumps(row, default=str))
+
+            today: str = datetime.date.today().isoformat()
+            for sheet_name, sheet_lines in lines.items():
+                segment: Path = self.folder / f"{sheet_name}-{today}.jsonl"
+                try:
+                    with open(segment, "a") as file:
+                        file.write("\n".join(sheet_lines) + "\n")
+                except OSError as e:
+                    logger.error(f"Writing the {sheet_name} audit log failed: {e}")
+                    with self._lock:
+                        self._buffer = [
+                            (name, row) for name, row in rows if name == sheet_name
+                        ] + self._buffer
+                else:
+                    logger.info(
+                        f"{len(sheet_lines)} log rows for sheet {sheet_name} written successfully"
+                    )
+
+    def read(self, sheet_name: str) -> pd.DataFrame:
+        """Returns every audit row written for a sheet, oldest first."""
+        columns: list[str] = [
+            "Timestamp",
+            ID_COLUMNS[sheet_name],
+            "Column",
+            "OldValue",
+            "NewValue",
+        ]
+        rows: list[dict] = []
+        for segment in sorted(self.folder.glob(f"{sheet_name}-*.jsonl")):
+            with open(segment) as file:
+                rows.extend(json.loads(line) for line in file if line.strip())
+        return pd.DataFrame(rows, columns=columns)
+
+    def export(self, export_path: Path | None = None) -> Path:
+        """Writes all audit rows into one workbook with a sheet per table."""
+        self.flush()
+        export_path = export_path if export_path is not None else self.log_save_file
+        with pd.ExcelWriter(export_path) as writer:
+            for sheet_name in ID_COLUMNS.keys():
+                self.read(sheet_name).to_excel(
+                    writer, sheet_name=sheet_name, index=False
+                )
+        logger.info(f"Audit log exported to {export_path}")
+        return export_path
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Background audit log flush failed: {e}")
 
 
 if __name__ == "__main__":
@@ -108,3 +185,5 @@ if __name__ == "__main__":
         old_value=123,
         new_value=12345,
     )
+    obj.flush()
+    print(obj.export())
@@ -1,19 +1,112 @@
 import datetime
+import tempfile
+from contextlib import asynccontextmanager
+from enum import Enum
 from uuid import uuid4
 
+import httpx
 import indiapins
-import numpy as np
 import pandas as pd
-from cache_pandas import timed_lru_cache
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from loguru import logger
 from pydantic import BaseModel
 
-from data import get_data, get_merged_data, save_data
+from cluster import ClusterOwner, ClusterWorker, ReplicaBackend
+from columns import to_timestamp
+from config import (
+    CLUSTER_AUTHKEY,
+    DEPLOY_MODE,
+    OWNER_URL,
+    PAGE_MAX_SIZE,
+    PAGE_SIZE,
+    REPLICA_WAIT_SECONDS,
+)
+from executor import ExecutorSaturated, IOExecutor
+from export import EXPORT_FORMATS, dumps, stream_rows
+from ingest import ingest, read_records
 from log import Log
-
-app = FastAPI()
+from store import TableStore
+from writer import CommitQueue
+
+if DEPLOY_MODE not in ["single", "owner", "worker"]:
+    raise ValueError(f"Deploy mode {DEPLOY_MODE} not supported.")
+if DEPLOY_MODE != "single" and not CLUSTER_AUTHKEY:
+    raise ValueError(f"Set CLUSTER_AUTHKEY to run in deploy mode {DEPLOY_MODE}.")
+
+# Workers keep a replica of the owner's tables and never write them.
+store = (
+    TableStore(backend=ReplicaBackend(), use_wal=False)
+    if DEPLOY_MODE == "worker"
+    else TableStore()
+)
+commit_queue = CommitQueue(store)
+io_executor = IOExecutor()
+audit_log = Log()
+cluster_owner: ClusterOwner | None = (
+    ClusterOwner(store) if DEPLOY_MODE == "owner" else None
+)
+cluster_worker: ClusterWorker | None = (
+    ClusterWorker(store) if DEPLOY_MODE == "worker" else None
+)
+owner_client: httpx.AsyncClient | None = None
+# Owner response headers a worker does not pass on: they describe the hop, or
+# a body encoding httpx has already undone.
+HOP_BY_HOP_HEADERS: set[str] = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "content-encoding",
+    "content-length",
+}
+
+# Uploads bigger than this are spooled to a temporary file while they stream in.
+UPLOAD_SPOOL_BYTES: int = 8 * 1024 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loads the sheets once at startup and flushes pending writes on shutdown."""
+    global owner_client
+
+    if cluster_worker is not None:
+        cluster_worker.start()
+        owner_client = httpx.AsyncClient(base_url=OWNER_URL, timeout=None)
+        yield
+        await owner_client.aclose()
+        cluster_worker.stop()
+        io_executor.shutdown()
+        return
+
+    if cluster_owner is not None:
+        store.subscribe(cluster_owner)
+    store.load()
+    store.start()
+    commit_queue.start()
+    audit_log.start()
+    if cluster_owner is not None:
+        cluster_owner.start()
+    yield
+    commit_queue.stop()
+    audit_log.stop()
+    if cluster_owner is not None:
+        cluster_owner.stop()
+    io_executor.shutdown()
+    store.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +117,65 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def route_writes(request: Request, call_next):
+    """In a multi-process deployment workers forward every write to the owner.
+
+    The owner tags its answer with the number of changes it has applied, and
+    the worker only answers once its replica has caught up with it, so a
+    client reading from the same worker sees its own write. The answer keeps
+    the owner's headers.
+    """
+    if request.method == "GET":
+        return await call_next(request)
+
+    if cluster_worker is not None:
+        try:
+            owner_response: httpx.Response = await owner_client.request(
+                request.method,
+                request.url.path,
+                params=request.query_params,
+                headers={
+                    "content-type": request.headers.get(
+                        "content-type", "application/json"
+                    )
+                },
+                content=request.stream(),
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Forwarding {request.method} {request.url.path} failed: {e}")
+            return JSONResponse(
+                status_code=503,
+                content={"error": "Owner process not reachable. Try again later."},
+                headers={"Retry-After": "1"},
+            )
+        sequence: str | None = owner_response.headers.get("x-change-sequence")
+        if sequence is not None and not await cluster_worker.wait(
+            int(sequence), REPLICA_WAIT_SECONDS
+        ):
+            logger.warning(f"Replica still behind change {sequence}.")
+        response = Response(
+            content=owner_response.content, status_code=owner_response.status_code
+        )
+        for name, value in owner_response.headers.multi_items():
+            if name not in HOP_BY_HOP_HEADERS:
+                response.headers.append(name, value)
+        return response
+
+    response = await call_next(request)
+    if cluster_owner is not None:
+        response.headers["X-Change-Sequence"] = str(store.sequence)
+    return response
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    """Sheds load instead of queueing more blocking work when the executor is full."""
+    return JSONResponse(
+        status_code=503, content={"error": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
 class Customer(BaseModel):
     Name: str | None = None
     Age: int | None = None
@@ -44,42 +196,218 @@ class Policy(BaseModel):
     PolicyName: str | None = None
 
 
+class TableName(str, Enum):
+    accounts = "accounts"
+    claims = "claims"
+    policies = "policies"
+    merged = "merged"
+
+
+class GroupBy(str, Enum):
+    account = "account"
+    policy = "policy"
+    status = "status"
+    state = "state"
+    day = "day"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    arrow = "arrow"
+
+
+# Sheet behind every table name, None for the merged view.
+TABLE_SHEETS: dict[str, str | None] = {
+    "accounts": "Accounts",
+    "claims": "Claims",
+    "policies": "Policies",
+    "merged": None,
+}
+
+
+def json_response(content: any) -> Response:
+    """Encodes the content straight to JSON bytes, skipping FastAPI's jsonable_encoder."""
+    return Response(content=dumps(content), media_type="application/json")
+
+
 @app.get("/account/{account_id}")
-@timed_lru_cache(seconds=100, maxsize=None)
-def get_customer_info(account_id: str) -> list[dict] | dict:
+def get_customer_info(
+    account_id: str,
+    cursor: int | None = None,
+    limit: int | None = Query(default=None, ge=1, le=PAGE_MAX_SIZE),
+) -> Response:
     """Take an account id and return json object of fetched results.
     Params:
         account_id (str): Account Id of a customer
+        cursor (int | None): `next_cursor` of the previous page
+        limit (int | None): Claims per page. Without it every row is returned at once
     Returns:
-        result (list[dict] | dict]): A List of Dictionaries of records
+        result (Response): JSON list of records, or a page
+        {"data": [...], "next_cursor": ...} when a limit is given
     """
 
     try:
-        merged_df: pd.DataFrame = get_merged_data()
-        columns: list[str] = merged_df.columns.to_list()
+        if limit is not None:
+            rows, next_cursor = store.account_page(account_id, cursor, limit)
+            if rows is None:
+                return json_response({"error": "Account not found."})
+            return json_response({"data": rows, "next_cursor": next_cursor})
 
-        if "AccountId" not in columns:
-            return {"error": "Invalid column name AccountId."}
+        result: bytes | None = store.get_account_json(account_id)
 
-        fetched_data: np.ndarray = merged_df.to_numpy()[
-            merged_df["AccountId"].to_numpy() == account_id
-        ]
+        if result is None:
+            return json_response({"error": "Account not found."})
 
-        if fetched_data.size == 0:
-            return {"error": "Account not found."}
+        return Response(content=result, media_type="application/json")
+    except Exception as e:
+        return json_response({"error": f"An unexpected error occured {str(e)}"})
 
-        result: list[dict[str, any]] = []
-        for idx in range(len(fetched_data)):
-            temp_dict: dict[str, any] = dict(zip(columns, fetched_data[idx]))
-            result.append(temp_dict)
 
-        return result
-    except Exception as e:
-        return {"error": f"An unexpected error occured {str(e)}"}
+@app.get("/accounts/search")
+def search_accounts(
+    q: str = Query(min_length=1),
+    limit: int = Query(default=10, ge=1, le=PAGE_MAX_SIZE),
+) -> Response:
+    """Finds accounts by the words of their Name, City, State and Pincode.
+    Params:
+        q (str): Words to look for. Prefixes and small misspellings also match
+        limit (int): Most accounts returned
+    Returns:
+        dict: {"data": [...]}, the accounts with their "score", best first
+    """
+    return json_response({"data": store.search_accounts(q, limit)})
+
+
+@app.get("/claims/created")
+def claims_created_between(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    cursor: str | None = Query(default=None, pattern=r"^-?\d+:\d+$"),
+    limit: int = Query(default=PAGE_SIZE, ge=1, le=PAGE_MAX_SIZE),
+) -> Response:
+    """Returns the claims created from `start` included to `end` excluded, oldest first.
+    Params:
+        start, end (datetime): ISO 8601 times, taken as UTC without an offset
+        cursor (str | None): `next_cursor` of the previous page
+        limit (int): Claims per page
+    Returns:
+        dict: {"data": [...], "count": ..., "next_cursor": ...}, count is the
+        number of claims in the window from the cursor on
+    """
+    rows, count, next_cursor = store.between(
+        "Claims", to_timestamp(start), to_timestamp(end), cursor, limit
+    )
+    return json_response({"data": rows, "count": count, "next_cursor": next_cursor})
+
+
+@app.get("/account/{account_id}/claims/latest")
+def latest_claims(
+    account_id: str, count: int = Query(default=10, ge=1, le=PAGE_MAX_SIZE)
+) -> Response:
+    """Returns the `count` most recent claims of an account, newest first."""
+    if not store.exists("Accounts", account_id):
+        return json_response({"error": "Account not found."})
+    return json_response(store.latest("Claims", "AccountId", account_id, count))
+
+
+@app.get("/analytics/claims")
+def claim_totals(group_by: GroupBy = GroupBy.status) -> Response:
+    """Returns the number of claims and their BillAmount total and mean per group.
+    Params:
+        group_by (GroupBy): account, policy (HAN), status, state of the account,
+            or day of CreatedDate
+    Returns:
+        dict: {"group_by": ..., "data": [{"key", "claims", "total", "mean"}, ...]}
+    """
+    return json_response(
+        {"group_by": group_by.value, "data": store.aggregate_claims(group_by.value)}
+    )
+
+
+@app.get("/analytics/account/{account_id}")
+def account_totals(account_id: str) -> dict:
+    """Returns the claim count and BillAmount total of an account, overall and per Status."""
+    if not store.exists("Accounts", account_id):
+        return {"error": "Account not found."}
+    return store.rollups.account(account_id)
+
+
+@app.get("/analytics/policy/{han_number}")
+def policy_totals(han_number: str) -> dict:
+    """Returns the claim count and BillAmount total of a policy, overall and per Status,
+    so the paid and unpaid sums."""
+    if not store.exists("Policies", han_number):
+        return {"error": "Policy not found."}
+    return store.rollups.policy(han_number)
+
+
+@app.get("/memory")
+def memory_report() -> dict:
+    """Returns the memory used by every table, per column."""
+    return store.memory_report()
+
+
+@app.get("/cache/stats")
+def cache_stats() -> dict:
+    """Returns the hit, miss, eviction and invalidation counters of the account lookup cache."""
+    return store.cache.stats()
+
+
+@app.get("/tables/{table}")
+def list_rows(
+    table: TableName,
+    cursor: int | None = None,
+    limit: int = Query(default=PAGE_SIZE, ge=1, le=PAGE_MAX_SIZE),
+) -> Response:
+    """Returns one page of a table, oldest rows first.
+    Params:
+        table (TableName): accounts, claims, policies, or merged for the joined
+            rows of `limit` accounts
+        cursor (int | None): `next_cursor` of the previous page
+        limit (int): Rows per page
+    Returns:
+        dict: {"data": [...], "next_cursor": ...}, next_cursor is null on the last page
+    """
+    sheet_name: str | None = TABLE_SHEETS[table.value]
+    if sheet_name is None:
+        rows, next_cursor = store.merged_page(cursor, limit)
+    else:
+        rows, next_cursor = store.page(sheet_name, cursor, limit)
+    return json_response({"data": rows, "next_cursor": next_cursor})
+
+
+@app.get("/tables/{table}/export")
+def export_table(
+    table: TableName, format: ExportFormat = ExportFormat.ndjson
+) -> StreamingResponse:
+    """Streams a whole table as NDJSON, CSV or an Arrow IPC stream, chunk by chunk."""
+    sheet_name: str | None = TABLE_SHEETS[table.value]
+    content = stream_rows(
+        store.iter_rows(sheet_name), format.value, store.dtypes(sheet_name)
+    )
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_FORMATS[format.value],
+        headers={
+            "Content-Disposition": f'attachment; filename="{table.value}.{format.value}"'
+        },
+    )
+
+
+@app.get("/logs/export")
+async def export_logs() -> FileResponse:
+    """Builds logs.xlsx from the audit log segments and returns it."""
+    export_path = await io_executor.run(audit_log.export)
+    return FileResponse(export_path, filename=export_path.name)
 
 
 @app.post("/account/")
 async def add_new_customer(customer: Customer) -> dict:
+    return await commit_queue.execute(_add_new_customer, customer)
+
+
+def _add_new_customer(customer: Customer) -> dict:
     account_id: str = uuid4().hex
     customer_name = customer.Name.capitalize()
     city = customer.City.capitalize()
@@ -93,8 +421,6 @@ async def add_new_customer(customer: Customer) -> dict:
     except ValueError:
         return {"error": "Invalid Pincode. Must be in the format ######"}
 
-    accounts_df: pd.DataFrame = get_data(sheet_name="Accounts")
-
     if customer_name.strip() == "" or city.strip() == "" or state.strip() == "":
         return {"error": "Fields can not be empty"}
 
@@ -106,26 +432,23 @@ async def add_new_customer(customer: Customer) -> dict:
         "State": state,
         "Pincode": customer.Pincode,
     }
-    accounts_df.loc[len(accounts_df)] = new_user_info_dict
-    result = save_data(accounts_df, sheet_name="Accounts")
+    result = store.insert("Accounts", new_user_info_dict)
     return result
 
 
 @app.post("/claim")
 async def add_new_claims(claim: Claim):
+    return await commit_queue.execute(_add_new_claims, claim)
+
+
+def _add_new_claims(claim: Claim):
     id: str = uuid4().hex
-    created_date: str = str(datetime.datetime.now())
+    created_date: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
     case_number: str = (uuid4().hex[:10]).upper()
 
-    policies_df: pd.DataFrame = get_data(sheet_name="Policies")
-    accounts_df: pd.DataFrame = get_data(sheet_name="Accounts")
-    claims_df: pd.DataFrame = get_data(sheet_name="Claims")
-
-    if (policies_df.to_numpy()[policies_df["HAN"].to_numpy() == claim.HAN]).size == 0:
+    if not store.exists("Policies", claim.HAN):
         return {"error": "Invalid HAN number."}
-    if (
-        accounts_df.to_numpy()[accounts_df["AccountId"].to_numpy() == claim.AccountId]
-    ).size == 0:
+    if not store.exists("Accounts", claim.AccountId):
         return {"error": "Account is not registered."}
     if claim.Status not in ["Paid", "Not Paid"]:
         return {"error": "Status value not valid. Options[Paid, Not Paid]"}
@@ -143,23 +466,19 @@ async def add_new_claims(claim: Claim):
     }
     logger.debug(new_claim_dict)
 
-    claims_df.loc[len(claims_df)] = new_claim_dict
-    result = save_data(claims_df, sheet_name="Claims")
+    result = store.insert("Claims", new_claim_dict)
     return result
 
 
 @app.post("/policy")
 async def add_new_policy(policy: Policy):
+    return await commit_queue.execute(_add_new_policy, policy)
 
-    policies_df: pd.DataFrame = get_data(sheet_name="Policies")
 
-    if (policies_df.to_numpy()[policies_df["HAN"].to_numpy() == policy.HAN]).size > 0:
+def _add_new_policy(policy: Policy):
+    if store.exists("Policies", policy.HAN):
         return {"error": "HAN number already exists."}
-    if (
-        policies_df.to_numpy()[
-            policies_df["Policy Name"].to_numpy() == policy.PolicyName
-        ]
-    ).size > 0:
+    if not store.find_by("Policies", "Policy Name", policy.PolicyName).empty:
         return {"error": "Policy Name already exists."}
 
     if policy.HAN.strip(" ") == "" or policy.PolicyName.strip(" ") == "":
@@ -170,165 +489,221 @@ async def add_new_policy(policy: Policy):
         "Policy Name": policy.PolicyName,
     }
 
-    policies_df.loc[len(policies_df)] = new_policy_dict
-    result = save_data(policies_df, sheet_name="Policies")
+    result = store.insert("Policies", new_policy_dict)
     return result
 
 
+async def read_upload(request: Request) -> pd.DataFrame:
+    """Streams the request body into a spooled file and parses it on the I/O threads."""
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        return await io_executor.run(
+            read_records, upload, request.headers.get("content-type", "")
+        )
+
+
+async def bulk_insert(sheet_name: str, request: Request) -> dict:
+    try:
+        records: pd.DataFrame = await read_upload(request)
+    except ValueError as e:
+        return {"status": 400, "message": f"Invalid upload: {e}"}
+    return await commit_queue.execute(ingest, store, sheet_name, records)
+
+
+@app.post("/accounts")
+async def add_new_customers(request: Request) -> dict:
+    """Inserts many accounts in one write.
+
+    The body is a JSON array, NDJSON or CSV (see the Content-Type header) of
+    records with the fields of POST /account/. Invalid records are skipped and
+    reported by their position in the upload.
+    """
+    return await bulk_insert("Accounts", request)
+
+
+@app.post("/claims")
+async def add_new_claims_bulk(request: Request) -> dict:
+    """Inserts many claims in one write, see POST /accounts."""
+    return await bulk_insert("Claims", request)
+
+
+@app.post("/policies")
+async def add_new_policies(request: Request) -> dict:
+    """Inserts many policies in one write, see POST /accounts."""
+    return await bulk_insert("Policies", request)
+
+
 @app.delete("/account/{account_id}")
-def delete_accounts(account_id: str):
-    accounts_df: pd.DataFrame = get_data(sheet_name="Accounts")
+async def delete_accounts(account_id: str):
+    return await commit_queue.execute(_delete_accounts, account_id)
 
-    if not any(accounts_df["AccountId"].to_numpy() == account_id):
+
+def _delete_accounts(account_id: str):
+    if not store.exists("Accounts", account_id):
         return {"error": "Account not found."}
 
-    idx = (accounts_df["AccountId"].to_numpy() == account_id).argmax()
-    accounts_df.drop(idx, inplace=True)
-    result = save_data(accounts_df, sheet_name="Accounts")
+    result = store.delete("Accounts", account_id)
     return result
 
 
 @app.delete("/claim/{claim_id}")
-def delete_claims(claim_id: str):
-    claims_df: pd.DataFrame = get_data(sheet_name="Claims")
+async def delete_claims(claim_id: str):
+    return await commit_queue.execute(_delete_claims, claim_id)
+
 
-    if not any(claims_df["Id"].to_numpy() == claim_id):
+def _delete_claims(claim_id: str):
+    if not store.exists("Claims", claim_id):
         return {"error": "Claim not found."}
 
-    idx = (claims_df["Id"].to_numpy() == claim_id).argmax()
-    claims_df.drop(idx, inplace=True)
-    result = save_data(claims_df, sheet_name="Claims")
+    result = store.delete("Claims", claim_id)
     return result
 
 
 @app.delete("/policy/{han_number}")
-def delete_poicy(han_number: str):
-    policies_df: pd.DataFrame = get_data(sheet_name="Policies")
+async def delete_poicy(han_number: str):
+    return await commit_queue.execute(_delete_poicy, han_number)
+
 
-    if not any(policies_df["HAN"].to_numpy() == han_number):
+def _delete_poicy(han_number: str):
+    if not store.exists("Policies", han_number):
         return {"error": "Policy not found."}
 
-    idx = (policies_df["HAN"].to_numpy() == han_number).argmax()
-    policies_df.drop(idx, inplace=True)
-    result = save_data(policies_df, sheet_name="Policies")
+    result = store.delete("Policies", han_number)
+    return result
+
+
+class CustomerUpdate(Customer):
+    account_id: str
+
+
+class ClaimUpdate(Claim):
+    claim_id: str
+
+
+class PolicyUpdate(Policy):
+    han_number: str
+
+
+# Request fields named differently from their sheet column.
+COLUMN_NAMES: dict[str, str] = {"PolicyName": "Policy Name"}
+
+
+def get_changes(model: BaseModel, exclude: set[str] | None = None) -> dict:
+    """Returns the fields the client actually sent, keyed by sheet column.
+
+    Fields left out or sent as null are not changes, and neither are the
+    "string" and 0 placeholders of the generated docs.
+    """
+    fields: dict = model.model_dump(
+        exclude_unset=True, exclude_none=True, exclude=exclude
+    )
+    return {
+        COLUMN_NAMES.get(field, field): value
+        for field, value in fields.items()
+        if value != "string" and value != 0
+    }
+
+
+def _patch(sheet_name: str, key: str, changes: dict) -> dict:
+    """Applies the changes to one row in a single write and records their audit rows.
+
+    Runs on the commit queue's writer, so the audit rows are written once the
+    change is committed, even if the request is cancelled meanwhile, and never
+    for a change that is rolled back.
+    Params:
+        sheet_name(str): Sheet holding the row.
+        key(str): Primary key of the row.
+        changes(dict): Column to new value mapping, see `get_changes`.
+    Returns:
+        dict: Success or error message, with the updated row under "data".
+    """
+    if not changes:
+        return {"message": "Nothing to modify"}
+
+    result: dict = store.patch(sheet_name, key, changes)
+    if result["status"] != 200:
+        return result
+
+    for column, (old_value, new_value) in result.pop("changes").items():
+        commit_queue.after_commit(
+            audit_log.write_log,
+            sheet_name=sheet_name,
+            id=key,
+            column_name=column,
+            old_value=old_value,
+            new_value=new_value,
+        )
+    logger.info(f"{sheet_name} sheet modified successfully")
     return result
 
 
+def _patch_many(sheet_name: str, updates: list[tuple[str, dict]]) -> list[dict]:
+    """Applies `_patch` to every (key, changes) pair, returning one result per pair."""
+    return [_patch(sheet_name, key, changes) for key, changes in updates]
+
+
 @app.put("/account/{account_id}")
 async def update_account(account_id: str, customer: Customer):
-    accounts_df: pd.DataFrame = get_data(sheet_name="Accounts")
-    if not any(accounts_df["AccountId"].to_numpy() == account_id):
-        return {"error": "Account Not Found."}
+    return await commit_queue.execute(_update_account, account_id, customer)
 
-    log_file = Log()
 
-    try:
-        idx = (accounts_df["AccountId"].to_numpy() == account_id).argmax()
-        row_to_modify = (accounts_df.iloc[idx, :]).copy()
-
-        for col, new_value in customer.model_dump().items():
-            if new_value != "string" and new_value != 0:
-                old_val = row_to_modify[col]
-                row_to_modify[col] = new_value
-                accounts_df.iloc[idx, :] = row_to_modify
-                result = save_data(accounts_df, sheet_name="Accounts")
-                if result["status"] == 500:
-                    return result
-
-                log_file.write_log(
-                    sheet_name="Accounts",
-                    id=account_id,
-                    column_name=col,
-                    old_value=old_val,
-                    new_value=new_value,
-                )
-    except Exception as e:
-        logger.error(f"Error:  {e}")
-    else:
-        logger.info("Accounts sheet modified successfully")
-        return {"status": 200, "message": "success"}
+def _update_account(account_id: str, customer: Customer):
+    if not store.exists("Accounts", account_id):
+        return {"error": "Account Not Found."}
+
+    return _patch("Accounts", account_id, get_changes(customer))
 
 
 @app.put("/policy/{han_number}")
 async def update_policy(han_number: str, policy: Policy):
-    policies_df: pd.DataFrame = get_data(sheet_name="Policies")
+    return await commit_queue.execute(_update_policy, han_number, policy)
 
-    if not any(policies_df["HAN"].to_numpy() == han_number):
-        return {"error": "Policy not found."}
 
-    log_file = Log()
-    flag: bool = True
+def _update_policy(han_number: str, policy: Policy):
+    if not store.exists("Policies", han_number):
+        return {"error": "Policy not found."}
 
-    try:
-        idx = (policies_df["HAN"].to_numpy() == han_number).argmax()
-        row_to_modify = policies_df.iloc[idx, :]
-
-        for col, new_value in policy.model_dump().items():
-            if col == "PolicyName":
-                col = "Policy Name"
-            if new_value != "string" and new_value != 0:
-                flag = False
-                old_val = row_to_modify[col]
-                row_to_modify[col] = new_value
-                policies_df[idx] = row_to_modify
-                result = save_data(policies_df, sheet_name="Policies")
-                if result["status"] == 500:
-                    return result
-
-                log_file.write_log(
-                    sheet_name="Policies",
-                    id=han_number,
-                    column_name=col,
-                    old_value=old_val,
-                    new_value=new_value,
-                )
-    except Exception as e:
-        logger.error(f"Error:  {e}")
-    else:
-        if flag:
-            return {"message": "Nothing to modify"}
-        else:
-            logger.info("Policies sheet modified successfully")
-            return {"status": 200, "message": "success"}
+    return _patch("Policies", han_number, get_changes(policy))
 
 
 @app.put("/claim/{claim_id}")
 async def update_claim(claim_id: str, claim: Claim):
-    claims_df: pd.DataFrame = get_data(sheet_name="Claims")
+    return await commit_queue.execute(_update_claim, claim_id, claim)
 
-    if not any(claims_df["Id"].to_numpy() == claim_id):
+
+def _update_claim(claim_id: str, claim: Claim):
+    if not store.exists("Claims", claim_id):
         return {"error": "Claim not found."}
 
-    log_file = Log()
-    flag: bool = True
+    return _patch("Claims", claim_id, get_changes(claim))
 
-    try:
-        idx = (claims_df["Id"].to_numpy() == claim_id).argmax()
-        row_to_modify = claims_df.iloc[idx, :]
-
-        for col, new_value in claim.model_dump().items():
-            if new_value != "string" and new_value != 0:
-                flag = False
-                old_val = row_to_modify[col]
-                row_to_modify[col] = new_value
-                claims_df[idx] = row_to_modify
-                result = save_data(claims_df, sheet_name="Claims")
-                if result["status"] == 500:
-                    return result
-
-                log_file.write_log(
-                    sheet_name="Claims",
-                    id=claim_id,
-                    column_name=col,
-                    old_value=old_val,
-                    new_value=new_value,
-                )
-    except Exception as e:
-        logger.error(f"Error:  {e}")
-    else:
-        if flag:
-            return {"message": "Nothing to modify"}
-        else:
-            logger.info("Claims sheet modified successfully")
-            return {"status": 200, "message": "success"}
-            return {"status": 200, "message": "success"}
+
+@app.put("/accounts")
+async def update_accounts(customers: list[CustomerUpdate]) -> list[dict] | dict:
+    """Updates many accounts in one commit, returning one result per account."""
+    updates: list[tuple[str, dict]] = [
+        (customer.account_id, get_changes(customer, exclude={"account_id"}))
+        for customer in customers
+    ]
+    return await commit_queue.execute(_patch_many, "Accounts", updates)
+
+
+@app.put("/policies")
+async def update_policies(policies: list[PolicyUpdate]) -> list[dict] | dict:
+    """Updates many policies in one commit, returning one result per policy."""
+    updates: list[tuple[str, dict]] = [
+        (policy.han_number, get_changes(policy, exclude={"han_number"}))
+        for policy in policies
+    ]
+    return await commit_queue.execute(_patch_many, "Policies", updates)
+
+
+@app.put("/claims")
+async def update_claims(claims: list[ClaimUpdate]) -> list[dict] | dict:
+    """Updates many claims in one commit, returning one result per claim."""
+    updates: list[tuple[str, dict]] = [
+        (claim.claim_id, get_changes(claim, exclude={"claim_id"})) for claim in claims
+    ]
+    return await commit_queue.execute(_patch_many, "Claims", updates)
@@ -1,2 +1,7 @@
 from pathlib import Path
-CLEAN_DATA_PATH: Path = Path(".").resolve() / "data" / "cleaned" / "cleaned.xlsx"
\ No newline at end of file
+
+CLEAN_DATA_DIR: Path = Path(".").resolve() / "data" / "cleaned"
+CLEAN_DATA_PATH: Path = CLEAN_DATA_DIR / "cleaned.xlsx"
+WAL_DIR: Path = Path(".").resolve() / "data" / "wal"
+LOG_DIR: Path = Path(".").resolve() / "data" / "logs"
+SNAPSHOT_DIR: Path = Path(".").resolve() / "data" / "shared"
@@ -0,0 +1,198 @@
+import bisect
+import heapq
+import itertools
+import re
+import threading
+from collections import Counter
+from typing import Any, Hashable
+
+import pandas as pd
+from loguru import logger
+
+from config import SEARCH_MAX_EXPANSIONS, SEARCH_MAX_POSTINGS, SEARCH_MIN_SIMILARITY
+
+# Account columns whose words are searchable.
+SEARCH_COLUMNS: list[str] = ["Name", "City", "State", "Pincode"]
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(value: Any) -> list[str]:
+    """Splits a value into lower case words. Whole floats, such as a Pincode
+    read from a column with gaps, count as integers."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return []
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return WORD_PATTERN.findall(str(value).lower())
+
+
+def trigrams(word: str) -> set[str]:
+    padded: str = f"${word}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class AccountSearch:
+    def __init__(
+        self,
+        max_expansions: int = SEARCH_MAX_EXPANSIONS,
+        min_similarity: float = SEARCH_MIN_SIMILARITY,
+        max_postings: int = SEARCH_MAX_POSTINGS,
+    ):
+        """Inverted index of the words of the accounts' `SEARCH_COLUMNS`.
+
+        Every distinct word maps to the accounts holding it. Words are also kept
+        in a sorted list, so a prefix is a binary search, and indexed by their
+        trigrams, so a misspelled word finds the words it shares most trigrams
+        with. Lookups only touch the words and accounts that match, never the
+        whole table, and read at most `max_postings` accounts, see `search`.
+        As a listener it follows every account insert, update and delete.
+        """
+        self.max_expansions: int = max_expansions
+        self.min_similarity: float = min_similarity
+        self.max_postings: int = max_postings
+        self._documents: dict[Hashable, set[str]] = {}
+        self._postings: dict[str, set[Hashable]] = {}
+        self._words: list[str] = []
+        self._trigrams: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def build(self, tables: dict[str, pd.DataFrame]) -> None:
+        accounts_df: pd.DataFrame = tables["Accounts"]
+        with self._lock:
+            self._documents = {}
+            self._postings = {}
+            self._words = []
+            self._trigrams = {}
+            for account_id, *values in zip(
+                accounts_df["AccountId"].tolist(),
+                *(accounts_df[column].tolist() for column in SEARCH_COLUMNS),
+            ):
+                self._add(account_id, values, keep_sorted=False)
+            self._words.sort()
+        logger.info(f"Search index built over {len(self._words)} words.")
+
+    def publish(self, version: int) -> None:
+        pass
+
+    def apply(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> None:
+        if sheet_name != "Accounts":
+            return
+        with self._lock:
+            if old_row is not None:
+                self._remove(old_row["AccountId"])
+            if new_row is not None:
+                self._add(
+                    new_row["AccountId"],
+                    [new_row.get(column) for column in SEARCH_COLUMNS],
+                )
+
+    def search(self, query: str, limit: int) -> list[tuple[Hashable, float]]:
+        """Returns up to `limit` (AccountId, score) pairs, best first.
+
+        Each query word scores an account by its best matching word: 1 for the
+        same word, between 0.5 and 1 for a word it is a prefix of, and up to 0.5
+        for a similar word. Accounts matching more query words rank first, then
+        by total score.
+
+        Matched words are read rarest first, until `max_postings` accounts
+        are collected. A word holding more accounts than are left only adds
+        its score to the accounts already collected, a word no account was
+        collected for yet gives the first ones it holds.
+        """
+        terms: list[str] = list(dict.fromkeys(tokenize(query)))
+        # (term position, score, accounts) of every matched word, copied under
+        # the lock so the scoring and ranking below run without it.
+        hits: list[tuple[int, float, list[Hashable]]] = []
+        with self._lock:
+            matches: list[tuple[int, str, float]] = sorted(
+                (
+                    (position, word, score)
+                    for position, term in enumerate(terms)
+                    for word, score in self._matches(term).items()
+                ),
+                key=lambda match: len(self._postings[match[1]]),
+            )
+            collected: set[Hashable] = set()
+            budget: int = self.max_postings
+            for position, word, score in matches:
+                postings: set[Hashable] = self._postings[word]
+                if len(postings) <= budget or not collected:
+                    account_ids: list[Hashable] = list(
+                        itertools.islice(postings, budget)
+                    )
+                    budget -= len(account_ids)
+                    collected.update(account_ids)
+                else:
+                    account_ids = [
+                        account_id for account_id in collected if account_id in postings
+                    ]
+                hits.append((position, score, account_ids))
+
+        scores: dict[Hashable, list[float]] = {}
+        for position, score, account_ids in hits:
+            for account_id in account_ids:
+                account_scores: list[float] = scores.setdefault(
+                    account_id, [0.0] * len(terms)
+                )
+                account_scores[position] = max(account_scores[position], score)
+        ranked = heapq.nlargest(
+            limit,
+            scores.items(),
+            key=lambda item: (sum(score > 0 for score in item[1]), sum(item[1])),
+        )
+        return [
+            (account_id, round(sum(term_scores), 4))
+            for account_id, term_scores in ranked
+        ]
+
+    def _matches(self, term: str) -> dict[str, float]:
+        matches: dict[str, float] = {}
+        start: int = bisect.bisect_left(self._words, term)
+        for word in self._words[start : start + self.max_expansions]:
+            if not word.startswith(term):
+                break
+            matches[word] = 0.5 + 0.5 * len(term) / len(word)
+
+        term_trigrams: set[str] = trigrams(term)
+        shared: Counter = Counter()
+        for trigram in term_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+        for word, count in shared.most_common(self.max_expansions):
+            similarity: float = 2 * count / (len(term_trigrams) + len(trigrams(word)))
+            if similarity >= self.min_similarity and word not in matches:
+                matches[word] = 0.5 * similarity
+        return matches
+
+    def _add(
+        self, account_id: Hashable, values: list[Any], keep_sorted: bool = True
+    ) -> None:
+        words: set[str] = {word for value in values for word in tokenize(value)}
+        self._documents[account_id] = words
+        for word in words:
+            postings: set[Hashable] | None = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = set()
+                if keep_sorted:
+                    bisect.insort(self._words, word)
+                else:
+                    self._words.append(word)
+                for trigram in trigrams(word):
+                    self._trigrams.setdefault(trigram, set()).add(word)
+            postings.add(account_id)
+
+    def _remove(self, account_id: Hashable) -> None:
+        for word in self._documents.pop(account_id, set()):
+            postings: set[Hashable] = self._postings[word]
+            postings.discard(account_id)
+            if postings:
+                continue
+            del self._postings[word]
+            del self._words[bisect.bisect_left(self._words, word)]
+            for trigram in trigrams(word):
+                words: set[str] = self._trigrams[trigram]
+                words.discard(word)
+                if not words:
+                    del self._trigrams[trigram]
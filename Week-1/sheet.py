@@ -0,0 +1,111 @@
+import copy
+
+import pandas as pd
+
+from columns import SECONDARY_KEYS, TIME_KEYS
+from data import PRIMARY_KEYS, to_native
+from index import MultiIndex, TimeIndex, UniqueIndex
+from table import ChunkedTable
+
+
+class Sheet:
+    def __init__(self, name: str, data: pd.DataFrame):
+        """The rows of one sheet and the indexes kept on them.
+
+        Rows are held in a `ChunkedTable` and addressed by the label they get
+        on insert, which only grows. A hash index on the primary key (see
+        `PRIMARY_KEYS`) and one per secondary key in `SECONDARY_KEYS` find
+        them without scanning a column, and a sheet with a `TIME_KEYS` entry
+        gets a time index per group. `insert`, `insert_many`, `update` and
+        `delete` keep the table and every index in step, they do not check
+        keys, the store does.
+        """
+        self.name: str = name
+        self.table: ChunkedTable = ChunkedTable(data)
+        self.next_label: int = len(data)
+        self.primary: UniqueIndex = UniqueIndex(PRIMARY_KEYS[name])
+        self.secondary: dict[str, MultiIndex] = {
+            column: MultiIndex(column) for column in SECONDARY_KEYS[name]
+        }
+        time_column, groups = TIME_KEYS.get(name, (None, []))
+        self.time: dict[str | None, TimeIndex] = {
+            group: TimeIndex(time_column, group) for group in groups
+        }
+        for index in [self.primary, *self.secondary.values(), *self.time.values()]:
+            index.build(data)
+
+    def insert(self, row: dict) -> int:
+        """Appends a row encoded by `encode_row` and returns its label."""
+        label: int = self.next_label
+        self.next_label += 1
+        self.table.append_row(label, row)
+        self._add(row, label)
+        return label
+
+    def insert_many(self, rows_df: pd.DataFrame) -> list[dict]:
+        """Appends the rows of a frame encoded by `encode_rows`, relabelled
+        after the existing ones, and returns them as dicts of native values."""
+        rows_df.index = pd.RangeIndex(self.next_label, self.next_label + len(rows_df))
+        rows: list[dict] = [
+            {column: to_native(value) for column, value in row.items()}
+            for row in rows_df.to_dict(orient="records")
+        ]
+        self.next_label += len(rows_df)
+        self.table.append(rows_df)
+        for label, row in zip(rows_df.index.tolist(), rows):
+            self._add(row, label)
+        return rows
+
+    def update(self, label: int, old_row: dict, changes: dict) -> None:
+        """Sets columns of the row with the given label, `old_row` being the row before."""
+        for column, index in self.secondary.items():
+            if column in changes:
+                index.remove(old_row[column], label)
+                index.add(changes[column], label)
+        for index in self.time.values():
+            if index.column in changes or index.group_column in changes:
+                index.remove(old_row, label)
+                index.add({**old_row, **changes}, label)
+        key_column: str = self.primary.column
+        if key_column in changes and changes[key_column] != old_row[key_column]:
+            self.primary.remove(old_row[key_column], label)
+            self.primary.add(changes[key_column], label)
+        self.table.update(label, changes)
+
+    def delete(self, label: int, old_row: dict) -> None:
+        """Removes the row with the given label, `old_row` being that row."""
+        for column, index in self.secondary.items():
+            index.remove(old_row[column], label)
+        for index in self.time.values():
+            index.remove(old_row, label)
+        self.primary.remove(old_row[self.primary.column], label)
+        self.table.drop(label)
+
+    def freeze(self) -> "Sheet":
+        """Returns the sheet as it is now. Later changes leave it untouched,
+        and it shares every chunk and index shard they do not touch."""
+        frozen: Sheet = copy.copy(self)
+        frozen.table = self.table.freeze()
+        frozen.primary = self.primary.freeze()
+        frozen.secondary = {
+            column: index.freeze() for column, index in self.secondary.items()
+        }
+        frozen.time = {group: index.freeze() for group, index in self.time.items()}
+        return frozen
+
+    def rollback(self, frozen: "Sheet") -> None:
+        """Drops every change made since `freeze` returned `frozen`."""
+        self.next_label = frozen.next_label
+        self.table.rollback(frozen.table)
+        self.primary.rollback(frozen.primary)
+        for column, index in self.secondary.items():
+            index.rollback(frozen.secondary[column])
+        for group, index in self.time.items():
+            index.rollback(frozen.time[group])
+
+    def _add(self, row: dict, label: int) -> None:
+        self.primary.add(row[self.primary.column], label)
+        for column, index in self.secondary.items():
+            index.add(row[column], label)
+        for index in self.time.values():
+            index.add(row, label)
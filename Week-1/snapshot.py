@@ -0,0 +1,223 @@
+import bisect
+import threading
+from typing import Hashable, Iterator, Mapping
+
+import pandas as pd
+
+from index import MultiIndex, TimeIndex, UniqueIndex
+from sheet import Sheet
+from table import ChunkedTable
+from view import MergedView, join_row
+
+
+class Frames(Mapping):
+    def __init__(self, sheets: Mapping[str, Sheet]):
+        """The sheets of a snapshot as whole frames, each concatenated on first
+        use and kept for the life of the snapshot."""
+        self._sheets: Mapping[str, Sheet] = sheets
+        self._frames: dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, sheet_name: str) -> pd.DataFrame:
+        sheet_df: pd.DataFrame | None = self._frames.get(sheet_name)
+        if sheet_df is None:
+            with self._lock:
+                sheet_df = self._frames.get(sheet_name)
+                if sheet_df is None:
+                    sheet_df = self._sheets[sheet_name].table.frame()
+                    self._frames[sheet_name] = sheet_df
+        return sheet_df
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sheets)
+
+    def __len__(self) -> int:
+        return len(self._sheets)
+
+
+class Snapshot:
+    def __init__(
+        self,
+        version: int,
+        sheets: Mapping[str, Sheet],
+        sequence: int = 0,
+        view: MergedView | None = None,
+    ):
+        """The sheets and their indexes as they were when version `version`
+        was published, with the merged `view` of that version.
+
+        `sequence` is the number of changes the store had published at that
+        point, see `TableStore.sequence`.
+
+        A snapshot is never modified once created, so any number of threads
+        can read it without taking a lock while the writer prepares the next
+        version. Versions share every chunk and index shard nobody wrote to in
+        between, see `ChunkedTable` and `VersionedMap`. A version is freed as
+        soon as the last reader holding it lets go.
+        """
+        self.version: int = version
+        self.sequence: int = sequence
+        self._sheets: Mapping[str, Sheet] = sheets
+        self.tables: Mapping[str, pd.DataFrame] = Frames(sheets)
+        self.view: MergedView = view if view is not None else MergedView()
+
+    def table(self, sheet_name: str) -> ChunkedTable:
+        return self._sheets[sheet_name].table
+
+    def exists(self, sheet_name: str, key) -> bool:
+        return key in self._sheets[sheet_name].primary
+
+    def label(self, sheet_name: str, key) -> int | None:
+        """Returns the label of the row with the given primary key."""
+        return self._sheets[sheet_name].primary.get(key)
+
+    def labels(self, sheet_name: str, column: str, key) -> tuple[int, ...]:
+        """Returns the sorted labels of the rows whose secondary key `column` equals `key`."""
+        return self._sheets[sheet_name].secondary[column].get(key)
+
+    def rows(self, sheet_name: str, labels: list[int]) -> list[dict]:
+        return self.table(sheet_name).rows(labels)
+
+    def contains(
+        self, sheet_name: str, keys: pd.Series, column: str | None = None
+    ) -> pd.Series:
+        """See `TableStore.contains`."""
+        index: UniqueIndex | MultiIndex = (
+            self._sheets[sheet_name].primary
+            if column is None
+            else self._sheets[sheet_name].secondary[column]
+        )
+        return pd.Series(
+            [key in index for key in keys.tolist()], index=keys.index, dtype=bool
+        )
+
+    def page(
+        self, sheet_name: str, cursor: int | None, limit: int
+    ) -> tuple[list[dict], int | None]:
+        """See `TableStore.page`."""
+        return self.table(sheet_name).page(cursor, limit)
+
+    def between(
+        self,
+        sheet_name: str,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        cursor: str | None,
+        limit: int,
+    ) -> tuple[list[dict], int, str | None]:
+        """See `TableStore.between`."""
+        index: TimeIndex = self._sheets[sheet_name].time[None]
+        after: tuple[int, int] | None = (
+            None if cursor is None else tuple(map(int, cursor.split(":")))
+        )
+        entries, count = index.between(start, end, after=after, limit=limit)
+        rows: list[dict] = self.rows(sheet_name, [label for _, label in entries])
+        next_cursor: str | None = (
+            f"{entries[-1][0]}:{entries[-1][1]}" if count > len(entries) else None
+        )
+        return rows, count, next_cursor
+
+    def latest(
+        self, sheet_name: str, group_column: str, value, count: int
+    ) -> list[dict]:
+        """See `TableStore.latest`."""
+        index: TimeIndex = self._sheets[sheet_name].time[group_column]
+        return self.rows(sheet_name, index.latest(count, value))
+
+    def labels_after(
+        self,
+        sheet_name: str,
+        column: str,
+        value: Hashable,
+        cursor: int | None,
+        limit: int,
+    ) -> tuple[list[int], int | None]:
+        """Returns up to `limit` labels of the rows where `column` equals `value`,
+        after the cursor, and the cursor of the next page."""
+        labels: tuple[int, ...] = self.labels(sheet_name, column, value)
+        start: int = 0 if cursor is None else bisect.bisect_right(labels, cursor)
+        page_labels: list[int] = list(labels[start : start + limit])
+        next_cursor: int | None = (
+            page_labels[-1] if start + limit < len(labels) else None
+        )
+        return page_labels, next_cursor
+
+    def account_page(
+        self, account_id: str, cursor: int | None, limit: int
+    ) -> tuple[list[dict] | None, int | None]:
+        """See `TableStore.account_page`."""
+        label: int | None = self.label("Accounts", account_id)
+        if label is None:
+            return None, None
+        page_labels, next_cursor = self.labels_after(
+            "Claims", "AccountId", account_id, cursor, limit
+        )
+        if cursor is not None and not page_labels:
+            return [], None
+        account: dict = self.rows("Accounts", [label])[0]
+        return self.join([account], page_labels), next_cursor
+
+    def merged_page(
+        self, cursor: int | None, limit: int
+    ) -> tuple[list[dict], int | None]:
+        """See `TableStore.merged_page`."""
+        accounts, next_cursor = self.page("Accounts", cursor, limit)
+        claim_labels: list[int] = sorted(
+            label
+            for account in accounts
+            for label in self.labels("Claims", "AccountId", account["AccountId"])
+        )
+        return self.join(accounts, claim_labels), next_cursor
+
+    def join(self, accounts: list[dict], claim_labels: list[int]) -> list[dict]:
+        """Joins accounts with the claims among `claim_labels` and their
+        policies like the merged view does. Accounts without any of those
+        claims get one row without a claim."""
+        claims: list[dict] = self.rows("Claims", claim_labels)
+        policy_labels: list[int] = [
+            label
+            for label in {
+                self.label("Policies", han) for han in {c["HAN"] for c in claims}
+            }
+            if label is not None
+        ]
+        policy_names: dict = {
+            policy["HAN"]: policy["Policy Name"]
+            for policy in self.rows("Policies", policy_labels)
+        }
+        claims_by_account: dict[str, list[dict]] = {}
+        for claim in claims:
+            claims_by_account.setdefault(claim["AccountId"], []).append(claim)
+
+        account_columns: list[str] = self.table("Accounts").columns.tolist()
+        claim_columns: list[str] = [
+            column for column in self.table("Claims").columns if column != "AccountId"
+        ]
+        rows: list[dict] = []
+        for account in accounts:
+            for claim in claims_by_account.get(account["AccountId"]) or [None]:
+                policy_name = None if claim is None else policy_names.get(claim["HAN"])
+                rows.append(
+                    join_row(
+                        account_columns, claim_columns, account, claim, policy_name
+                    )
+                )
+        return rows
+
+    def memory_report(self) -> dict:
+        """See `TableStore.memory_report`."""
+        report: dict = {}
+        for sheet_name, sheet_df in self.tables.items():
+            usage: pd.Series = sheet_df.memory_usage(index=True, deep=True)
+            report[sheet_name] = {
+                "rows": len(sheet_df),
+                "bytes": int(usage.sum()),
+                "columns": {
+                    column: {
+                        "dtype": str(sheet_df[column].dtype),
+                        "bytes": int(usage[column]),
+                    }
+                    for column in sheet_df.columns
+                },
+            }
+        return report
@@ -1,7 +1,10 @@
+import threading
 import time
+from contextlib import contextmanager
 
 import mysql.connector
 from loguru import logger
+from mysql.connector.pooling import MySQLConnectionPool
 
 
 def connect_to_mysql(config, attempts=3, delay=2):
@@ -23,3 +26,69 @@ def connect_to_mysql(config, attempts=3, delay=2):
             time.sleep(delay**attempt)
             attempt += 1
     return None
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        config: dict,
+        pool_size: int = 5,
+        pool_name: str = "bfhl",
+        timeout: float = 10,
+        attempts: int = 3,
+        delay: int = 2,
+    ):
+        """A bounded pool of MySQL connections that are health checked before reuse.
+
+        At most `pool_size` connections are handed out at once; further callers
+        wait up to `timeout` seconds for one to be returned.
+        """
+        self.pool_size: int = pool_size
+        self.timeout: float = timeout
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._pool: MySQLConnectionPool = self._create_pool(
+            config, pool_size, pool_name, attempts, delay
+        )
+
+    @staticmethod
+    def _create_pool(
+        config: dict, pool_size: int, pool_name: str, attempts: int, delay: int
+    ) -> MySQLConnectionPool:
+        attempt = 1
+        # Same progressive reconnect routine as connect_to_mysql.
+        while True:
+            try:
+                return MySQLConnectionPool(
+                    pool_name=pool_name,
+                    pool_size=pool_size,
+                    pool_reset_session=True,
+                    **config,
+                )
+            except (mysql.connector.Error, IOError) as err:
+                if attempt >= attempts:
+                    logger.error(f"Failed to create the connection pool: {err}")
+                    raise
+                logger.info(
+                    f"Connection failed: {err}. Retrying ({attempt}/{attempts-1})...",
+                )
+                time.sleep(delay**attempt)
+                attempt += 1
+
+    @contextmanager
+    def connection(self):
+        """Borrows a live connection and returns it to the pool afterwards."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise mysql.connector.errors.PoolError(
+                f"No connection available after {self.timeout} seconds."
+            )
+        try:
+            connection = self._pool.get_connection()
+            try:
+                # Health check: reconnects a connection the server has dropped.
+                connection.ping(reconnect=True, attempts=3, delay=1)
+                yield connection
+            finally:
+                # Closing a pooled connection hands it back to the pool.
+                connection.close()
+        finally:
+            self._slots.release()
@@ -2,7 +2,7 @@ import os
 
 from dotenv import load_dotenv
 from loguru import logger
-from myconnection import connect_to_mysql
+from myconnection import ConnectionPool
 
 load_dotenv()
 
@@ -15,12 +15,13 @@ def main() -> None:
         "database": "bfhl",
     }
     account_id: str = "0012j00000GjoGnAAJ"
-    connection = connect_to_mysql(config)
-    if connection and connection.is_connected():
-        with connection.cursor() as cursor:
+    pool = ConnectionPool(config, pool_size=1)
+    with pool.connection() as connection:
+        # Prepared statement: account_id is sent as a parameter, never spliced into the SQL.
+        with connection.cursor(prepared=True) as cursor:
             try:
-                result = cursor.execute(
-                    f"""
+                cursor.execute(
+                    """
                         SELECT 
                             t.AccountId, t.Name, t.Age, t.City, t.State, t.Pincode,
                             t.Id, t.CreatedDate, t.CaseNumber, t.HAN, t.BillAmount, t.Status,
@@ -34,9 +35,10 @@ def main() -> None:
                         ON a.AccountId = c.AccountId) as t
                         LEFT JOIN bfhl.policies as p
                         ON t.HAN = p.HAN
-                        WHERE t.AccountId = "{account_id}"
+                        WHERE t.AccountId = %s
                         LIMIT 2
-                        """
+                        """,
+                    (account_id,),
                 )
             except Exception as e:
                 logger.error(e)
@@ -44,9 +46,6 @@ def main() -> None:
                 rows = cursor.fetchall()
                 for rows in rows:
                     print(rows)
-                connection.close()
-    else:
-        print("Could not connect")
 
 
 if __name__ == "__main__":
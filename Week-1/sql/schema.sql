@@ -0,0 +1,26 @@
+CREATE TABLE IF NOT EXISTS accounts (
+    AccountId VARCHAR(64) NOT NULL PRIMARY KEY,
+    Name VARCHAR(255),
+    Age INT,
+    City VARCHAR(100),
+    State VARCHAR(100),
+    Pincode INT
+);
+
+CREATE TABLE IF NOT EXISTS claims (
+    Id VARCHAR(64) NOT NULL PRIMARY KEY,
+    CreatedDate DATETIME(6),
+    CaseNumber VARCHAR(64),
+    HAN VARCHAR(64),
+    BillAmount DOUBLE,
+    Status VARCHAR(20),
+    AccountId VARCHAR(64),
+    INDEX idx_claims_account (AccountId),
+    INDEX idx_claims_han (HAN),
+    INDEX idx_claims_created (CreatedDate)
+);
+
+CREATE TABLE IF NOT EXISTS policies (
+    HAN VARCHAR(64) NOT NULL PRIMARY KEY,
+    `Policy Name` VARCHAR(255)
+);
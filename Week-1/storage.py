@@ -0,0 +1,362 @@
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import pandas as pd
+from loguru import logger
+
+from config import MYSQL_CONFIG, MYSQL_POOL_SIZE, STORAGE_BACKEND
+from data import PRIMARY_KEYS, SHEETS, to_native, unknown_sheet_error
+from path import CLEAN_DATA_DIR, CLEAN_DATA_PATH
+
+SQL_SCHEMA_PATH: Path = Path(__file__).resolve().parent / "sql" / "schema.sql"
+SQL_TABLES: dict[str, str] = {
+    "Accounts": "accounts",
+    "Claims": "claims",
+    "Policies": "policies",
+}
+
+
+class StorageBackend(ABC):
+    """Abstract class for persisting the Accounts, Claims and Policies tables."""
+
+    @abstractmethod
+    def load(self, sheet_name: str) -> pd.DataFrame:
+        """Reads one table. Raises FileNotFoundError when it does not exist."""
+        pass
+
+    @abstractmethod
+    def save(self, data: dict[str, pd.DataFrame]) -> dict:
+        """Writes the given tables and returns a success or error message."""
+        pass
+
+    def replace(self, data: dict[str, pd.DataFrame]) -> dict:
+        """Overwrites the given tables entirely, used for imports and exports."""
+        return self.save(data)
+
+    def build(self, tables: dict[str, pd.DataFrame]) -> None:
+        """Called once the tables are loaded. Row level backends can hook in here."""
+        pass
+
+    def publish(self, version: int) -> None:
+        """Called when a snapshot version is published, before its changes."""
+        pass
+
+    def apply(self, sheet_name: str, old_row: dict | None, new_row: dict | None):
+        """Called for every insert, update and delete made in memory."""
+        pass
+
+
+class ExcelBackend(StorageBackend):
+    """Keeps every table as a sheet of cleaned.xlsx."""
+
+    def __init__(self, path: Path = CLEAN_DATA_PATH):
+        self.path: Path = path
+
+    def load(self, sheet_name: str) -> pd.DataFrame:
+        if not self.path.is_file():
+            raise FileNotFoundError(f"{self.path} not found.")
+        sheet_df: pd.DataFrame = pd.read_excel(self.path, sheet_name=sheet_name)
+        logger.info(f"{sheet_name} sheet imported successfully.")
+        return sheet_df
+
+    def save(self, data: dict[str, pd.DataFrame]) -> dict:
+        unknown_sheets: list[str] = [sheet for sheet in data if sheet not in SHEETS]
+        if unknown_sheets:
+            return unknown_sheet_error(unknown_sheets)
+
+        # The other sheets are carried over from a copy of the current
+        # workbook, which is written in full and then swapped in, so a crash
+        # halfway through leaves the old workbook as it was.
+        temp_path: Path = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            if self.path.is_file():
+                shutil.copyfile(self.path, temp_path)
+                writer = pd.ExcelWriter(temp_path, mode="a", if_sheet_exists="replace")
+            else:
+                writer = pd.ExcelWriter(temp_path)
+            with writer:
+                for sheet_name, sheet_df in data.items():
+                    sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
+            replace_file(temp_path, self.path)
+        except PermissionError:
+            return {
+                "status": 500,
+                "message": "The file is open in another program. Close the file and try again.",
+            }
+        logger.info(f"Data inserted successfully into {list(data.keys())} sheets.")
+        return {"status": 200, "message": "success"}
+
+
+class FileBackend(StorageBackend):
+    """Keeps every table in its own file, so a write only rewrites the dirty tables."""
+
+    suffix: str = ""
+
+    def __init__(self, folder: Path = CLEAN_DATA_DIR):
+        self.folder: Path = folder
+
+    def table_path(self, sheet_name: str) -> Path:
+        return self.folder / f"{sheet_name}{self.suffix}"
+
+    def load(self, sheet_name: str) -> pd.DataFrame:
+        table_path: Path = self.table_path(sheet_name)
+        if not table_path.is_file():
+            raise FileNotFoundError(f"{table_path} not found.")
+        table_df: pd.DataFrame = self._read(table_path)
+        logger.info(f"{sheet_name} table imported successfully from {table_path}.")
+        return table_df
+
+    def save(self, data: dict[str, pd.DataFrame]) -> dict:
+        self.folder.mkdir(parents=True, exist_ok=True)
+        for sheet_name, table_df in data.items():
+            table_path: Path = self.table_path(sheet_name)
+            temp_path: Path = table_path.with_suffix(table_path.suffix + ".tmp")
+            try:
+                self._write(table_df, temp_path)
+                replace_file(temp_path, table_path)
+            except PermissionError:
+                return {
+                    "status": 500,
+                    "message": f"The file {table_path} is open in another program. Close the file and try again.",
+                }
+        logger.info(f"Data inserted successfully into {list(data.keys())} tables.")
+        return {"status": 200, "message": "success"}
+
+    @abstractmethod
+    def _read(self, table_path: Path) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def _write(self, table_df: pd.DataFrame, table_path: Path) -> None:
+        pass
+
+
+class ParquetBackend(FileBackend):
+    """One Parquet file per table, read through a memory map."""
+
+    suffix = ".parquet"
+
+    def _read(self, table_path: Path) -> pd.DataFrame:
+        return pd.read_parquet(table_path, memory_map=True)
+
+    def _write(self, table_df: pd.DataFrame, table_path: Path) -> None:
+        table_df.to_parquet(table_path, index=False)
+
+
+class ArrowBackend(FileBackend):
+    """One uncompressed Arrow IPC file per table, memory mapped on read.
+
+    Columns are read one block each, so numeric, timestamp and categorical
+    code columns without missing values stay views of the mapped file, and
+    every process mapping it shares the same pages. String columns become
+    Python objects of each process."""
+
+    suffix = ".arrow"
+
+    def _read(self, table_path: Path) -> pd.DataFrame:
+        pa = import_pyarrow()
+        with pa.memory_map(str(table_path), "r") as source:
+            return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+
+    def _write(self, table_df: pd.DataFrame, table_path: Path) -> None:
+        pa = import_pyarrow()
+        table = pa.Table.from_pandas(table_df, preserve_index=False)
+        with pa.OSFile(str(table_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+class SQLBackend(StorageBackend):
+    def __init__(self, config: dict = MYSQL_CONFIG, pool_size: int = MYSQL_POOL_SIZE):
+        """Keeps the tables in MySQL and writes only the rows that changed.
+
+        Every insert, update and delete is queued by `apply` and written by
+        `save` as parameterized prepared statements in one transaction, on a
+        connection borrowed from a bounded pool. The statements are
+        idempotent: inserts overwrite an existing row and an update of the key
+        replaces the row, so changes replayed from the write-ahead log after a
+        crash that followed their commit leave the tables as they were.
+        """
+        from sql.myconnection import ConnectionPool
+
+        self.pool = ConnectionPool(config, pool_size=pool_size)
+        self._changes: list[tuple[str, dict | None, dict | None]] = []
+        self._lock = threading.Lock()
+
+    def load(self, sheet_name: str) -> pd.DataFrame:
+        table: str = SQL_TABLES[sheet_name]
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT * FROM {table}")
+                rows: list[tuple] = cursor.fetchall()
+                columns: list[str] = list(cursor.column_names)
+        logger.info(f"{sheet_name} table imported successfully from MySQL.")
+        return pd.DataFrame(rows, columns=columns)
+
+    def apply(self, sheet_name: str, old_row: dict | None, new_row: dict | None):
+        with self._lock:
+            self._changes.append((sheet_name, old_row, new_row))
+
+    def save(self, data: dict[str, pd.DataFrame]) -> dict:
+        with self._lock:
+            changes, self._changes = self._changes, []
+        if not changes:
+            return {"status": 200, "message": "success"}
+
+        try:
+            with self.pool.connection() as connection:
+                try:
+                    with connection.cursor(prepared=True) as cursor:
+                        for sheet_name, old_row, new_row in changes:
+                            for statement, params in self._statements(
+                                sheet_name, old_row, new_row
+                            ):
+                                cursor.execute(statement, params)
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Writing {len(changes)} changes to MySQL failed: {e}")
+            # Put the changes back in front so the next flush retries them in order.
+            with self._lock:
+                self._changes = changes + self._changes
+            return {"status": 500, "message": str(e)}
+
+        logger.info(f"{len(changes)} changes written successfully to MySQL.")
+        return {"status": 200, "message": "success"}
+
+    def replace(self, data: dict[str, pd.DataFrame]) -> dict:
+        try:
+            with self.pool.connection() as connection:
+                try:
+                    with connection.cursor() as cursor:
+                        for statement in SQL_SCHEMA_PATH.read_text().split(";"):
+                            if statement.strip():
+                                cursor.execute(statement)
+                    with connection.cursor(prepared=True) as cursor:
+                        for sheet_name, table_df in data.items():
+                            table: str = SQL_TABLES[sheet_name]
+                            columns: list[str] = table_df.columns.to_list()
+                            cursor.execute(f"DELETE FROM {table}")
+                            cursor.executemany(
+                                self._insert_statement(table, columns),
+                                [
+                                    tuple(to_native(value) for value in row)
+                                    for row in table_df.itertuples(index=False)
+                                ],
+                            )
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Replacing {list(data.keys())} in MySQL failed: {e}")
+            return {"status": 500, "message": str(e)}
+
+        logger.info(f"Data inserted successfully into {list(data.keys())} tables.")
+        return {"status": 200, "message": "success"}
+
+    @staticmethod
+    def _insert_statement(table: str, columns: list[str]) -> str:
+        column_list: str = ", ".join(f"`{column}`" for column in columns)
+        placeholders: str = ", ".join(["%s"] * len(columns))
+        return f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})"
+
+    @staticmethod
+    def _upsert_statement(table: str, columns: list[str]) -> str:
+        assignments: str = ", ".join(
+            f"`{column}` = new.`{column}`" for column in columns
+        )
+        return f"{SQLBackend._insert_statement(table, columns)} AS new ON DUPLICATE KEY UPDATE {assignments}"
+
+    def _statements(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> list[tuple[str, tuple]]:
+        """Builds the prepared statements and their parameters for one change.
+        Running them twice gives the same rows as running them once."""
+        table: str = SQL_TABLES[sheet_name]
+        key_column: str = PRIMARY_KEYS[sheet_name]
+        delete: str = f"DELETE FROM {table} WHERE `{key_column}` = %s"
+
+        if new_row is None:
+            return [(delete, (old_row[key_column],))]
+        if old_row is None or new_row[key_column] != old_row[key_column]:
+            columns: list[str] = list(new_row.keys())
+            upsert: tuple[str, tuple] = (
+                self._upsert_statement(table, columns),
+                tuple(to_native(new_row[column]) for column in columns),
+            )
+            if old_row is None:
+                return [upsert]
+            # A replayed insert may have brought the old key back, drop it.
+            return [(delete, (old_row[key_column],)), upsert]
+
+        changed: list[str] = [
+            column
+            for column in new_row.keys()
+            if new_row[column] != old_row.get(column)
+        ]
+        if not changed:
+            return []
+        assignments: str = ", ".join(f"`{column}` = %s" for column in changed)
+        return [
+            (
+                f"UPDATE {table} SET {assignments} WHERE `{key_column}` = %s",
+                (
+                    *(to_native(new_row[column]) for column in changed),
+                    old_row[key_column],
+                ),
+            )
+        ]
+
+
+def replace_file(temp_path: Path, path: Path) -> None:
+    """Moves a fully written file over `path`. The data is synced to disk
+    first and the rename after, so readers and a restart after a crash
+    either see the old file or the new one, never half of it."""
+    with open(temp_path, "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+    if os.name == "posix":
+        directory: int = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+def import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "The parquet and arrow storage backends need pyarrow. Install it with `pip install pyarrow`."
+        ) from e
+    return pa
+
+
+class StorageBackendFactory:
+    @staticmethod
+    def get_backend(kind: str = STORAGE_BACKEND) -> StorageBackend:
+        """Returns the storage backend for the given kind."""
+
+        if kind not in ["xlsx", "parquet", "arrow", "mysql"]:
+            logger.error(f"Storage backend {kind} not supported.")
+            raise ValueError(f"Storage backend {kind} not supported.")
+
+        match kind:
+            case "xlsx":
+                return ExcelBackend()
+            case "parquet":
+                import_pyarrow()
+                return ParquetBackend()
+            case "arrow":
+                import_pyarrow()
+                return ArrowBackend()
+            case "mysql":
+                return SQLBackend()
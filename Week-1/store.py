@@ -0,0 +1,725 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Protocol
+
+import pandas as pd
+from loguru import logger
+
+from analytics import ClaimRollups, aggregate_claims
+from cache import ResponseCache
+from columns import (
+    TIMESTAMP_COLUMNS,
+    encode_columns,
+    encode_row,
+    encode_rows,
+    to_timestamp,
+)
+from config import (
+    EXPORT_CHUNK_ROWS,
+    FLUSH_BATCH_SIZE,
+    FLUSH_INTERVAL_SECONDS,
+    PAGE_SIZE,
+    WAL_ENABLED,
+)
+from data import PRIMARY_KEYS, SHEETS, to_native, unknown_sheet_error
+from search import AccountSearch
+from sheet import Sheet
+from snapshot import Snapshot
+from storage import StorageBackend, StorageBackendFactory
+from view import MergedView
+from wal import WriteAheadLog
+
+
+class ChangeListener(Protocol):
+    """Anything that derives state from the tables and follows their changes."""
+
+    def build(self, tables: dict[str, pd.DataFrame]) -> None: ...
+
+    def publish(self, version: int) -> None: ...
+
+    def apply(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> None: ...
+
+
+class TableStore:
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        flush_batch_size: int = FLUSH_BATCH_SIZE,
+        backend: StorageBackend | None = None,
+        wal: WriteAheadLog | None = None,
+        use_wal: bool = WAL_ENABLED,
+    ):
+        """Holds the Accounts, Claims and Policies sheets in memory.
+
+        Sheets are loaded once by `load` from the configured storage backend
+        (see `StorageBackendFactory`) and written back to it by a
+        background thread every `flush_interval` seconds, or as soon as
+        `flush_batch_size` writes are pending. Each is held as a `Sheet`, whose
+        indexes find rows by key without scanning a column and keep sheets with
+        a `TIME_KEYS` entry in time order for `between` and `latest`.
+
+        Writers change the sheets under a lock. Readers never see those: every
+        lookup reads the latest immutable `snapshot`, without locking.
+        `publish` makes a new version sharing whatever was not written since
+        the previous one, and is called once per commit group and by every
+        flush. Mutations running inside `writing` see their own changes
+        instead, and `rollback` drops the changes made since the last publish.
+
+        Published changes are folded into the merged account/claim/policy
+        `view`, which every snapshot carries a version of, and then reported
+        to the subscribed listeners, starting with the response `cache` of the
+        account lookups, the claim `rollups` and the account `search_index`.
+        Neither ever sees a change that is not published.
+
+        With a write-ahead log every change is appended to it before being
+        applied, `commit` only has to sync the log, and the background flush
+        acts as the compactor: it snapshots the dirty sheets to the backend and
+        then drops the log records the snapshot covers. `load` replays the
+        records written after the last snapshot.
+        """
+        self.flush_interval: float = flush_interval
+        self.flush_batch_size: int = flush_batch_size
+        self.backend: StorageBackend = (
+            backend if backend is not None else StorageBackendFactory.get_backend()
+        )
+        self._sheets: dict[str, Sheet] = {}
+        self._pending: dict[str, int] = {}
+        self._changed: set[str] = set()
+        self._sequence: int = 0
+        # Changes applied since the last publish, for the view and the listeners.
+        self._unpublished: list[tuple[str, dict | None, dict | None]] = []
+        # Where the write-ahead log stood at the last publish, see `rollback`.
+        self._wal_mark: tuple[int, int, int] | None = None
+        self._snapshot: Snapshot = Snapshot(0, {})
+        # The live sheets, read through the snapshot interface by the writer.
+        self._live: Snapshot = Snapshot(-1, self._sheets)
+        # Frozen version of every sheet, as last published.
+        self._published: dict[str, Sheet] = {}
+        self._writer: int | None = None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self.wal: WriteAheadLog | None = (
+            wal if wal is not None else WriteAheadLog() if use_wal else None
+        )
+        self._replaying: bool = False
+        self._listeners: list[ChangeListener] = []
+        self.view: MergedView = MergedView()
+        self.cache: ResponseCache = ResponseCache()
+        self.rollups: ClaimRollups = ClaimRollups()
+        self.search_index: AccountSearch = AccountSearch()
+        self.subscribe(self.backend)
+        self.subscribe(self.cache)
+        self.subscribe(self.rollups)
+        self.subscribe(self.search_index)
+
+    def load(self) -> None:
+        """Reads every sheet from the storage backend into memory."""
+        with self._lock:
+            tables: dict[str, pd.DataFrame] = {}
+            for sheet in SHEETS:
+                sheet_df: pd.DataFrame = encode_columns(sheet, self.backend.load(sheet))
+                tables[sheet] = sheet_df
+                self._sheets[sheet] = Sheet(sheet, sheet_df)
+            self._pending.clear()
+            self.view.build(tables)
+            for listener in self._listeners:
+                listener.build(tables)
+            if self.wal is not None:
+                self._replay()
+            self._changed.update(SHEETS)
+            self.publish()
+        logger.info(f"Loaded {SHEETS} sheets into memory.")
+
+    def subscribe(self, listener: ChangeListener) -> None:
+        """Registers a listener, built on `load` and notified of every
+        published change."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._sheets:
+                listener.build(dict(self._snapshot.tables))
+
+    def start(self) -> None:
+        """Starts the background flush thread."""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._stopped.clear()
+        self._flusher = threading.Thread(
+            target=self._run, name="table-store-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self) -> None:
+        """Stops the background thread and flushes whatever is still pending."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        if self.wal is not None:
+            self.wal.close()
+
+    def snapshot(self) -> Snapshot:
+        """Returns the latest published version of the sheets. Never blocks."""
+        return self._snapshot
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Holds the write lock for a group of mutations. Lookups made inside
+        it, such as `exists` or `contains`, read the live tables and so see the
+        group's own changes, where any other thread reads the latest snapshot.
+        """
+        with self._lock:
+            self._writer = threading.get_ident()
+            try:
+                yield
+            finally:
+                self._writer = None
+
+    def publish(self) -> Snapshot:
+        """Makes the changes applied so far visible to snapshot readers, then
+        reports them to the listeners."""
+        with self._lock:
+            if not self._changed:
+                return self._snapshot
+            changes, self._unpublished = self._unpublished, []
+            for change in changes:
+                self._tell(self.view, change)
+            for sheet in self._changed:
+                self._published[sheet] = self._sheets[sheet].freeze()
+            self._changed.clear()
+            # Swapping the reference is atomic, readers get the old or the new version.
+            self._snapshot = Snapshot(
+                self._snapshot.version + 1,
+                dict(self._published),
+                self._sequence + len(changes),
+                self.view.freeze(),
+            )
+            if self.wal is not None:
+                self._wal_mark = self.wal.mark()
+            for listener in self._listeners:
+                listener.publish(self._snapshot.version)
+            for change in changes:
+                self._sequence += 1
+                for listener in self._listeners:
+                    self._tell(listener, change)
+            return self._snapshot
+
+    def rollback(self) -> None:
+        """Drops every change applied since the last `publish`, from the sheets
+        and from the write-ahead log."""
+        with self._lock:
+            for sheet in self._changed:
+                self._sheets[sheet].rollback(self._published[sheet])
+            self._changed.clear()
+            self._unpublished.clear()
+            if self.wal is not None and self._wal_mark is not None:
+                self.wal.truncate(self._wal_mark)
+            # `_pending` keeps counting them, at worst a flush comes early.
+        logger.warning("Rolled back the changes applied since the last publish.")
+
+    @property
+    def sequence(self) -> int:
+        """Number of changes published since the store was created. Listeners
+        read it to number the change they are being notified of."""
+        return self._sequence
+
+    def exists(self, sheet_name: str, key) -> bool:
+        """Checks whether a row with the given primary key exists."""
+        return self._reader().exists(sheet_name, key)
+
+    def find(self, sheet_name: str, key) -> pd.Series | None:
+        """Returns a copy of the row with the given primary key, None if missing."""
+        reader: Snapshot = self._reader()
+        label: int | None = reader.label(sheet_name, key)
+        if label is None:
+            return None
+        return reader.table(sheet_name).take([label]).iloc[0].copy()
+
+    def page(
+        self,
+        sheet_name: str,
+        cursor: int | None = None,
+        limit: int = PAGE_SIZE,
+        snapshot: Snapshot | None = None,
+    ) -> tuple[list[dict], int | None]:
+        """Returns the rows following the cursor, oldest first.
+
+        Rows keep the label they got on insert and labels only grow, so the
+        label of the last row returned is a cursor that stays valid while rows
+        are inserted and deleted.
+        Params:
+            sheet_name(str): Sheet to read.
+            cursor(int | None): Cursor returned with the previous page, None for the first one.
+            limit(int): Most rows returned.
+            snapshot(Snapshot | None): Version to read, the latest one by default.
+        Returns:
+            tuple[list[dict], int | None]: The rows and the cursor of the next page,
+            None once there are no more rows.
+        """
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        return snapshot.page(sheet_name, cursor, limit)
+
+    def between(
+        self,
+        sheet_name: str,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        cursor: str | None = None,
+        limit: int = PAGE_SIZE,
+    ) -> tuple[list[dict], int, str | None]:
+        """Returns the rows of a sheet in `TIME_KEYS` created from `start`
+        included to `end` excluded, oldest first, through its time index.
+        Params:
+            sheet_name(str): Sheet to read.
+            start(pd.Timestamp), end(pd.Timestamp): Time window, in UTC.
+            cursor(str | None): Cursor returned with the previous page, None for the first one.
+            limit(int): Most rows returned.
+        Returns:
+            tuple[list[dict], int, str | None]: The rows, the number of rows in
+            the window from the cursor on, and the cursor of the next page.
+        """
+        return self._reader().between(sheet_name, start, end, cursor, limit)
+
+    def latest(
+        self, sheet_name: str, group_column: str, value, count: int
+    ) -> list[dict]:
+        """Returns the `count` most recent rows of a sheet in `TIME_KEYS` where
+        `group_column` equals `value`, newest first."""
+        return self._reader().latest(sheet_name, group_column, value, count)
+
+    def search_accounts(self, query: str, limit: int = PAGE_SIZE) -> list[dict]:
+        """Returns the accounts best matching the words of `query`, best first,
+        each with its "score". See `AccountSearch.search`."""
+        reader: Snapshot = self._reader()
+        matches: list[tuple] = [
+            (reader.label("Accounts", account_id), score)
+            for account_id, score in self.search_index.search(query, limit)
+        ]
+        # The search index follows the published versions a moment after readers
+        # see them, an account it finds may already be gone.
+        matches = [(label, score) for label, score in matches if label is not None]
+        rows: list[dict] = reader.rows("Accounts", [label for label, _ in matches])
+        return [{**row, "score": score} for row, (_, score) in zip(rows, matches)]
+
+    def account_page(
+        self, account_id: str, cursor: int | None = None, limit: int = PAGE_SIZE
+    ) -> tuple[list[dict] | None, int | None]:
+        """Returns one page of the joined rows of an account, see `page`.
+
+        The cursor is the label of the account's last claim returned. Returns
+        None instead of the rows if the account is missing.
+        """
+        return self.snapshot().account_page(account_id, cursor, limit)
+
+    def merged_page(
+        self,
+        cursor: int | None = None,
+        limit: int = PAGE_SIZE,
+        snapshot: Snapshot | None = None,
+    ) -> tuple[list[dict], int | None]:
+        """Returns the joined rows of up to `limit` accounts, see `page`."""
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        return snapshot.merged_page(cursor, limit)
+
+    def iter_rows(
+        self, sheet_name: str | None = None, chunk_size: int = EXPORT_CHUNK_ROWS
+    ) -> Iterator[list[dict]]:
+        """Yields every row of a sheet, or of the merged view if `sheet_name` is
+        None, in chunks. The whole export reads one snapshot."""
+        snapshot: Snapshot = self.snapshot()
+        cursor: int | None = None
+        while True:
+            if sheet_name is None:
+                rows, cursor = self.merged_page(cursor, chunk_size, snapshot)
+            else:
+                rows, cursor = self.page(sheet_name, cursor, chunk_size, snapshot)
+            if rows:
+                yield rows
+            if cursor is None:
+                return
+
+    def dtypes(self, sheet_name: str | None = None) -> dict[str, str]:
+        """Returns the column types of a sheet, or of the merged view if `sheet_name` is None."""
+        tables = self.snapshot().tables
+        if sheet_name is not None:
+            return tables[sheet_name].dtypes.astype(str).to_dict()
+        dtypes: dict[str, str] = {
+            **tables["Accounts"].dtypes.astype(str).to_dict(),
+            **tables["Claims"].dtypes.astype(str).to_dict(),
+            "Policy Name": "object",
+        }
+        return {column: dtypes[column] for column in self.view.columns}
+
+    def aggregate_claims(self, group_by: str) -> list[dict]:
+        """Returns the claim count and BillAmount total and mean per group of the
+        latest snapshot, see `analytics.GROUP_BY` for the groupings."""
+        return aggregate_claims(self.snapshot().tables, group_by)
+
+    def memory_report(self) -> dict:
+        """Returns the measured memory of every sheet of the latest snapshot,
+        in bytes, in total and per column with its dtype."""
+        return self.snapshot().memory_report()
+
+    def contains(
+        self, sheet_name: str, keys: pd.Series, column: str | None = None
+    ) -> pd.Series:
+        """Checks many keys at once against the primary key, or the secondary key `column`.
+        Returns:
+            pd.Series: True where the key exists, aligned with `keys`.
+        """
+        return self._reader().contains(sheet_name, keys, column)
+
+    def find_by(self, sheet_name: str, column: str, key) -> pd.DataFrame:
+        """Returns the rows whose secondary key `column` equals `key`."""
+        reader: Snapshot = self._reader()
+        labels: tuple[int, ...] = reader.labels(sheet_name, column, key)
+        return reader.table(sheet_name).take(list(labels)).copy()
+
+    def insert(self, sheet_name: str, record: dict) -> dict:
+        """Appends a new row to the sheet.
+        Params:
+            sheet_name(str): Sheet to insert the row into.
+            record(dict): Column to value mapping of the new row.
+        Returns:
+            dict[str,str]: Success or error message.
+        """
+        if sheet_name not in SHEETS:
+            return unknown_sheet_error([sheet_name])
+
+        key_column: str = PRIMARY_KEYS[sheet_name]
+        with self._lock:
+            key = record[key_column]
+            if key in self._sheets[sheet_name].primary:
+                return {"status": 409, "message": f"{key_column} {key} already exists."}
+
+            new_row: dict = encode_row(
+                sheet_name,
+                {
+                    column: record.get(column)
+                    for column in self._sheets[sheet_name].table.columns
+                },
+            )
+            self._log("insert", sheet_name, key, new_row)
+            self._sheets[sheet_name].insert(new_row)
+            self._mark_dirty(sheet_name)
+            self._notify(sheet_name, None, new_row)
+        return {"status": 200, "message": "success"}
+
+    def insert_many(self, sheet_name: str, records: pd.DataFrame) -> dict:
+        """Appends many new rows to the sheet with a single concat.
+        Params:
+            sheet_name(str): Sheet to insert the rows into.
+            records(pd.DataFrame): New rows, with at least the sheet's columns.
+        Returns:
+            dict[str,str]: Success or error message. Nothing is inserted if any
+            primary key already exists or repeats within `records`.
+        """
+        if sheet_name not in SHEETS:
+            return unknown_sheet_error([sheet_name])
+        if records.empty:
+            return {"status": 200, "message": "Nothing to insert"}
+
+        key_column: str = PRIMARY_KEYS[sheet_name]
+        with self._lock:
+            keys: pd.Series = records[key_column]
+            duplicated: pd.Series = keys.duplicated() | self._live.contains(
+                sheet_name, keys
+            )
+            if duplicated.any():
+                return {
+                    "status": 409,
+                    "message": f"{key_column} {keys[duplicated].tolist()} already exist.",
+                }
+
+            new_df: pd.DataFrame = encode_rows(
+                sheet_name,
+                records.reindex(columns=self._sheets[sheet_name].table.columns),
+            )
+            new_rows: list[dict] = [
+                {column: to_native(value) for column, value in row.items()}
+                for row in new_df.to_dict(orient="records")
+            ]
+            self._log("insert_many", sheet_name, None, new_rows)
+            self._sheets[sheet_name].insert_many(new_df)
+            for new_row in new_rows:
+                self._notify(sheet_name, None, new_row)
+            self._mark_dirty(sheet_name, len(new_rows))
+        return {"status": 200, "message": "success"}
+
+    def update(self, sheet_name: str, key, changes: dict) -> dict:
+        """Sets the given columns of the row with primary key `key`.
+        Params:
+            sheet_name(str): Sheet holding the row.
+            key: Primary key of the row to modify.
+            changes(dict): Column to new value mapping.
+        Returns:
+            dict[str,str]: Success or error message.
+        """
+        if sheet_name not in SHEETS:
+            return unknown_sheet_error([sheet_name])
+
+        key_column: str = PRIMARY_KEYS[sheet_name]
+        with self._lock:
+            label: int | None = self._sheets[sheet_name].primary.get(key)
+            if label is None:
+                return {"status": 404, "message": f"{key_column} {key} not found."}
+
+            new_key = changes.get(key_column, key)
+            if new_key != key and new_key in self._sheets[sheet_name].primary:
+                return {
+                    "status": 409,
+                    "message": f"{key_column} {new_key} already exists.",
+                }
+
+            changes = {
+                column: (
+                    to_timestamp(value)
+                    if column in TIMESTAMP_COLUMNS[sheet_name]
+                    else value
+                )
+                for column, value in changes.items()
+            }
+            self._log("update", sheet_name, key, changes)
+            old_row: dict = self._sheets[sheet_name].table.row(label)
+            self._sheets[sheet_name].update(label, old_row, changes)
+            self._mark_dirty(sheet_name)
+            self._notify(sheet_name, old_row, {**old_row, **changes})
+        return {"status": 200, "message": "success"}
+
+    def patch(self, sheet_name: str, key, changes: dict) -> dict:
+        """Applies only the columns of `changes` that differ from the stored row.
+        Params:
+            sheet_name(str): Sheet holding the row.
+            key: Primary key of the row to modify.
+            changes(dict): Column to new value mapping, usually a request body.
+        Returns:
+            dict: Success or error message. On success also the row as stored
+            after the change under "data", and the old and new value of every
+            column that actually changed under "changes".
+        """
+        if sheet_name not in SHEETS:
+            return unknown_sheet_error([sheet_name])
+
+        key_column: str = PRIMARY_KEYS[sheet_name]
+        with self._lock:
+            label: int | None = self._sheets[sheet_name].primary.get(key)
+            if label is None:
+                return {"status": 404, "message": f"{key_column} {key} not found."}
+
+            unknown: list[str] = [
+                column
+                for column in changes.keys()
+                if column not in self._sheets[sheet_name].table.columns
+            ]
+            if unknown:
+                return {
+                    "status": 400,
+                    "message": f"Unknown columns {unknown} for sheet {sheet_name}.",
+                }
+
+            old_row: dict = self._sheets[sheet_name].table.row(label)
+            diff: dict = {
+                column: value
+                for column, value in changes.items()
+                if old_row[column] != value
+            }
+            if not diff:
+                return {
+                    "status": 200,
+                    "message": "Nothing to modify",
+                    "data": old_row,
+                    "changes": {},
+                }
+
+            # One update, so one log record and one notification for the whole diff.
+            result: dict = self.update(sheet_name, key, diff)
+            if result["status"] != 200:
+                return result
+            return {
+                "status": 200,
+                "message": "success",
+                "data": self._sheets[sheet_name].table.row(label),
+                "changes": {
+                    column: (old_row[column], value) for column, value in diff.items()
+                },
+            }
+
+    def delete(self, sheet_name: str, key) -> dict:
+        """Removes the row with primary key `key` from the sheet."""
+        if sheet_name not in SHEETS:
+            return unknown_sheet_error([sheet_name])
+
+        key_column: str = PRIMARY_KEYS[sheet_name]
+        with self._lock:
+            label: int | None = self._sheets[sheet_name].primary.get(key)
+            if label is None:
+                return {"status": 404, "message": f"{key_column} {key} not found."}
+
+            self._log("delete", sheet_name, key, None)
+            old_row: dict = self._sheets[sheet_name].table.row(label)
+            self._sheets[sheet_name].delete(label, old_row)
+            self._mark_dirty(sheet_name)
+            self._notify(sheet_name, old_row, None)
+        return {"status": 200, "message": "success"}
+
+    def apply_change(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> dict:
+        """Applies a change made by another store, as reported to its listeners.
+
+        Used by the replicas of a multi-process deployment to follow the owner.
+        """
+        key_column: str = PRIMARY_KEYS[sheet_name]
+        if old_row is None:
+            return self.insert(sheet_name, new_row)
+        if new_row is None:
+            return self.delete(sheet_name, old_row[key_column])
+        return self.update(
+            sheet_name,
+            old_row[key_column],
+            {
+                column: value
+                for column, value in new_row.items()
+                if old_row.get(column) != value
+            },
+        )
+
+    def get_account_data(self, account_id: str) -> list[dict] | None:
+        """Returns the joined account/claim/policy rows of the latest snapshot,
+        None if the account is missing."""
+        return self.snapshot().view.get(account_id)
+
+    def get_account_json(self, account_id: str) -> bytes | None:
+        """Same as `get_account_data`, already encoded as JSON and served from
+        the response cache when possible."""
+        hit, content = self.cache.get(account_id)
+        if hit:
+            return content
+        snapshot: Snapshot = self.snapshot()
+        content = snapshot.view.get_json(account_id)
+        self.cache.put(
+            account_id, content, snapshot.view.hans(account_id), snapshot.version
+        )
+        return content
+
+    def commit(self) -> dict:
+        """Makes every change applied so far durable.
+
+        Syncs the write-ahead log when there is one, else flushes the dirty
+        sheets to the storage backend.
+        """
+        if self.wal is not None:
+            return self.wal.sync()
+        return self.flush()
+
+    def flush(self) -> dict:
+        """Writes every dirty sheet to the storage backend in one go."""
+        with self._flush_lock:
+            with self._lock:
+                dirty_sheets: list[str] = [
+                    sheet for sheet, count in self._pending.items() if count > 0
+                ]
+                self._pending.clear()
+                if not dirty_sheets:
+                    return {"status": 200, "message": "Nothing to flush"}
+                for sheet in dirty_sheets:
+                    self._sheets[sheet].table.compact()
+                    self._changed.add(sheet)
+                snapshot: Snapshot = self.publish()
+                # Records after this point belong to the next snapshot.
+                wal_lsn: int | None = None
+                if self.wal is not None:
+                    wal_lsn = self.wal.rotate()
+                    self._wal_mark = self.wal.mark()
+
+            # The published version is immutable, the backend can save it as it is.
+            dirty: dict[str, pd.DataFrame] = {
+                sheet: snapshot.tables[sheet] for sheet in dirty_sheets
+            }
+            result: dict = self.backend.save(dirty)
+            if result["status"] != 200:
+                logger.error(f"Flush failed, will retry: {result['message']}")
+                # Keep the sheets dirty so the next round writes them again.
+                with self._lock:
+                    for sheet in dirty.keys():
+                        self._pending[sheet] = self._pending.get(sheet, 0) + 1
+            elif wal_lsn is not None:
+                self.wal.checkpoint(wal_lsn)
+            return result
+
+    def _log(
+        self, op: str, sheet_name: str, key, data: dict | list[dict] | None
+    ) -> None:
+        if self.wal is not None and not self._replaying:
+            self.wal.append(op, sheet_name, key, data)
+
+    def _replay(self) -> None:
+        self.wal.open()
+        self._replaying = True
+        replayed: int = 0
+        try:
+            for segment, offset, record in self.wal.replay():
+                match record.get("op"):
+                    case "insert":
+                        result = self.insert(record["sheet"], record["data"])
+                    case "insert_many":
+                        result = self.insert_many(
+                            record["sheet"], pd.DataFrame(record["data"])
+                        )
+                    case "update":
+                        result = self.update(
+                            record["sheet"], record["key"], record["data"]
+                        )
+                    case "delete":
+                        result = self.delete(record["sheet"], record["key"])
+                    case _:
+                        raise ValueError(
+                            f"Unknown write-ahead log op {record.get('op')!r} at offset {offset} of {segment}."
+                        )
+                if result["status"] != 200:
+                    logger.warning(
+                        f"Skipped write-ahead log record {record['lsn']}: {result['message']}"
+                    )
+                replayed += 1
+        finally:
+            self._replaying = False
+        if replayed:
+            logger.info(f"Replayed {replayed} write-ahead log records.")
+
+    def _reader(self) -> Snapshot:
+        """The live tables inside `writing`, the latest snapshot anywhere else."""
+        if self._writer == threading.get_ident():
+            return self._live
+        return self._snapshot
+
+    def _notify(self, sheet_name: str, old_row: dict | None, new_row: dict | None):
+        """Keeps a change for the view and the listeners until the next `publish`."""
+        self._unpublished.append((sheet_name, old_row, new_row))
+
+    @staticmethod
+    def _tell(listener: ChangeListener, change: tuple) -> None:
+        try:
+            listener.apply(*change)
+        except Exception as e:
+            logger.error(f"Listener {type(listener).__name__} failed: {e}")
+
+    def _mark_dirty(self, sheet_name: str, count: int = 1) -> None:
+        self._pending[sheet_name] = self._pending.get(sheet_name, 0) + count
+        self._changed.add(sheet_name)
+        if sum(self._pending.values()) >= self.flush_batch_size:
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Background flush failed: {e}")
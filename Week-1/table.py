@@ -0,0 +1,281 @@
+import bisect
+import copy
+import datetime
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from config import TABLE_CHUNK_ROWS
+from data import to_native
+
+
+def intern_strings(values) -> list:
+    return [sys.intern(value) if isinstance(value, str) else value for value in values]
+
+
+def to_category(values: pd.Series) -> pd.Series:
+    """Dictionary encodes a column, with interned categories. The codes of a
+    column that already is categorical are kept, not copied."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    dtype = pd.CategoricalDtype(intern_strings(values.cat.categories.tolist()))
+    return pd.Series(
+        pd.Categorical.from_codes(values.cat.codes.to_numpy(), dtype=dtype),
+        index=values.index,
+        name=values.name,
+    )
+
+
+def fit_dtype(dtype, value):
+    """Returns the dtype a column of type `dtype` needs to also hold `value`:
+    ints become floats for a fraction or a missing value, and anything that
+    does not fit otherwise makes the column object. Categoricals are left
+    as they are, their new values are added as categories instead."""
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == object:
+        return dtype
+    if (
+        value is None
+        or value is pd.NaT
+        or (isinstance(value, float) and np.isnan(value))
+    ):
+        if dtype.kind in "iu":
+            return np.dtype("float64")
+        return np.dtype(object) if dtype.kind == "b" else dtype
+    if dtype.kind == "M":
+        is_time: bool = isinstance(value, (datetime.datetime, np.datetime64))
+        return dtype if is_time else np.dtype(object)
+    if isinstance(value, (bool, np.bool_)):
+        return dtype if dtype.kind == "b" else np.dtype(object)
+    if isinstance(value, (int, float, np.number)):
+        return np.result_type(dtype, np.asarray(value).dtype)
+    return np.dtype(object)
+
+
+def concat_chunks(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenates frames of one sheet, keeping its categorical columns
+    categorical even where the frames know different categories."""
+    chunks = [chunk for chunk in chunks if len(chunk)] or chunks[:1]
+    if len(chunks) == 1:
+        return chunks[0]
+    data: pd.DataFrame = pd.concat(chunks)
+    for column, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(
+            data[column].dtype, pd.CategoricalDtype
+        ):
+            data[column] = pd.Series(
+                union_categoricals([chunk[column] for chunk in chunks]),
+                index=data.index,
+            )
+    return data
+
+
+class ChunkedTable:
+    def __init__(self, data: pd.DataFrame, chunk_rows: int = TABLE_CHUNK_ROWS):
+        """A sheet held as consecutive frames ("chunks") of up to `chunk_rows`
+        rows, in label order.
+
+        `freeze` returns a read only version of the table sharing every chunk
+        with it. A chunk is copied before its first change after that, so a
+        version costs one chunk copy per chunk written since the previous one,
+        not a copy of the sheet.
+
+        Rows added one at a time by `append_row` wait in a tail buffer and
+        become a chunk of their own on the next `freeze`, or as soon as
+        anything else reads or changes the table. Bulk appends become chunks
+        right away. `compact` merges the small chunks this leaves behind, and
+        those deletes leave, into full ones.
+
+        Categorical columns stay categorical chunk by chunk, each chunk adding
+        the categories of its own values. `frame` unions them when it
+        concatenates the chunks.
+        """
+        self.chunk_rows: int = chunk_rows
+        self.columns: pd.Index = data.columns
+        # The chunks start as views of `data`, copied on their first write.
+        self._chunks: list[pd.DataFrame] = [
+            data.iloc[start : start + chunk_rows]
+            for start in range(0, len(data), chunk_rows)
+        ] or [data]
+        # Least label of every chunk, the first one also takes anything lower.
+        self._starts: list[int] = [
+            int(chunk.index[0]) if len(chunk) else 0 for chunk in self._chunks
+        ]
+        self._owned: set[int] = set()
+        self._tail: list[dict] = []
+        self._tail_labels: list[int] = []
+
+    def frame(self) -> pd.DataFrame:
+        """Returns the whole sheet as one frame, not to be modified."""
+        self._seal()
+        return concat_chunks(self._chunks)
+
+    def row(self, label: int) -> dict:
+        self._seal()
+        chunk: pd.DataFrame = self._chunks[self._locate(label)]
+        return {column: to_native(chunk.at[label, column]) for column in self.columns}
+
+    def take(self, labels: list[int]) -> pd.DataFrame:
+        """Returns the rows with the given labels, in that order."""
+        self._seal()
+        by_chunk: dict[int, list[int]] = {}
+        for label in labels:
+            by_chunk.setdefault(self._locate(label), []).append(label)
+        if len(by_chunk) <= 1:
+            number: int = next(iter(by_chunk), 0)
+            return self._chunks[number].loc[list(labels)]
+        rows_df: pd.DataFrame = concat_chunks(
+            [
+                self._chunks[number].loc[chunk_labels]
+                for number, chunk_labels in sorted(by_chunk.items())
+            ]
+        )
+        return rows_df.loc[list(labels)]
+
+    def rows(self, labels: list[int]) -> list[dict]:
+        """Same as `take`, as dicts of native values."""
+        return [
+            {column: to_native(value) for column, value in row.items()}
+            for row in self.take(labels).to_dict(orient="records")
+        ]
+
+    def page(self, cursor: int | None, limit: int) -> tuple[list[dict], int | None]:
+        """See `TableStore.page`."""
+        self._seal()
+        number: int = 0 if cursor is None else self._locate(cursor)
+        parts: list[pd.DataFrame] = []
+        taken: int = 0
+        # One row more than asked tells whether there is a next page.
+        while number < len(self._chunks) and taken <= limit:
+            chunk: pd.DataFrame = self._chunks[number]
+            start: int = (
+                0
+                if cursor is None
+                else int(chunk.index.searchsorted(cursor, side="right"))
+            )
+            part: pd.DataFrame = chunk.iloc[start : start + limit + 1 - taken]
+            parts.append(part)
+            taken += len(part)
+            number += 1
+        rows: list[dict] = [
+            {column: to_native(value) for column, value in row.items()}
+            for part in parts
+            for row in part.to_dict(orient="records")
+        ]
+        if len(rows) <= limit:
+            return rows, None
+        labels: list[int] = [label for part in parts for label in part.index.tolist()]
+        return rows[:limit], labels[limit - 1]
+
+    def append_row(self, label: int, row: dict) -> None:
+        """Adds one row labelled after every existing row, see the tail buffer."""
+        self._tail.append(row)
+        self._tail_labels.append(label)
+
+    def append(self, data: pd.DataFrame) -> None:
+        """Adds rows labelled after every existing row."""
+        self._seal()
+        last: pd.DataFrame = self._chunks[-1]
+        for start in range(0, len(data), self.chunk_rows):
+            chunk: pd.DataFrame = data.iloc[start : start + self.chunk_rows].copy()
+            for column, dtype in last.dtypes.items():
+                if isinstance(dtype, pd.CategoricalDtype):
+                    chunk[column] = to_category(chunk[column])
+                elif chunk[column].isna().all():
+                    # An all missing column would not count for the type of a concat.
+                    chunk[column] = chunk[column].astype(fit_dtype(dtype, None))
+            if len(self._chunks[-1]):
+                self._chunks.append(chunk)
+                self._starts.append(int(chunk.index[0]))
+            else:
+                self._chunks[-1] = chunk
+            self._owned.add(id(chunk))
+
+    def update(self, label: int, changes: dict) -> None:
+        """Sets columns of the row with the given label."""
+        self._seal()
+        chunk: pd.DataFrame = self._writable(self._locate(label))
+        for column, value in changes.items():
+            dtype = chunk[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                if pd.notna(value) and value not in dtype.categories:
+                    chunk[column] = chunk[column].cat.add_categories(
+                        intern_strings([value])
+                    )
+            elif fit_dtype(dtype, value) != dtype:
+                chunk[column] = chunk[column].astype(fit_dtype(dtype, value))
+            chunk.at[label, column] = value
+
+    def drop(self, label: int) -> None:
+        self._seal()
+        number: int = self._locate(label)
+        chunk: pd.DataFrame = self._chunks[number].drop(label)
+        if not len(chunk) and len(self._chunks) > 1:
+            del self._chunks[number]
+            del self._starts[number]
+            return
+        self._chunks[number] = chunk
+        self._owned.add(id(chunk))
+
+    def compact(self) -> None:
+        """Merges runs of neighbouring chunks that fit in one."""
+        self._seal()
+        runs: list[list[int]] = []
+        size: int = self.chunk_rows
+        for number, chunk in enumerate(self._chunks):
+            if size + len(chunk) > self.chunk_rows:
+                runs.append([])
+                size = 0
+            runs[-1].append(number)
+            size += len(chunk)
+        if len(runs) == len(self._chunks):
+            return
+        chunks: list[pd.DataFrame] = []
+        for run in runs:
+            chunk: pd.DataFrame = concat_chunks([self._chunks[n] for n in run])
+            if len(run) > 1:
+                self._owned.add(id(chunk))
+            chunks.append(chunk)
+        self._chunks = chunks
+        self._starts = [self._starts[run[0]] for run in runs]
+
+    def freeze(self) -> "ChunkedTable":
+        """Returns the table as it is now. Later changes leave it untouched."""
+        self._seal()
+        frozen: ChunkedTable = copy.copy(self)
+        frozen._chunks = list(self._chunks)
+        frozen._starts = list(self._starts)
+        frozen._owned = set()
+        frozen._tail, frozen._tail_labels = [], []
+        self._owned = set()
+        return frozen
+
+    def rollback(self, frozen: "ChunkedTable") -> None:
+        """Drops every change made since `freeze` returned `frozen`."""
+        self._chunks = list(frozen._chunks)
+        self._starts = list(frozen._starts)
+        self._owned = set()
+        self._tail, self._tail_labels = [], []
+
+    def __len__(self) -> int:
+        return sum(map(len, self._chunks)) + len(self._tail)
+
+    def _seal(self) -> None:
+        """Turns the tail buffer into a chunk."""
+        if not self._tail:
+            return
+        data: pd.DataFrame = pd.DataFrame(
+            self._tail, index=self._tail_labels, columns=self.columns
+        )
+        self._tail, self._tail_labels = [], []
+        self.append(data)
+
+    def _locate(self, label: int) -> int:
+        return max(bisect.bisect_right(self._starts, label) - 1, 0)
+
+    def _writable(self, number: int) -> pd.DataFrame:
+        if id(self._chunks[number]) not in self._owned:
+            self._chunks[number] = self._chunks[number].copy()
+            self._owned.add(id(self._chunks[number]))
+        return self._chunks[number]
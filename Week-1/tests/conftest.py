@@ -0,0 +1,68 @@
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+import pytest
+
+from storage import ParquetBackend
+from store import TableStore
+from wal import WriteAheadLog
+
+
+@pytest.fixture
+def tables() -> dict[str, pd.DataFrame]:
+    """Two accounts, three claims and two policies."""
+    return {
+        "Accounts": pd.DataFrame(
+            {
+                "AccountId": ["A1", "A2"],
+                "Name": ["Asha", "Ravi"],
+                "Age": [34, 51],
+                "City": ["Pune", "Delhi"],
+                "State": ["MH", "DL"],
+                "Pincode": [411001, 110001],
+            }
+        ),
+        "Claims": pd.DataFrame(
+            {
+                "Id": ["C1", "C2", "C3"],
+                "CreatedDate": [
+                    "2024-01-01T10:00:00Z",
+                    "2024-01-02T10:00:00Z",
+                    "2024-01-03T10:00:00Z",
+                ],
+                "CaseNumber": ["0001", "0002", "0003"],
+                "HAN": ["H1", "H2", "H1"],
+                "BillAmount": [100, 200, 300],
+                "Status": ["Paid", "Open", "Paid"],
+                "AccountId": ["A1", "A1", "A2"],
+            }
+        ),
+        "Policies": pd.DataFrame(
+            {"HAN": ["H1", "H2"], "Policy Name": ["Gold", "Silver"]}
+        ),
+    }
+
+
+@pytest.fixture
+def make_store(
+    tmp_path: Path, tables: dict[str, pd.DataFrame]
+) -> Callable[[], TableStore]:
+    """Returns a function opening a store over the same Parquet files and
+    write-ahead log, as a restarted process would."""
+    pytest.importorskip("pyarrow")
+    ParquetBackend(tmp_path / "tables").replace(tables)
+    stores: list[TableStore] = []
+
+    def make() -> TableStore:
+        store = TableStore(
+            backend=ParquetBackend(tmp_path / "tables"),
+            wal=WriteAheadLog(tmp_path / "wal"),
+        )
+        store.load()
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.wal.close()
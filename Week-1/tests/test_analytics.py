@@ -0,0 +1,63 @@
+import pytest
+
+from analytics import ClaimRollups
+
+
+@pytest.mark.parametrize(
+    "group_by, expected",
+    [
+        ("policy", [("H1", 2, 400), ("H2", 1, 200)]),
+        ("status", [("Open", 1, 200), ("Paid", 2, 400)]),
+        ("state", [("DL", 1, 300), ("MH", 2, 300)]),
+        (
+            "day",
+            [("2024-01-01", 1, 100), ("2024-01-02", 1, 200), ("2024-01-03", 1, 300)],
+        ),
+    ],
+)
+def test_claims_are_aggregated_per_group(make_store, group_by, expected):
+    rows: list[dict] = make_store().aggregate_claims(group_by)
+
+    assert [(row["key"], row["claims"], row["total"]) for row in rows] == expected
+
+
+def test_aggregates_follow_published_writes(make_store):
+    store = make_store()
+    store.delete("Claims", "C2")
+    store.publish()
+
+    rows: list[dict] = store.aggregate_claims("account")
+    assert [(row["key"], row["claims"], row["mean"]) for row in rows] == [
+        ("A1", 1, 100.0),
+        ("A2", 1, 300.0),
+    ]
+
+
+def test_rollups_match_a_rebuild_after_every_write(make_store):
+    store = make_store()
+    assert store.rollups.account("A1") == {
+        "claims": 2,
+        "total": 300,
+        "by_status": {
+            "Open": {"claims": 1, "total": 200},
+            "Paid": {"claims": 1, "total": 100},
+        },
+    }
+
+    store.update("Claims", "C2", {"Status": "Paid", "BillAmount": 250})
+    store.update("Claims", "C3", {"AccountId": "A1"})
+    store.delete("Claims", "C1")
+    store.publish()
+
+    rebuilt = ClaimRollups()
+    rebuilt.build(store.snapshot().tables)
+    for account_id in ["A1", "A2"]:
+        assert store.rollups.account(account_id) == rebuilt.account(account_id)
+    for han in ["H1", "H2"]:
+        assert store.rollups.policy(han) == rebuilt.policy(han)
+    assert store.rollups.account("A1") == {
+        "claims": 2,
+        "total": 550,
+        "by_status": {"Paid": {"claims": 2, "total": 550}},
+    }
+    assert store.rollups.account("A2") == {"claims": 0, "total": 0, "by_status": {}}
@@ -0,0 +1,140 @@
+import json
+
+from cache import ResponseCache
+
+
+def lookup(store, account_id: str) -> list[dict] | None:
+    content = store.get_account_json(account_id)
+    return None if content is None else json.loads(content)
+
+
+def test_repeated_lookup_is_served_from_the_cache(make_store):
+    store = make_store()
+    first = lookup(store, "A1")
+
+    assert lookup(store, "A1") == first
+    assert store.cache.stats()["hits"] == 1
+
+
+def test_account_update_invalidates_its_lookup(make_store):
+    store = make_store()
+    lookup(store, "A1")
+    store.update("Accounts", "A1", {"Name": "Asha K"})
+    assert {row["Name"] for row in lookup(store, "A1")} == {"Asha"}
+
+    store.publish()
+    assert {row["Name"] for row in lookup(store, "A1")} == {"Asha K"}
+    assert store.cache.stats()["invalidations"] == 1
+
+
+def test_uncommitted_writes_are_invisible(make_store):
+    store = make_store()
+    store.update("Claims", "C1", {"Status": "Closed"})
+    store.delete("Claims", "C3")
+
+    # Neither the view, the cache nor the search index sees them yet.
+    assert {row["Id"]: row["Status"] for row in lookup(store, "A1")} == {
+        "C1": "Paid",
+        "C2": "Open",
+    }
+    assert [row["Id"] for row in store.get_account_data("A2")] == ["C3"]
+    assert store.cache.stats()["invalidations"] == 0
+    assert store.sequence == 0
+
+    store.commit()
+    store.publish()
+    assert lookup(store, "A1")[0]["Status"] == "Closed"
+    assert [row["Id"] for row in lookup(store, "A2")] == [None]
+    assert store.sequence == 2
+
+
+def test_claim_changes_invalidate_the_lookup_of_their_account(make_store):
+    store = make_store()
+    lookup(store, "A1")
+    lookup(store, "A2")
+    store.update("Claims", "C1", {"Status": "Closed"})
+    store.delete("Claims", "C3")
+    store.publish()
+
+    assert {row["Id"]: row["Status"] for row in lookup(store, "A1")} == {
+        "C1": "Closed",
+        "C2": "Open",
+    }
+    assert [row["Id"] for row in lookup(store, "A2")] == [None]
+
+
+def test_policy_update_invalidates_every_account_holding_it(make_store):
+    store = make_store()
+    lookup(store, "A1")
+    lookup(store, "A2")
+    store.update("Policies", "H1", {"Policy Name": "Platinum"})
+    store.publish()
+
+    policies = {
+        account_id: {
+            row["HAN"]: row["Policy Name"] for row in lookup(store, account_id)
+        }
+        for account_id in ["A1", "A2"]
+    }
+    assert policies == {
+        "A1": {"H1": "Platinum", "H2": "Silver"},
+        "A2": {"H1": "Platinum"},
+    }
+    assert store.cache.stats()["invalidations"] == 2
+
+
+def test_unknown_account_is_cached_until_it_is_created(make_store):
+    store = make_store()
+    assert lookup(store, "A3") is None
+    assert lookup(store, "A3") is None
+    assert store.cache.stats()["negative_hits"] == 1
+
+    store.insert(
+        "Accounts",
+        {
+            "AccountId": "A3",
+            "Name": "Meera",
+            "Age": 28,
+            "City": "Pune",
+            "State": "MH",
+            "Pincode": 411002,
+        },
+    )
+    assert lookup(store, "A3") is None
+
+    store.publish()
+    assert [row["Name"] for row in lookup(store, "A3")] == ["Meera"]
+
+
+def test_response_of_an_older_version_is_not_cached():
+    cache = ResponseCache()
+    cache.publish(1)
+    cache.publish(2)
+    cache.put("A1", b"[]", set(), 1)
+    assert cache.get("A1") == (False, None)
+
+    cache.put("A1", b"[]", set(), 2)
+    assert cache.get("A1") == (True, b"[]")
+
+
+def test_lookup_racing_a_publish_is_dropped_by_its_changes(make_store):
+    store = make_store()
+    snapshot = store.snapshot()
+    store.update("Accounts", "A1", {"Name": "Asha K"})
+    store.publish()
+    # Read from the version before the update, once it is published.
+    store.cache.put("A1", snapshot.view.get_json("A1"), set(), snapshot.version)
+
+    assert {row["Name"] for row in lookup(store, "A1")} == {"Asha K"}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("A1", b"[1]", set())
+    cache.put("A2", b"[2]", set())
+    cache.get("A1")
+    cache.put("A3", b"[3]", set())
+
+    assert cache.get("A2") == (False, None)
+    assert cache.get("A1") == (True, b"[1]")
+    assert cache.stats()["evictions"] == 1
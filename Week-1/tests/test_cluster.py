@@ -0,0 +1,102 @@
+import asyncio
+import socket
+import time
+from multiprocessing.connection import Client
+
+import pytest
+
+from cluster import ClusterOwner, ClusterWorker, ReplicaBackend
+from store import TableStore
+
+AUTHKEY: bytes = b"test"
+
+
+def new_account(number: int) -> dict:
+    return {
+        "AccountId": f"Z{number}",
+        "Name": f"Name {number}",
+        "Age": 30,
+        "City": "Pune",
+        "State": "MH",
+        "Pincode": 411001,
+    }
+
+
+@pytest.fixture
+def owner(make_store, tmp_path):
+    """An owner over the test tables, writing snapshots only when told to."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port: int = probe.getsockname()[1]
+    store = make_store()
+    owner = ClusterOwner(
+        store,
+        address=("127.0.0.1", port),
+        authkey=AUTHKEY,
+        folder=tmp_path / "shared",
+        interval=3600,
+    )
+    store.subscribe(owner)
+    owner.start()
+    yield owner
+    owner.stop()
+
+
+def start_worker(owner: ClusterOwner) -> ClusterWorker:
+    worker = ClusterWorker(
+        TableStore(backend=ReplicaBackend(), use_wal=False),
+        address=owner.address,
+        authkey=AUTHKEY,
+        folder=owner.folder,
+    )
+    worker.start()
+    return worker
+
+
+def test_worker_catches_up_with_changes_made_while_it_joins(owner):
+    owner.store.insert("Accounts", new_account(0))
+    owner.store.publish()
+    worker = start_worker(owner)
+    for number in range(1, 50):
+        owner.store.insert("Accounts", new_account(number))
+        owner.store.publish()
+    owner.store.update("Claims", "C1", {"Status": "Closed"})
+    owner.store.publish()
+
+    assert asyncio.run(worker.wait(owner.store.sequence, 10))
+    replica = worker.store.snapshot()
+    assert all(replica.exists("Accounts", f"Z{number}") for number in range(50))
+    assert worker.store.find("Claims", "C1")["Status"] == "Closed"
+    worker.stop()
+
+
+def test_wait_gives_up_after_its_timeout(owner):
+    worker = start_worker(owner)
+
+    assert not asyncio.run(worker.wait(owner.store.sequence + 1, 0.05))
+    assert worker._waiters == []
+    worker.stop()
+
+
+def test_snapshot_is_kept_until_the_joining_worker_loaded_it(owner):
+    joining = Client(owner.address, authkey=AUTHKEY)
+    kind, manifest = joining.recv()
+    loading = owner.folder / manifest["folder"]
+    for number in range(3):
+        owner.store.insert("Accounts", new_account(number))
+        owner.store.publish()
+        owner.write_snapshot()
+    assert loading.is_dir()
+
+    joining.send(("loaded", manifest["version"]))
+    deadline: float = time.monotonic() + 5
+    while owner._loading and time.monotonic() < deadline:
+        time.sleep(0.01)
+    owner.store.insert("Accounts", new_account(3))
+    owner.store.publish()
+    owner.write_snapshot()
+    assert not loading.exists()
+    assert [folder.name for folder in owner.folder.glob("v*")] == [
+        owner._manifest["folder"]
+    ]
+    joining.close()
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from columns import encode_columns
+
+
+def test_repetitive_columns_are_categorical_and_ids_interned(tables):
+    accounts_df: pd.DataFrame = encode_columns("Accounts", tables["Accounts"])
+    claims_df: pd.DataFrame = encode_columns("Claims", tables["Claims"])
+
+    assert str(claims_df["Status"].dtype) == "category"
+    assert str(accounts_df["City"].dtype) == "category"
+    assert str(claims_df["CreatedDate"].dtype) == "datetime64[ns]"
+    account_id: str = accounts_df["AccountId"].iloc[0]
+    assert claims_df["AccountId"].cat.categories[0] is account_id
+
+
+def test_new_values_are_added_as_categories(make_store):
+    store = make_store()
+
+    store.update("Claims", "C1", {"Status": "Rejected"})
+    store.insert(
+        "Claims",
+        {
+            "Id": "C4",
+            "CreatedDate": "2024-01-04T10:00:00Z",
+            "CaseNumber": "0004",
+            "HAN": "H2",
+            "BillAmount": 50,
+            "Status": "Disputed",
+            "AccountId": "A2",
+        },
+    )
+    store.publish()
+
+    claims_df: pd.DataFrame = store.snapshot().tables["Claims"]
+    assert str(claims_df["Status"].dtype) == "category"
+    assert claims_df["Status"].tolist() == ["Rejected", "Open", "Paid", "Disputed"]
+    assert store.find("Claims", "C4")["Status"] == "Disputed"
+    assert store.find_by("Claims", "AccountId", "A2")["Id"].tolist() == ["C3", "C4"]
+
+
+def test_memory_report_lists_every_column_with_its_dtype(make_store):
+    report: dict = make_store().memory_report()
+
+    claims: dict = report["Claims"]
+    assert claims["rows"] == 3
+    assert claims["columns"]["Status"]["dtype"] == "category"
+    assert claims["bytes"] >= sum(
+        column["bytes"] for column in claims["columns"].values()
+    )
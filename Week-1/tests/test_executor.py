@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import ExecutorSaturated, IOExecutor
+
+
+def test_calls_past_max_pending_fail_fast():
+    executor = IOExecutor(max_workers=2, max_pending=2)
+    release = threading.Event()
+    calls: list[int] = []
+
+    def blocking(number: int) -> int:
+        release.wait(5)
+        calls.append(number)
+        return number
+
+    async def run_all() -> list:
+        running = [asyncio.create_task(executor.run(blocking, n)) for n in range(2)]
+        await asyncio.sleep(0)
+        assert executor.pending == 2
+        with pytest.raises(ExecutorSaturated, match="2 storage calls pending"):
+            await executor.run(blocking, 2)
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(run_all()) == [0, 1]
+    assert sorted(calls) == [0, 1]
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def test_failed_call_frees_its_slot():
+    executor = IOExecutor(max_workers=1, max_pending=1)
+
+    def failing() -> None:
+        raise OSError("disk full")
+
+    async def run_twice() -> str:
+        with pytest.raises(OSError):
+            await executor.run(failing)
+        return await executor.run(str.upper, "ok")
+
+    assert asyncio.run(run_twice()) == "OK"
+    assert executor.pending == 0
+    executor.shutdown()
@@ -0,0 +1,130 @@
+import csv
+import datetime
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import export
+from export import dumps, stream_rows
+
+
+def new_claim(claim_id: str, account_id: str) -> dict:
+    return {
+        "Id": claim_id,
+        "CreatedDate": "2024-02-01T10:00:00Z",
+        "CaseNumber": claim_id,
+        "HAN": "H1",
+        "BillAmount": 10,
+        "Status": "Open",
+        "AccountId": account_id,
+    }
+
+
+def test_cursor_stays_valid_while_rows_change(make_store):
+    store = make_store()
+
+    rows, cursor = store.page("Claims", limit=2)
+    assert [row["Id"] for row in rows] == ["C1", "C2"]
+    store.delete("Claims", "C1")
+    store.delete("Claims", "C3")
+    store.insert("Claims", new_claim("C4", "A1"))
+    store.publish()
+    rows, cursor = store.page("Claims", cursor, limit=2)
+
+    assert [row["Id"] for row in rows] == ["C4"]
+    assert cursor is None
+
+
+def test_account_claims_are_paged(make_store):
+    store = make_store()
+    store.insert("Claims", new_claim("C4", "A1"))
+    store.publish()
+
+    rows, cursor = store.account_page("A1", limit=2)
+    assert [row["Id"] for row in rows] == ["C1", "C2"]
+    rows, cursor = store.account_page("A1", cursor, limit=2)
+    assert ([row["Id"] for row in rows], cursor) == (["C4"], None)
+    assert store.account_page("A9") == (None, None)
+
+
+def test_export_reads_the_snapshot_it_started_on(make_store):
+    store = make_store()
+    chunks = store.iter_rows("Claims", chunk_size=1)
+
+    first: list[dict] = next(chunks)
+    store.delete("Claims", "C3")
+    store.insert("Claims", new_claim("C4", "A2"))
+    store.publish()
+
+    assert [row["Id"] for rows in [first, *chunks] for row in rows] == [
+        "C1",
+        "C2",
+        "C3",
+    ]
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv", "arrow"])
+def test_every_format_reads_back_the_exported_rows(make_store, export_format):
+    store = make_store()
+    content: bytes = b"".join(
+        stream_rows(
+            store.iter_rows("Claims", chunk_size=2),
+            export_format,
+            store.dtypes("Claims"),
+        )
+    )
+
+    match export_format:
+        case "ndjson":
+            rows: list[dict] = [json.loads(line) for line in content.splitlines()]
+        case "csv":
+            rows = list(csv.DictReader(io.StringIO(content.decode())))
+        case "arrow":
+            pa = pytest.importorskip("pyarrow")
+            rows = pa.ipc.open_stream(content).read_all().to_pylist()
+    assert [row["Id"] for row in rows] == ["C1", "C2", "C3"]
+    assert [float(row["BillAmount"]) for row in rows] == [100, 200, 300]
+    assert list(rows[0]) == list(store.dtypes("Claims"))
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_writes_plain_json_values(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(export, "orjson", None)
+    elif export.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    content: bytes = dumps(
+        {
+            "count": np.int64(3),
+            "amount": np.float64(1.5),
+            "created": pd.Timestamp("2024-01-01 10:00:00"),
+            "day": datetime.date(2024, 1, 2),
+            "missing": pd.NaT,
+            "none": None,
+        }
+    )
+
+    assert json.loads(content) == {
+        "count": 3,
+        "amount": 1.5,
+        "created": "2024-01-01T10:00:00",
+        "day": "2024-01-02",
+        "missing": None,
+        "none": None,
+    }
+
+
+def test_account_json_matches_the_account_rows(make_store):
+    store = make_store()
+
+    rows: list[dict] = json.loads(store.get_account_json("A1"))
+    assert rows == json.loads(dumps(store.get_account_data("A1")))
+    assert [(row["Id"], row["Policy Name"]) for row in rows] == [
+        ("C1", "Gold"),
+        ("C2", "Silver"),
+    ]
+    assert store.get_account_json("A9") is None
@@ -0,0 +1,72 @@
+import pandas as pd
+
+from index import MultiIndex, UniqueIndex, VersionedMap
+
+
+def test_frozen_map_keeps_its_keys_after_later_writes():
+    live = VersionedMap([("a", 1), ("b", 2)])
+    frozen: VersionedMap = live.freeze()
+
+    live.set("a", 10)
+    live.set("c", 3)
+    live.pop("b")
+
+    assert (frozen.get("a"), "b" in frozen, "c" in frozen, len(frozen)) == (
+        1,
+        True,
+        False,
+        2,
+    )
+    assert (live.get("a"), "b" in live, live.get("c"), len(live)) == (10, False, 3, 2)
+
+
+def test_rollback_drops_the_writes_since_freeze():
+    live = VersionedMap([("a", 1)])
+    frozen: VersionedMap = live.freeze()
+    live.set("b", 2)
+    live.pop("a")
+
+    live.rollback(frozen)
+
+    assert sorted(live.keys()) == ["a"]
+    assert len(live) == 1
+
+
+def test_unique_index_only_removes_the_row_it_points_at():
+    index = UniqueIndex("Id")
+    index.build(pd.DataFrame({"Id": ["C1", "C2"]}))
+
+    index.remove("C1", 5)
+    assert index.get("C1") == 0
+    index.remove("C1", 0)
+    assert index.get("C1") is None
+    assert "C2" in index
+
+
+def test_multi_index_keeps_its_labels_sorted():
+    index = MultiIndex("AccountId")
+    index.build(pd.DataFrame({"AccountId": ["A1", "A2", "A1"]}))
+
+    index.add("A1", 1)
+    index.add("A1", 2)
+    assert index.get("A1") == (0, 1, 2)
+    index.remove("A1", 0)
+    index.remove("A2", 1)
+    assert (index.get("A1"), index.get("A2")) == ((1, 2), ())
+    index.remove("A2", 1)
+    assert "A2" not in index
+
+
+def test_store_lookups_follow_key_changes(make_store):
+    store = make_store()
+
+    store.update("Claims", "C2", {"Id": "C9", "AccountId": "A2"})
+    store.delete("Claims", "C1")
+    store.publish()
+
+    assert not store.exists("Claims", "C2")
+    assert store.find("Claims", "C9")["CaseNumber"] == "0002"
+    assert store.find_by("Claims", "AccountId", "A1").empty
+    assert store.find_by("Claims", "AccountId", "A2")["Id"].tolist() == ["C9", "C3"]
+    keys = pd.Series(["C1", "C3", "C9"])
+    assert store.contains("Claims", keys).tolist() == [False, True, True]
@@ -0,0 +1,140 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import ingest
+from ingest import read_records
+
+
+class Upload(io.BytesIO):
+    """Request body that stays readable after the parsers close it."""
+
+    def close(self) -> None:
+        pass
+
+
+def account(**fields) -> dict:
+    return {
+        "Name": "meera",
+        "Age": 28,
+        "City": "pune",
+        "State": "mh",
+        "Pincode": 411002,
+        **fields,
+    }
+
+
+def test_accounts_follow_the_single_record_rules(make_store):
+    store = make_store()
+    records = pd.DataFrame(
+        [
+            account(),
+            account(Age=25.5),
+            account(Age=0),
+            account(Pincode=41100),
+            account(Pincode="411001.5"),
+            account(Pincode="400001"),
+        ]
+    )
+    result = ingest.ingest(store, "Accounts", records)
+
+    assert result["inserted"] == 2
+    assert result["errors"] == [
+        {"row": 1, "error": "Invalid Age. Must be a whole number."},
+        {"row": 2, "error": "Invalid Age. Cannot be less than or equal to 0."},
+        {"row": 3, "error": "Invalid Pincode. Must be in the format ######"},
+        {"row": 4, "error": "Invalid Pincode. Must be in the format ######"},
+    ]
+    store.publish()
+    inserted = [store.find("Accounts", account_id) for account_id in result["ids"]]
+    assert [row["Pincode"] for row in inserted] == [411002, 400001]
+
+
+def test_claims_and_policies_are_checked_against_the_store(make_store):
+    store = make_store()
+    claims = pd.DataFrame(
+        [
+            {"HAN": "H1", "BillAmount": 10, "Status": "Paid", "AccountId": "A1"},
+            {"HAN": "H9", "BillAmount": 10, "Status": "Paid", "AccountId": "A1"},
+            {"HAN": "H1", "BillAmount": -1, "Status": "Paid", "AccountId": "A1"},
+        ]
+    )
+    policies = pd.DataFrame(
+        [
+            {"HAN": "H3", "Policy Name": "Bronze"},
+            {"HAN": "H1", "Policy Name": "Copper"},
+            {"HAN": "H4", "Policy Name": "Bronze"},
+        ]
+    )
+
+    assert [e["row"] for e in ingest.ingest(store, "Claims", claims)["errors"]] == [
+        1,
+        2,
+    ]
+    assert ingest.ingest(store, "Policies", policies)["ids"] == ["H3"]
+
+
+@pytest.mark.parametrize(
+    "body, content_type",
+    [
+        (b"", "application/json"),
+        (b"  [ ]  ", "application/json"),
+        (b"", "application/x-ndjson"),
+        (b"", "text/csv"),
+    ],
+)
+def test_empty_upload_reports_nothing_to_insert(make_store, body, content_type):
+    records = read_records(io.BytesIO(body), content_type)
+
+    assert ingest.ingest(make_store(), "Accounts", records) == {
+        "status": 200,
+        "message": "Nothing to insert",
+        "inserted": 0,
+    }
+
+
+def test_json_array_is_read_in_chunks(monkeypatch):
+    monkeypatch.setattr(ingest, "READ_CHUNK_BYTES", 7)
+    monkeypatch.setattr(ingest, "READ_CHUNK_ROWS", 2)
+    records = [
+        {"Name": 'Zoë, [the] "first"', "Age": 30},
+        {"Name": "Ravi", "Age": 40.5},
+        {"Name": "Asha", "Age": None},
+    ]
+    body: bytes = json.dumps(records, ensure_ascii=False, indent=1).encode()
+
+    records_df = read_records(io.BytesIO(body), "application/json; charset=utf-8")
+    pd.testing.assert_frame_equal(records_df, pd.DataFrame(records))
+
+
+@pytest.mark.parametrize("body", [b"{}", b"[1, 2]", b'[{"a": 1} {"a": 2}]', b"[{"])
+def test_malformed_json_array_is_refused(body):
+    with pytest.raises(ValueError):
+        read_records(io.BytesIO(body), "application/json")
+
+
+@pytest.mark.parametrize(
+    "content_type, line",
+    [
+        ("application/json", json.dumps(account()).encode() + b","),
+        ("application/x-ndjson", json.dumps(account()).encode() + b"\n"),
+        ("text/csv", b"meera,28,pune,mh,411002\n"),
+    ],
+)
+def test_too_many_records_are_refused_before_the_upload_is_read_whole(
+    monkeypatch, content_type, line
+):
+    monkeypatch.setattr(ingest, "BULK_MAX_RECORDS", 10)
+    body: bytes = line * 100_000
+    match content_type:
+        case "application/json":
+            body = b"[" + body[:-1] + b"]"
+        case "text/csv":
+            body = b"Name,Age,City,State,Pincode\n" + body
+    source = Upload(body)
+
+    with pytest.raises(ValueError, match="At most 10 per request"):
+        read_records(source, content_type)
+    assert source.tell() < len(body) // 2
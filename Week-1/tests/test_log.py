@@ -0,0 +1,48 @@
+import datetime
+
+import pandas as pd
+
+from log import Log
+
+
+def test_rows_are_written_once_the_buffer_is_full(tmp_path):
+    audit_log = Log(tmp_path, flush_size=3)
+    audit_log.write_log("Accounts", "A1", "City", "Pune", "Nagpur")
+    audit_log.write_log("Claims", "C1", "Status", "Open", "Paid")
+
+    assert list(tmp_path.glob("*.jsonl")) == []
+    audit_log.write_log("Accounts", "A1", "Age", 34, 35)
+    written: list[str] = [segment.name for segment in tmp_path.glob("*.jsonl")]
+    assert sorted(name.split("-")[0] for name in written) == ["Accounts", "Claims"]
+    assert audit_log.read("Accounts")["Column"].tolist() == ["City", "Age"]
+
+
+def test_export_has_a_sheet_per_table_with_the_buffered_rows(tmp_path):
+    audit_log = Log(tmp_path, flush_size=100)
+    audit_log.write_log("Policies", "H1", "Policy Name", "Gold", "Platinum")
+    audit_log.write_log("Unknown", "X1", "Column", 1, 2)
+
+    export_path = audit_log.export(tmp_path / "logs.xlsx")
+
+    sheets: dict[str, pd.DataFrame] = pd.read_excel(export_path, sheet_name=None)
+    assert list(sheets) == ["Accounts", "Policies", "Claims"]
+    assert sheets["Accounts"].empty
+    assert sheets["Policies"][["HAN", "OldValue", "NewValue"]].values.tolist() == [
+        ["H1", "Gold", "Platinum"]
+    ]
+
+
+def test_rows_of_a_failed_write_are_kept_for_the_next_flush(tmp_path):
+    audit_log = Log(tmp_path, flush_size=100)
+    segment = tmp_path / f"Claims-{datetime.date.today().isoformat()}.jsonl"
+    # A folder in the way of the segment makes the append fail.
+    segment.mkdir()
+    audit_log.write_log("Claims", "C1", "Status", "Open", "Paid")
+    audit_log.write_log("Accounts", "A1", "City", "Pune", "Nagpur")
+
+    audit_log.flush()
+    assert len(audit_log.read("Accounts")) == 1
+    segment.rmdir()
+    audit_log.flush()
+    assert audit_log.read("Claims")["Id"].tolist() == ["C1"]
+    assert len(audit_log.read("Accounts")) == 1
@@ -0,0 +1,36 @@
+def log_records(store) -> list[dict]:
+    store.commit()
+    return [record for _, _, record in store.wal.replay()]
+
+
+def test_patch_writes_only_the_changed_columns_at_once(make_store):
+    store = make_store()
+
+    result: dict = store.patch(
+        "Accounts", "A1", {"Name": "Asha", "City": "Nagpur", "Age": 35}
+    )
+
+    assert result["status"] == 200
+    assert result["changes"] == {"City": ("Pune", "Nagpur"), "Age": (34, 35)}
+    assert (result["data"]["City"], result["data"]["Age"]) == ("Nagpur", 35)
+    [record] = log_records(store)
+    assert (record["op"], record["data"]) == ("update", {"City": "Nagpur", "Age": 35})
+
+
+def test_patch_without_differences_writes_nothing(make_store):
+    store = make_store()
+    version: int = store.snapshot().version
+
+    result: dict = store.patch("Policies", "H1", {"Policy Name": "Gold"})
+
+    assert (result["message"], result["changes"]) == ("Nothing to modify", {})
+    assert log_records(store) == []
+    assert store.publish().version == version
+
+
+def test_patch_refuses_unknown_columns_and_rows(make_store):
+    store = make_store()
+
+    assert store.patch("Claims", "C1", {"Colour": "red"})["status"] == 400
+    assert store.patch("Claims", "C9", {"Status": "Paid"})["status"] == 404
+    assert log_records(store) == []
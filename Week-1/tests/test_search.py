@@ -0,0 +1,63 @@
+import pandas as pd
+
+from search import AccountSearch, tokenize
+
+
+def build(accounts: list[tuple], **options) -> AccountSearch:
+    index = AccountSearch(**options)
+    index.build(
+        {
+            "Accounts": pd.DataFrame(
+                accounts, columns=["AccountId", "Name", "City", "State", "Pincode"]
+            )
+        }
+    )
+    return index
+
+
+def test_accounts_matching_more_words_rank_first():
+    index = build(
+        [
+            ("A1", "Asha Rao", "Pune", "MH", 411001),
+            ("A2", "Asha Kumar", "Delhi", "DL", 110001),
+            ("A3", "Ravi Rao", "Pune", "MH", 411002),
+        ]
+    )
+
+    assert index.search("asha pune", 10) == [("A1", 2.0), ("A2", 1.0), ("A3", 1.0)]
+
+
+def test_prefix_and_misspelled_words_score_below_exact_ones():
+    index = build(
+        [
+            ("A1", "Meera", "Pune", "MH", 411001),
+            ("A2", "Meerabai", "Pune", "MH", 411001),
+            ("A3", "Mira", "Pune", "MH", 411001),
+        ]
+    )
+    results: dict[str, float] = dict(index.search("meera", 10))
+
+    assert results["A1"] == 1.0
+    assert 0.5 < results["A2"] < 1.0
+    assert "A3" not in results or results["A3"] <= 0.5
+
+
+def test_whole_float_pincode_is_one_word():
+    assert tokenize(400001.0) == ["400001"]
+    assert tokenize(float("nan")) == []
+
+    index = build([("A1", "Asha", "Mumbai", "MH", 400001.0)])
+    assert index.search("400001", 10) == [("A1", 1.0)]
+    assert index.search("0", 10) == []
+
+
+def test_common_words_only_rank_the_accounts_the_rare_ones_found():
+    index = build(
+        [("A0", "Zubin", "Pune", "MH", 411001)]
+        + [(f"A{i}", "Asha", "Pune", "MH", 411001) for i in range(1, 50)],
+        max_postings=10,
+    )
+
+    assert index.search("zubin pune", 5) == [("A0", 2.0)]
+    # A word alone over the cap still yields some of its accounts.
+    assert len(index.search("pune", 50)) == 10
@@ -0,0 +1,69 @@
+import threading
+
+from snapshot import Snapshot
+
+
+def test_snapshot_keeps_its_version_after_later_writes(make_store):
+    store = make_store()
+    snapshot: Snapshot = store.snapshot()
+
+    store.update("Accounts", "A1", {"City": "Nagpur"})
+    store.delete("Claims", "C2")
+    store.publish()
+
+    [account] = snapshot.rows("Accounts", [snapshot.label("Accounts", "A1")])
+    assert account["City"] == "Pune"
+    assert snapshot.exists("Claims", "C2")
+    assert len(snapshot.tables["Claims"]) == 3
+    assert [row["Id"] for row in snapshot.view.get("A1")] == ["C1", "C2"]
+    assert store.snapshot().version == snapshot.version + 1
+
+
+def test_writer_sees_its_changes_before_they_are_published(make_store):
+    store = make_store()
+    seen: dict[str, bool] = {}
+
+    def other_reader() -> None:
+        seen["other"] = store.exists("Claims", "C2")
+
+    with store.writing():
+        store.delete("Claims", "C2")
+        seen["writer"] = store.exists("Claims", "C2")
+        reader = threading.Thread(target=other_reader)
+        reader.start()
+        reader.join()
+    assert seen == {"writer": False, "other": True}
+    store.publish()
+    assert not store.exists("Claims", "C2")
+
+
+def test_readers_never_see_half_of_a_published_group(make_store):
+    store = make_store()
+    stop = threading.Event()
+    torn: list[tuple] = []
+
+    def read() -> None:
+        while not stop.is_set():
+            snapshot: Snapshot = store.snapshot()
+            counts: tuple = tuple(
+                len(snapshot.labels("Claims", "AccountId", account_id))
+                for account_id in ["A1", "A2"]
+            )
+            # Every group leaves one claim on A1 and two on A2, halfway through
+            # it can leave none or three.
+            if counts not in [(2, 1), (1, 2)]:
+                torn.append(counts)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for number in range(200):
+        source, target = ("A1", "A2") if number % 2 == 0 else ("A2", "A1")
+        with store.writing():
+            store.update("Claims", "C2", {"AccountId": target})
+            store.update("Claims", "C1", {"AccountId": target})
+            store.update("Claims", "C1", {"AccountId": source})
+        store.publish()
+    stop.set()
+    reader.join()
+
+    assert torn == []
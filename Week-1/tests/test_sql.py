@@ -0,0 +1,147 @@
+from contextlib import contextmanager
+
+import mysql.connector
+import pytest
+
+import sql.myconnection
+from sql.myconnection import ConnectionPool
+from storage import SQLBackend
+
+ACCOUNT: dict = {
+    "AccountId": "A1",
+    "Name": "Asha",
+    "Age": 34,
+    "City": "Pune",
+    "State": "MH",
+    "Pincode": 411001,
+}
+
+
+class FakeCursor:
+    def __init__(self, connection: "FakeConnection"):
+        self.connection = connection
+
+    def execute(self, statement: str, params: tuple = ()) -> None:
+        if self.connection.fail_on and self.connection.fail_on in statement:
+            raise mysql.connector.Error("Lost connection")
+        self.connection.pending.append((statement, params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+class FakeConnection:
+    """Records the statements of every committed transaction."""
+
+    def __init__(self):
+        self.pending: list[tuple[str, tuple]] = []
+        self.committed: list[list[tuple[str, tuple]]] = []
+        self.rollbacks: int = 0
+        self.fail_on: str | None = None
+
+    def cursor(self, prepared: bool = False) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        self.committed.append(self.pending)
+        self.pending = []
+
+    def rollback(self) -> None:
+        self.pending = []
+        self.rollbacks += 1
+
+
+class FakePool:
+    def __init__(self, config: dict, pool_size: int):
+        self.connection_ = FakeConnection()
+
+    @contextmanager
+    def connection(self):
+        yield self.connection_
+
+
+@pytest.fixture
+def backend(monkeypatch) -> SQLBackend:
+    monkeypatch.setattr(sql.myconnection, "ConnectionPool", FakePool)
+    return SQLBackend(config={})
+
+
+def test_inserts_and_key_changes_are_written_as_upserts(backend):
+    renamed: dict = {**ACCOUNT, "AccountId": "A9"}
+
+    [(insert, params)] = backend._statements("Accounts", None, ACCOUNT)
+    assert insert.endswith(
+        "AS new ON DUPLICATE KEY UPDATE `AccountId` = new.`AccountId`, `Name` = new.`Name`, "
+        "`Age` = new.`Age`, `City` = new.`City`, `State` = new.`State`, `Pincode` = new.`Pincode`"
+    )
+    assert params == ("A1", "Asha", 34, "Pune", "MH", 411001)
+    statements = backend._statements("Accounts", ACCOUNT, renamed)
+    assert statements[0] == ("DELETE FROM accounts WHERE `AccountId` = %s", ("A1",))
+    assert statements[1][1][0] == "A9"
+
+
+def test_updates_set_only_the_changed_columns(backend):
+    changed: dict = {**ACCOUNT, "City": "Nagpur", "Age": 35}
+
+    assert backend._statements("Accounts", ACCOUNT, changed) == [
+        (
+            "UPDATE accounts SET `Age` = %s, `City` = %s WHERE `AccountId` = %s",
+            (35, "Nagpur", "A1"),
+        )
+    ]
+    assert backend._statements("Accounts", ACCOUNT, dict(ACCOUNT)) == []
+    assert backend._statements("Accounts", ACCOUNT, None) == [
+        ("DELETE FROM accounts WHERE `AccountId` = %s", ("A1",))
+    ]
+
+
+def test_failed_save_rolls_back_and_retries_the_changes_in_order(backend):
+    connection: FakeConnection = backend.pool.connection_
+    backend.apply("Accounts", None, ACCOUNT)
+    backend.apply("Accounts", ACCOUNT, {**ACCOUNT, "City": "Nagpur"})
+    connection.fail_on = "UPDATE"
+
+    assert backend.save({})["status"] == 500
+    assert (connection.rollbacks, connection.committed) == (1, [])
+
+    connection.fail_on = None
+    backend.apply("Accounts", {**ACCOUNT, "City": "Nagpur"}, None)
+    assert backend.save({})["status"] == 200
+    [transaction] = connection.committed
+    assert [statement.split()[0] for statement, _ in transaction] == [
+        "INSERT",
+        "UPDATE",
+        "DELETE",
+    ]
+
+
+class FakePooledConnection:
+    def ping(self, reconnect: bool, attempts: int, delay: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FakeMySQLPool:
+    def __init__(self, **kwargs):
+        pass
+
+    def get_connection(self) -> FakePooledConnection:
+        return FakePooledConnection()
+
+
+def test_pool_hands_out_at_most_pool_size_connections(monkeypatch):
+    monkeypatch.setattr(sql.myconnection, "MySQLConnectionPool", FakeMySQLPool)
+    pool = ConnectionPool({}, pool_size=1, timeout=0.05)
+
+    with pool.connection():
+        with pytest.raises(mysql.connector.errors.PoolError):
+            with pool.connection():
+                pass
+    # Returned connections can be borrowed again.
+    with pool.connection():
+        pass
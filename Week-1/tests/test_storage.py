@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from storage import ArrowBackend, ExcelBackend, ParquetBackend, StorageBackendFactory
+from store import TableStore
+from wal import WriteAheadLog
+
+ROOT: Path = Path(__file__).resolve().parents[1]
+
+# Commits a few changes, then dies while the flush writes the second sheet.
+CRASHING_FLUSH: str = textwrap.dedent("""
+    import os
+    import sys
+    from pathlib import Path
+
+    import pandas as pd
+
+    from storage import ExcelBackend
+    from store import TableStore
+    from wal import WriteAheadLog
+
+    folder = Path(sys.argv[1])
+    store = TableStore(
+        backend=ExcelBackend(folder / "cleaned.xlsx"), wal=WriteAheadLog(folder / "wal")
+    )
+    store.load()
+    store.insert(
+        "Accounts",
+        {"AccountId": "A3", "Name": "Meera", "Age": 28, "City": "Pune",
+         "State": "MH", "Pincode": 411002},
+    )
+    store.update("Claims", "C1", {"Status": "Closed"})
+    store.commit()
+
+    to_excel = pd.DataFrame.to_excel
+    written = []
+
+    def crash_halfway(self, *args, **kwargs):
+        if written:
+            os._exit(1)
+        written.append(kwargs.get("sheet_name"))
+        return to_excel(self, *args, **kwargs)
+
+    pd.DataFrame.to_excel = crash_halfway
+    store.flush()
+    """)
+
+
+def test_crash_during_an_excel_flush_recovers_from_the_log(tmp_path, tables):
+    workbook: Path = tmp_path / "cleaned.xlsx"
+    ExcelBackend(workbook).replace(tables)
+
+    crashed = subprocess.run(
+        [sys.executable, "-c", CRASHING_FLUSH, str(tmp_path)],
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+    )
+    assert crashed.returncode == 1
+
+    # The half written copy never replaced the workbook.
+    sheets: dict[str, pd.DataFrame] = pd.read_excel(workbook, sheet_name=None)
+    assert sheets["Accounts"]["AccountId"].tolist() == ["A1", "A2"]
+
+    store = TableStore(
+        backend=ExcelBackend(workbook), wal=WriteAheadLog(tmp_path / "wal")
+    )
+    store.load()
+    assert store.exists("Accounts", "A3")
+    assert store.find("Claims", "C1")["Status"] == "Closed"
+
+    assert store.flush()["status"] == 200
+    store.wal.close()
+    sheets = pd.read_excel(workbook, sheet_name=None)
+    assert sheets["Accounts"]["AccountId"].tolist() == ["A1", "A2", "A3"]
+    assert sheets["Claims"]["Status"].tolist() == ["Closed", "Open", "Paid"]
+    assert sheets["Policies"]["HAN"].tolist() == ["H1", "H2"]
+
+
+@pytest.mark.parametrize("backend_class", [ParquetBackend, ArrowBackend])
+def test_columnar_backend_rewrites_only_the_dirty_tables(
+    tmp_path, tables, backend_class
+):
+    pytest.importorskip("pyarrow")
+    backend = backend_class(tmp_path)
+    backend.replace(tables)
+    policies_written: int = backend.table_path("Policies").stat().st_mtime_ns
+    store = TableStore(backend=backend, use_wal=False)
+    store.load()
+
+    store.update("Claims", "C2", {"Status": "Paid", "BillAmount": 250.5})
+    assert store.flush()["status"] == 200
+
+    assert backend.table_path("Policies").stat().st_mtime_ns == policies_written
+    assert not list(tmp_path.glob("*.tmp"))
+    reloaded = TableStore(backend=backend_class(tmp_path), use_wal=False)
+    reloaded.load()
+    claims_df: pd.DataFrame = reloaded.snapshot().tables["Claims"]
+    assert claims_df["BillAmount"].tolist() == [100, 250.5, 300]
+    assert claims_df["Status"].tolist() == ["Paid", "Paid", "Paid"]
+    # Timestamps are kept as timestamps, not parsed again from strings.
+    assert backend.load("Claims")["CreatedDate"].dtype.kind == "M"
+    pd.testing.assert_frame_equal(
+        reloaded.snapshot().tables["Accounts"], store.snapshot().tables["Accounts"]
+    )
+
+
+def test_unknown_backend_is_refused():
+    with pytest.raises(ValueError, match="not supported"):
+        StorageBackendFactory.get_backend("csv")
@@ -0,0 +1,85 @@
+import pandas as pd
+
+from storage import ParquetBackend
+from store import TableStore
+from table import ChunkedTable
+
+
+def numbers(count: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"Key": [f"K{n}" for n in range(count)], "Value": list(range(count))}
+    )
+
+
+def test_frozen_table_is_untouched_by_later_writes():
+    table = ChunkedTable(numbers(5), chunk_rows=2)
+    frozen: ChunkedTable = table.freeze()
+
+    table.update(1, {"Value": 10})
+    table.drop(4)
+    table.append_row(5, {"Key": "K5", "Value": 5})
+
+    pd.testing.assert_frame_equal(frozen.frame(), numbers(5))
+    assert table.frame()["Value"].tolist() == [0, 10, 2, 3, 5]
+
+
+def test_write_copies_only_the_chunk_it_changes():
+    table = ChunkedTable(numbers(6), chunk_rows=2)
+    frozen: ChunkedTable = table.freeze()
+
+    table.update(3, {"Value": 30})
+    table.update(2, {"Value": 20})
+
+    assert [a is b for a, b in zip(table._chunks, frozen._chunks)] == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_appended_rows_are_read_from_the_tail_buffer():
+    table = ChunkedTable(numbers(2), chunk_rows=2)
+    for label in range(2, 5):
+        table.append_row(label, {"Key": f"K{label}", "Value": label})
+
+    assert len(table) == 5
+    assert table.row(3) == {"Key": "K3", "Value": 3}
+    assert [len(chunk) for chunk in table._chunks] == [2, 2, 1]
+
+
+def test_compact_merges_small_chunks_and_keeps_the_rows():
+    table = ChunkedTable(numbers(8), chunk_rows=4)
+    table.append(numbers(10).iloc[8:])
+    for label in [1, 2, 5, 6, 7]:
+        table.drop(label)
+    before: pd.DataFrame = table.frame()
+
+    table.compact()
+
+    assert [len(chunk) for chunk in table._chunks] == [3, 2]
+    pd.testing.assert_frame_equal(table.frame(), before)
+
+
+def test_pages_follow_the_cursor_across_chunks():
+    table = ChunkedTable(numbers(5), chunk_rows=2)
+    table.drop(2)
+
+    rows, cursor = table.page(None, 3)
+    assert [row["Value"] for row in rows] == [0, 1, 3]
+    rows, cursor = table.page(cursor, 3)
+    assert [row["Value"] for row in rows] == [4]
+    assert cursor is None
+
+
+def test_writes_reach_the_backend_on_the_next_flush(tmp_path, tables):
+    backend = ParquetBackend(tmp_path)
+    backend.replace(tables)
+    store = TableStore(backend=backend, use_wal=False, flush_batch_size=100)
+    store.load()
+
+    store.update("Accounts", "A1", {"City": "Nagpur"})
+    store.publish()
+    assert backend.load("Accounts")["City"].tolist() == ["Pune", "Delhi"]
+    assert store.flush()["status"] == 200
+    assert backend.load("Accounts")["City"].tolist() == ["Nagpur", "Delhi"]
+    assert store.flush()["message"] == "Nothing to flush"
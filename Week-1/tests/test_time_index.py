@@ -0,0 +1,71 @@
+import pandas as pd
+
+
+def claim(claim_id: str, account_id: str, created: str) -> dict:
+    return {
+        "Id": claim_id,
+        "CreatedDate": created,
+        "CaseNumber": claim_id,
+        "HAN": "H1",
+        "BillAmount": 10,
+        "Status": "Open",
+        "AccountId": account_id,
+    }
+
+
+def window(store, start: str, end: str, limit: int) -> list[list[str]]:
+    pages: list[list[str]] = []
+    cursor: str | None = None
+    while True:
+        rows, _, cursor = store.between(
+            "Claims", pd.Timestamp(start), pd.Timestamp(end), cursor, limit
+        )
+        pages.append([row["Id"] for row in rows])
+        if cursor is None:
+            return pages
+
+
+def test_window_is_paged_oldest_first(make_store):
+    store = make_store()
+    # Same instant as C2, given in IST.
+    store.insert("Claims", claim("C4", "A2", "2024-01-02T15:30:00+05:30"))
+    store.publish()
+
+    rows, count, _ = store.between(
+        "Claims", pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-03"), limit=1
+    )
+    assert (rows[0]["Id"], count) == ("C1", 3)
+    assert window(store, "2024-01-01", "2024-01-03", 2) == [["C1", "C2"], ["C4"]]
+    assert window(store, "2024-01-03T10:00:00", "2024-02-01", 2) == [["C3"]]
+    assert window(store, "2023-01-01", "2023-02-01", 2) == [[]]
+
+
+def test_window_follows_changed_dates(make_store):
+    store = make_store()
+    store.update("Claims", "C1", {"CreatedDate": "2024-01-05T10:00:00Z"})
+    store.delete("Claims", "C2")
+    store.publish()
+
+    assert window(store, "2024-01-01", "2024-01-10", 10) == [["C3", "C1"]]
+    assert store.find("Claims", "C1")["CreatedDate"] == pd.Timestamp(
+        "2024-01-05 10:00:00"
+    )
+
+
+def test_latest_claims_of_an_account_newest_first(make_store):
+    store = make_store()
+    assert [row["Id"] for row in store.latest("Claims", "AccountId", "A1", 5)] == [
+        "C2",
+        "C1",
+    ]
+
+    store.insert("Claims", claim("C4", "A1", "2024-01-10T10:00:00Z"))
+    store.update("Claims", "C1", {"AccountId": "A2"})
+    store.publish()
+
+    assert [row["Id"] for row in store.latest("Claims", "AccountId", "A1", 1)] == ["C4"]
+    assert [row["Id"] for row in store.latest("Claims", "AccountId", "A2", 5)] == [
+        "C3",
+        "C1",
+    ]
+    assert store.latest("Claims", "AccountId", "A9", 5) == []
@@ -0,0 +1,63 @@
+import json
+
+from view import MergedView
+
+
+def rows(content: bytes | None) -> list[dict] | None:
+    if content is None:
+        return None
+    return sorted(json.loads(content), key=lambda row: str(row["Id"]))
+
+
+def test_changes_give_the_same_rows_as_a_full_join(make_store):
+    store = make_store()
+    store.insert(
+        "Accounts",
+        {
+            "AccountId": "A3",
+            "Name": "Meera",
+            "Age": 28,
+            "City": "Pune",
+            "State": "MH",
+            "Pincode": 411002,
+        },
+    )
+    store.insert(
+        "Claims",
+        {
+            "Id": "C4",
+            "CreatedDate": "2024-01-04T10:00:00Z",
+            "CaseNumber": "0004",
+            "HAN": "H2",
+            "BillAmount": 50,
+            "Status": "Open",
+            "AccountId": "A1",
+        },
+    )
+    store.update("Claims", "C3", {"AccountId": "A1", "HAN": "H2"})
+    store.update("Policies", "H2", {"Policy Name": "Platinum"})
+    store.delete("Accounts", "A2")
+    store.publish()
+
+    rebuilt = MergedView()
+    rebuilt.build(dict(store.snapshot().tables))
+    for account_id in ["A1", "A2", "A3"]:
+        assert rows(store.get_account_json(account_id)) == rows(
+            rebuilt.get_json(account_id)
+        )
+    assert {row["Policy Name"] for row in store.get_account_data("A1")} == {
+        "Gold",
+        "Platinum",
+    }
+    assert store.get_account_data("A3")[0]["Id"] is None
+
+
+def test_frozen_view_keeps_the_rows_of_its_version(make_store):
+    store = make_store()
+    before: MergedView = store.snapshot().view
+
+    store.update("Accounts", "A1", {"City": "Nagpur"})
+    store.publish()
+
+    assert {row["City"] for row in before.get("A1")} == {"Pune"}
+    assert {row["City"] for row in store.get_account_data("A1")} == {"Nagpur"}
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+
+def write_changes(store) -> None:
+    assert store.insert(
+        "Accounts",
+        {
+            "AccountId": "A3",
+            "Name": "Meera",
+            "Age": 28,
+            "City": "Pune",
+            "State": "MH",
+            "Pincode": 411002,
+        },
+    ) == {"status": 200, "message": "success"}
+    assert (
+        store.update("Claims", "C1", {"Status": "Closed", "BillAmount": 150})["status"]
+        == 200
+    )
+    assert store.delete("Claims", "C2")["status"] == 200
+    assert store.commit()["status"] == 200
+
+
+def test_replay_restores_committed_changes_after_a_crash(make_store):
+    write_changes(make_store())
+
+    # Nothing was flushed, the restarted store only has the log to go by.
+    store = make_store()
+    assert store.exists("Accounts", "A3")
+    claim = store.find("Claims", "C1")
+    assert (claim["Status"], claim["BillAmount"]) == ("Closed", 150)
+    assert not store.exists("Claims", "C2")
+    assert [row["Id"] for row in store.get_account_data("A1")] == ["C1"]
+
+
+def test_flush_checkpoints_the_log(make_store):
+    store = make_store()
+    write_changes(store)
+    assert store.flush()["status"] == 200
+    assert list(store.wal.replay()) == []
+
+    restarted = make_store()
+    assert restarted.exists("Accounts", "A3")
+    assert not restarted.exists("Claims", "C2")
+
+
+def test_torn_last_record_is_skipped(make_store):
+    store = make_store()
+    write_changes(store)
+    segment = store.wal._segments()[-1]
+    with open(segment, "a") as file:
+        file.write('{"lsn": 99, "op": "insert", "sheet": "Acc')
+    store.wal.close()
+
+    restarted = make_store()
+    assert restarted.exists("Accounts", "A3")
+    assert not restarted.exists("Claims", "C2")
+
+
+def test_corrupted_record_fails_the_replay(make_store):
+    store = make_store()
+    write_changes(store)
+    segment = store.wal._segments()[-1]
+    lines = segment.read_text().splitlines(keepends=True)
+    lines[0] = "not json\n"
+    segment.write_text("".join(lines))
+
+    with pytest.raises(ValueError, match="Corrupted write-ahead log record"):
+        make_store()
+
+
+def test_unknown_op_fails_the_replay(make_store):
+    store = make_store()
+    store.wal.append("truncate", "Claims", None, None)
+    store.commit()
+
+    with pytest.raises(ValueError, match="Unknown write-ahead log op 'truncate'"):
+        make_store()
+
+
+def test_records_are_replayed_in_log_order(make_store):
+    store = make_store()
+    for age in range(40, 45):
+        store.update("Accounts", "A1", {"Age": age})
+    store.commit()
+    records = [
+        json.loads(line)
+        for segment in store.wal._segments()
+        for line in segment.read_text().splitlines()
+    ]
+    assert [record["lsn"] for record in records] == sorted(
+        record["lsn"] for record in records
+    )
+
+    assert make_store().find("Accounts", "A1")["Age"] == 44
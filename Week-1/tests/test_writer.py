@@ -0,0 +1,153 @@
+import contextlib
+
+import pytest
+
+from executor import ExecutorSaturated
+from writer import CommitQueue
+
+NEW_ACCOUNT: dict = {
+    "AccountId": "A3",
+    "Name": "Meera",
+    "Age": 28,
+    "City": "Pune",
+    "State": "MH",
+    "Pincode": 411002,
+}
+
+
+def count_calls(monkeypatch, store, name: str) -> list:
+    calls: list = []
+    method = getattr(store, name)
+
+    def counted(*args, **kwargs):
+        calls.append(name)
+        return method(*args, **kwargs)
+
+    monkeypatch.setattr(store, name, counted)
+    return calls
+
+
+def test_mutations_apply_in_submission_order(make_store):
+    store = make_store()
+    queue = CommitQueue(store)
+    futures = [
+        queue.submit(store.update, "Accounts", "A1", {"Age": age})
+        for age in range(40, 60)
+    ]
+    queue.start()
+    queue.stop()
+
+    assert all(future.result()["status"] == 200 for future in futures)
+    assert store.find("Accounts", "A1")["Age"] == 59
+
+
+def test_queued_mutations_share_one_commit(make_store, monkeypatch):
+    store = make_store()
+    commits = count_calls(monkeypatch, store, "commit")
+    publishes = count_calls(monkeypatch, store, "publish")
+    queue = CommitQueue(store, max_batch=10)
+    futures = [
+        queue.submit(store.update, "Accounts", "A1", {"Age": age}) for age in range(25)
+    ]
+    queue.start()
+    queue.stop()
+
+    assert [future.result()["status"] for future in futures] == [200] * 25
+    assert len(commits) == len(publishes) == 3
+
+
+def test_mutation_sees_the_changes_before_it_in_its_group(make_store):
+    store = make_store()
+    queue = CommitQueue(store)
+    inserted = queue.submit(store.insert, "Accounts", NEW_ACCOUNT)
+    seen = queue.submit(store.exists, "Accounts", "A3")
+    updated = queue.submit(store.update, "Accounts", "A3", {"Age": 29})
+    queue.start()
+    queue.stop()
+
+    assert inserted.result()["status"] == 200
+    assert seen.result() is True
+    assert updated.result()["status"] == 200
+    assert store.find("Accounts", "A3")["Age"] == 29
+
+
+def test_changes_are_published_after_the_commit(make_store):
+    store = make_store()
+    queue = CommitQueue(store)
+    future = queue.submit(store.insert, "Accounts", NEW_ACCOUNT)
+    assert not store.exists("Accounts", "A3")
+    queue.start()
+    queue.stop()
+
+    assert future.result()["status"] == 200
+    assert store.snapshot().exists("Accounts", "A3")
+    assert list(store.wal.replay())[-1][2]["key"] == "A3"
+
+
+def test_failed_mutation_does_not_fail_its_group(make_store):
+    store = make_store()
+    queue = CommitQueue(store)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    before = queue.submit(store.update, "Accounts", "A1", {"Age": 41})
+    failed = queue.submit(fail)
+    after = queue.submit(store.update, "Accounts", "A2", {"Age": 52})
+    queue.start()
+    queue.stop()
+
+    assert before.result()["status"] == after.result()["status"] == 200
+    with pytest.raises(RuntimeError, match="boom"):
+        failed.result()
+
+
+def test_mutation_failing_halfway_leaves_no_partial_changes(make_store):
+    store = make_store()
+    queue = CommitQueue(store)
+    audited: list[str] = []
+
+    def update_and_audit(key: str, age: int) -> dict:
+        queue.after_commit(audited.append, key)
+        return store.update("Accounts", key, {"Age": age})
+
+    def fail_halfway():
+        update_and_audit("A1", 99)
+        store.insert("Accounts", NEW_ACCOUNT)
+        store.delete("Claims", "C1")
+        raise RuntimeError("boom")
+
+    before = queue.submit(update_and_audit, "A1", 41)
+    failed = queue.submit(fail_halfway)
+    after = queue.submit(update_and_audit, "A2", 52)
+    queue.start()
+    queue.stop()
+
+    assert before.result()["status"] == after.result()["status"] == 200
+    with pytest.raises(RuntimeError, match="boom"):
+        failed.result()
+    assert audited == ["A1", "A2"]
+    # Neither in the published snapshot nor in the tables the writer sees.
+    for writing in (False, True):
+        with store.writing() if writing else contextlib.nullcontext():
+            assert store.find("Accounts", "A1")["Age"] == 41
+            assert store.find("Accounts", "A2")["Age"] == 52
+            assert not store.exists("Accounts", "A3")
+            assert store.exists("Claims", "C1")
+    assert [record["key"] for _, _, record in store.wal.replay()] == ["A1", "A2"]
+
+    # Nor does a restart bring them back from the write-ahead log.
+    store.wal.close()
+    restarted = make_store()
+    assert restarted.find("Accounts", "A1")["Age"] == 41
+    assert not restarted.exists("Accounts", "A3")
+    assert restarted.exists("Claims", "C1")
+
+
+def test_full_queue_is_rejected(make_store):
+    store = make_store()
+    queue = CommitQueue(store, max_pending=1)
+    queue.submit(store.exists, "Accounts", "A1")
+
+    with pytest.raises(ExecutorSaturated):
+        queue.submit(store.exists, "Accounts", "A2")
@@ -0,0 +1,250 @@
+from typing import Any, Hashable
+
+import pandas as pd
+from loguru import logger
+
+from data import merge_data
+from export import dumps
+from index import VersionedMap
+
+# Key of the joined row kept for an account that has no claims yet.
+NO_CLAIM = None
+
+
+class MergedView:
+    def __init__(self):
+        """Accounts left joined with their claims and the claims with their policies.
+
+        The join is computed once by `build` with the same `merge_data` used for
+        the workbook, and afterwards every insert, update and delete reported
+        through `apply` only touches the joined rows of the accounts, claims
+        and policies involved.
+
+        Only the store's writer changes the view. Readers get `freeze`d
+        versions of it, one per snapshot, which share the rows of every account
+        not changed since. The rows of an account are replaced on change,
+        never modified in place.
+        """
+        self._account_columns: list[str] = []
+        self._claim_columns: list[str] = []
+        self._accounts: dict[Hashable, dict] = {}
+        self._claims: dict[Hashable, dict[Hashable, dict]] = {}
+        self._claims_by_han: dict[Hashable, set[tuple[Hashable, Hashable]]] = {}
+        self._policy_names: dict[Hashable, Any] = {}
+        self._joined: VersionedMap = VersionedMap()
+
+    def build(self, tables: dict[str, pd.DataFrame]) -> None:
+        """Materializes the join from the full sheets."""
+        accounts_df: pd.DataFrame = tables["Accounts"]
+        claims_df: pd.DataFrame = tables["Claims"]
+        policies_df: pd.DataFrame = tables["Policies"]
+        merged_df: pd.DataFrame = merge_data(accounts_df, claims_df, policies_df)
+        merged_df = merged_df.astype(object).where(merged_df.notna(), None)
+
+        self._account_columns = accounts_df.columns.to_list()
+        self._claim_columns = [
+            column for column in claims_df.columns if column != "AccountId"
+        ]
+        self._accounts = {
+            record["AccountId"]: record
+            for record in accounts_df.to_dict(orient="records")
+        }
+        self._claims = {}
+        self._claims_by_han = {}
+        for record in claims_df.to_dict(orient="records"):
+            self._add_claim(record)
+        self._policy_names = dict(
+            zip(policies_df["HAN"].tolist(), policies_df["Policy Name"].tolist())
+        )
+        joined: dict[Hashable, dict[Hashable, dict]] = {}
+        for row in merged_df.to_dict(orient="records"):
+            claim_key: Hashable = row["Id"] if row["Id"] is not None else NO_CLAIM
+            joined.setdefault(row["AccountId"], {})[claim_key] = row
+        self._joined = VersionedMap(joined.items())
+        logger.info(f"Merged view built for {len(self._joined)} accounts.")
+
+    def get(self, account_id: str) -> list[dict] | None:
+        """Returns the joined rows of an account, None if the account is missing."""
+        rows: dict[Hashable, dict] | None = self._joined.get(account_id)
+        if rows is None:
+            return None
+        return [dict(row) for row in rows.values()]
+
+    def get_json(self, account_id: str) -> bytes | None:
+        """Returns the joined rows of an account encoded as a JSON array, None if
+        the account is missing. The rows are encoded in place, without copies."""
+        rows: dict[Hashable, dict] | None = self._joined.get(account_id)
+        if rows is None:
+            return None
+        return dumps(list(rows.values()))
+
+    def hans(self, account_id: str) -> set[Hashable]:
+        """Returns the HANs of the claims of an account."""
+        rows: dict[Hashable, dict] = self._joined.get(account_id, {})
+        return {row["HAN"] for claim_key, row in rows.items() if claim_key != NO_CLAIM}
+
+    def freeze(self) -> "MergedView":
+        """Returns a read only version of the joined rows as they are now."""
+        frozen: MergedView = MergedView()
+        frozen._account_columns = self._account_columns
+        frozen._claim_columns = self._claim_columns
+        frozen._joined = self._joined.freeze()
+        return frozen
+
+    @property
+    def columns(self) -> list[str]:
+        """Columns of the joined rows, in order."""
+        return [*self._account_columns, *self._claim_columns, "Policy Name"]
+
+    def apply(
+        self, sheet_name: str, old_row: dict | None, new_row: dict | None
+    ) -> None:
+        """Folds one insert (no `old_row`), delete (no `new_row`) or update into the view."""
+        match sheet_name:
+            case "Accounts":
+                self._apply_account(old_row, new_row)
+            case "Claims":
+                self._apply_claim(old_row, new_row)
+            case "Policies":
+                self._apply_policy(old_row, new_row)
+
+    def _apply_account(self, old_row: dict | None, new_row: dict | None) -> None:
+        if old_row is not None:
+            self._accounts.pop(old_row["AccountId"], None)
+            self._joined.pop(old_row["AccountId"])
+        if new_row is not None:
+            account_id: Hashable = new_row["AccountId"]
+            self._accounts[account_id] = dict(new_row)
+            claims: dict[Hashable, dict] = self._claims.get(account_id, {})
+            if claims:
+                self._joined.set(
+                    account_id,
+                    {
+                        claim_id: self._join(self._accounts[account_id], claim)
+                        for claim_id, claim in claims.items()
+                    },
+                )
+            else:
+                self._joined.set(
+                    account_id, {NO_CLAIM: self._join(self._accounts[account_id], None)}
+                )
+
+    def _apply_claim(self, old_row: dict | None, new_row: dict | None) -> None:
+        if (
+            old_row is not None
+            and new_row is not None
+            and old_row["Id"] == new_row["Id"]
+            and old_row["AccountId"] == new_row["AccountId"]
+        ):
+            # Same account and id, replace the joined row where it stands.
+            self._remove_claim(old_row)
+            self._add_claim(new_row)
+            account: dict | None = self._accounts.get(new_row["AccountId"])
+            if account is not None:
+                self._replace(
+                    new_row["AccountId"], {new_row["Id"]: self._join(account, new_row)}
+                )
+            return
+
+        if old_row is not None:
+            self._remove_claim(old_row)
+            joined: dict[Hashable, dict] | None = self._joined.get(old_row["AccountId"])
+            if joined is not None:
+                joined = {
+                    claim_id: row
+                    for claim_id, row in joined.items()
+                    if claim_id != old_row["Id"]
+                }
+                if not joined:
+                    joined[NO_CLAIM] = self._join(
+                        self._accounts[old_row["AccountId"]], None
+                    )
+                self._joined.set(old_row["AccountId"], joined)
+        if new_row is not None:
+            self._add_claim(new_row)
+            joined = self._joined.get(new_row["AccountId"])
+            if joined is not None:
+                joined = {
+                    claim_id: row
+                    for claim_id, row in joined.items()
+                    if claim_id != NO_CLAIM
+                }
+                joined[new_row["Id"]] = self._join(
+                    self._accounts[new_row["AccountId"]], new_row
+                )
+                self._joined.set(new_row["AccountId"], joined)
+
+    def _apply_policy(self, old_row: dict | None, new_row: dict | None) -> None:
+        affected_hans: set[Hashable] = set()
+        if old_row is not None:
+            self._policy_names.pop(old_row["HAN"], None)
+            affected_hans.add(old_row["HAN"])
+        if new_row is not None:
+            self._policy_names[new_row["HAN"]] = new_row["Policy Name"]
+            affected_hans.add(new_row["HAN"])
+
+        for han in affected_hans:
+            policy_name: Any = self._policy_name(han)
+            for account_id, claim_id in self._claims_by_han.get(han, set()):
+                joined: dict[Hashable, dict] | None = self._joined.get(account_id)
+                if joined is not None and claim_id in joined:
+                    self._replace(
+                        account_id,
+                        {claim_id: {**joined[claim_id], "Policy Name": policy_name}},
+                    )
+
+    def _add_claim(self, claim: dict) -> None:
+        claim = dict(claim)
+        self._claims.setdefault(claim["AccountId"], {})[claim["Id"]] = claim
+        self._claims_by_han.setdefault(claim["HAN"], set()).add(
+            (claim["AccountId"], claim["Id"])
+        )
+
+    def _remove_claim(self, claim: dict) -> None:
+        claims: dict[Hashable, dict] | None = self._claims.get(claim["AccountId"])
+        if claims is not None:
+            claims.pop(claim["Id"], None)
+            if not claims:
+                del self._claims[claim["AccountId"]]
+        pairs: set[tuple[Hashable, Hashable]] | None = self._claims_by_han.get(
+            claim["HAN"]
+        )
+        if pairs is not None:
+            pairs.discard((claim["AccountId"], claim["Id"]))
+            if not pairs:
+                del self._claims_by_han[claim["HAN"]]
+
+    def _replace(self, account_id: Hashable, rows: dict[Hashable, dict]) -> None:
+        """Replaces some joined rows of an account, copying its rows first."""
+        self._joined.set(account_id, {**self._joined.get(account_id), **rows})
+
+    def _policy_name(self, han: Hashable) -> Any:
+        policy_name: Any = self._policy_names.get(han)
+        # Where HAN was Not available Policy Name will be Not Available
+        return "Not Available" if policy_name is None else policy_name
+
+    def _join(self, account: dict, claim: dict | None) -> dict:
+        return join_row(
+            self._account_columns,
+            self._claim_columns,
+            account,
+            claim,
+            None if claim is None else self._policy_names.get(claim["HAN"]),
+        )
+
+
+def join_row(
+    account_columns: list[str],
+    claim_columns: list[str],
+    account: dict,
+    claim: dict | None,
+    policy_name: Any,
+) -> dict:
+    """Builds the joined row of an account and one of its claims, or of an
+    account without claims, as `merge_data` does."""
+    row: dict = {column: account.get(column) for column in account_columns}
+    for column in claim_columns:
+        row[column] = None if claim is None else claim.get(column)
+    # Where HAN was Not available Policy Name will be Not Available
+    row["Policy Name"] = "Not Available" if policy_name is None else policy_name
+    return row
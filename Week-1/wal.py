@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+from loguru import logger
+
+from config import WAL_FSYNC
+from path import WAL_DIR
+
+
+class WriteAheadLog:
+    def __init__(self, folder: Path = WAL_DIR, fsync: str = WAL_FSYNC):
+        """Append-only log of the inserts, updates and deletes made to the tables.
+
+        Records go to numbered segment files. `rotate` starts a new segment
+        when the tables are snapshotted, and once the snapshot is saved
+        `checkpoint` records the last covered record and deletes the older
+        segments. `replay` yields the records written after the checkpoint.
+        `truncate` drops the records appended since a `mark`, for changes that
+        were rolled back.
+        """
+        if fsync not in ["always", "batch", "never"]:
+            raise ValueError(f"WAL fsync mode {fsync} not supported.")
+        self.folder: Path = folder
+        self.fsync: str = fsync
+        self.checkpoint_path: Path = folder / "checkpoint"
+        self._lsn: int = 0
+        self._segment: int = 0
+        self._file: IO | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        """Finds the last record written and opens a fresh segment for new ones."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        segments: list[Path] = self._segments()
+        self._segment = int(segments[-1].stem.split("-")[1]) if segments else 0
+        self._lsn = self._checkpoint_lsn()
+        for _, _, record in self._read(segments):
+            self._lsn = max(self._lsn, record["lsn"])
+        self._open_segment(self._segment + 1)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync_file()
+                self._file.close()
+                self._file = None
+
+    def append(
+        self, op: str, sheet_name: str, key: Any, data: dict | list[dict] | None
+    ) -> int:
+        """Writes one record and returns its log sequence number."""
+        with self._lock:
+            self._lsn += 1
+            record: dict = {
+                "lsn": self._lsn,
+                "op": op,
+                "sheet": sheet_name,
+                "key": key,
+                "data": data,
+            }
+            self._file.write(json.dumps(record, default=str) + "\n")
+            if self.fsync == "always":
+                self._sync_file()
+            return self._lsn
+
+    def sync(self) -> dict:
+        """Makes every record appended so far durable."""
+        with self._lock:
+            try:
+                self._sync_file()
+            except OSError as e:
+                logger.error(f"Syncing the write-ahead log failed: {e}")
+                return {"status": 500, "message": str(e)}
+        return {"status": 200, "message": "success"}
+
+    def mark(self) -> tuple[int, int, int]:
+        """Returns the position of the next record, see `truncate`."""
+        with self._lock:
+            self._file.flush()
+            return self._segment, self._file.tell(), self._lsn
+
+    def truncate(self, mark: tuple[int, int, int]) -> None:
+        """Drops every record appended since `mark` was taken, which must be
+        in the current segment."""
+        segment, offset, lsn = mark
+        with self._lock:
+            if segment != self._segment:
+                raise ValueError(
+                    f"Cannot truncate segment {segment} from {self._segment}."
+                )
+            self._file.flush()
+            self._file.truncate(offset)
+            self._sync_file()
+            self._lsn = lsn
+
+    def rotate(self) -> int:
+        """Starts a new segment and returns the last lsn of the previous ones."""
+        with self._lock:
+            self._sync_file()
+            self._file.close()
+            self._open_segment(self._segment + 1)
+            return self._lsn
+
+    def checkpoint(self, lsn: int) -> None:
+        """Marks every record up to `lsn` as saved and drops the segments holding them."""
+        temp_path: Path = self.checkpoint_path.with_suffix(".tmp")
+        with open(temp_path, "w") as file:
+            file.write(str(lsn))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+
+        with self._lock:
+            current: int = self._segment
+        for segment in self._segments():
+            if int(segment.stem.split("-")[1]) < current:
+                segment.unlink(missing_ok=True)
+        logger.info(f"Write-ahead log checkpointed at lsn {lsn}.")
+
+    def replay(self) -> Iterator[tuple[Path, int, dict]]:
+        """Yields the records that are not covered by the last checkpoint, oldest
+        first, each with its segment and byte offset in it."""
+        checkpoint_lsn: int = self._checkpoint_lsn()
+        for segment, offset, record in self._read(self._segments()):
+            if record["lsn"] > checkpoint_lsn:
+                yield segment, offset, record
+
+    def _segments(self) -> list[Path]:
+        return sorted(self.folder.glob("wal-*.jsonl"))
+
+    def _checkpoint_lsn(self) -> int:
+        if not self.checkpoint_path.is_file():
+            return 0
+        return int(self.checkpoint_path.read_text().strip() or 0)
+
+    def _read(self, segments: list[Path]) -> Iterator[tuple[Path, int, dict]]:
+        for segment in segments:
+            with open(segment, "rb") as file:
+                offset: int = 0
+                for line in file:
+                    try:
+                        record: dict = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append leaves a torn last line, nothing follows it.
+                        if file.read().strip():
+                            raise ValueError(
+                                f"Corrupted write-ahead log record at offset {offset} of {segment}."
+                            )
+                        logger.warning(f"Skipping torn record at the end of {segment}.")
+                        break
+                    yield segment, offset, record
+                    offset += len(line)
+
+    def _open_segment(self, segment: int) -> None:
+        self._segment = segment
+        self._file = open(self.folder / f"wal-{segment:08d}.jsonl", "a")
+
+    def _sync_file(self) -> None:
+        self._file.flush()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
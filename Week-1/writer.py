@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from loguru import logger
+
+from config import COMMIT_DURABLE, COMMIT_MAX_BATCH, COMMIT_MAX_PENDING
+from executor import ExecutorSaturated
+from store import TableStore
+
+
+class CommitQueue:
+    def __init__(
+        self,
+        store: TableStore,
+        max_batch: int = COMMIT_MAX_BATCH,
+        max_pending: int = COMMIT_MAX_PENDING,
+        durable: bool = COMMIT_DURABLE,
+    ):
+        """Applies every mutation on one writer thread and commits them in groups.
+
+        Mutations are queued by `execute` and run one after the other inside
+        `store.writing`, so a read-modify-write never interleaves with another
+        one and its lookups see the changes made before it. Whatever queued up
+        while the previous group was being saved is applied as the next group,
+        made durable with a single `store.commit` and published to
+        readers with a single `store.publish`. Callers get their result once
+        the commit of their group is done.
+
+        A mutation that raises may have applied part of its changes, so the
+        group is rolled back with `store.rollback` and applied again without
+        it. Mutations must not have side effects beyond the store, and leave
+        those to `after_commit`.
+        """
+        self.store: TableStore = store
+        self.max_batch: int = max_batch
+        self.durable: bool = durable
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._writer: threading.Thread | None = None
+        self._after_commit: list[Callable] = []
+
+    def start(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        self._writer = threading.Thread(
+            target=self._run, name="commit-queue-writer", daemon=True
+        )
+        self._writer.start()
+
+    def stop(self) -> None:
+        """Commits everything already queued and stops the writer."""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queues `func(*args, **kwargs)` and returns a future of its committed result."""
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((functools.partial(func, *args, **kwargs), future))
+        except queue.Full:
+            logger.warning("Commit queue is full.")
+            raise ExecutorSaturated(
+                "Server busy: too many writes pending. Try again later."
+            )
+        return future
+
+    async def execute(self, func: Callable, *args, **kwargs) -> Any:
+        """Awaits the committed result of `func(*args, **kwargs)`."""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def after_commit(self, func: Callable, *args, **kwargs) -> None:
+        """Runs `func(*args, **kwargs)` once the group of the running mutation
+        is committed, unless it is rolled back. Only for mutations."""
+        self._after_commit.append(functools.partial(func, *args, **kwargs))
+
+    def _run(self) -> None:
+        stopping: bool = False
+        while not stopping:
+            batch: list[tuple[Callable, Future]] = []
+            item = self._queue.get()
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = item is None
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch: list[tuple[Callable, Future]]) -> None:
+        batch = [
+            (mutation, future)
+            for mutation, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        with self.store.writing():
+            outcomes = self._apply(batch)
+
+        commit_result: dict = {"status": 200, "message": "success"}
+        if self.durable:
+            try:
+                commit_result = self.store.commit()
+            except Exception as e:
+                commit_result = {"status": 500, "message": str(e)}
+        self.store.publish()
+        logger.debug(f"Committed a group of {len(outcomes)} mutations.")
+
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"After commit callback failed: {e}")
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            elif commit_result["status"] != 200:
+                future.set_result(
+                    {
+                        "status": 500,
+                        "message": f"Change applied but not saved yet: {commit_result['message']}",
+                    }
+                )
+            else:
+                future.set_result(result)
+
+    def _apply(
+        self, batch: list[tuple[Callable, Future]]
+    ) -> list[tuple[Future, Any, BaseException | None]]:
+        """Runs the mutations of a group until none fails, rolling the group
+        back and leaving out the failed one each time one does."""
+        errors: dict[int, BaseException] = {}
+        while True:
+            outcomes: list[tuple[Future, Any, BaseException | None]] = []
+            for position, (mutation, future) in enumerate(batch):
+                if position in errors:
+                    outcomes.append((future, None, errors[position]))
+                    continue
+                try:
+                    outcomes.append((future, mutation(), None))
+                except Exception as e:
+                    logger.error(f"Mutation failed, rolling back its group: {e}")
+                    errors[position] = e
+                    self.store.rollback()
+                    self._after_commit.clear()
+                    break
+            else:
+                return outcomes
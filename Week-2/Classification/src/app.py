@@ -1,13 +1,58 @@
+import asyncio
+import io
+import json
+from contextlib import asynccontextmanager
 from enum import Enum
+from typing import AsyncIterator, Iterator
 
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from loguru import logger
+import pandas as pd
 from pydantic import BaseModel, field_validator
 
-from .load_model import load_model
+from .batch import (
+    BatchTooLarge,
+    BodyReader,
+    encode_results,
+    read_batches,
+    score_chunk,
+)
+from .batcher import MicroBatcher
+from .config import PREDICT_BATCH_CHUNK_ROWS, PREDICT_BATCH_MAX_ROWS
+from .registry import ModelRegistry
+from .log_shipper import PredictionLogShipper
 from .predict import make_prediction
+from .prediction_cache import PredictionCache
+from .save_to_mongodb import Mongo
 
-app = FastAPI()
+batcher = MicroBatcher()
+registry = ModelRegistry()
+prediction_cache = PredictionCache()
+registry.subscribe(prediction_cache.invalidate)
+mongo: Mongo | None = None
+shipper: PredictionLogShipper | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loads the models, connects to mongo db and starts the prediction batcher
+    and log shipper. Stops them on shutdown, writing the logs still buffered."""
+    global mongo, shipper
+
+    mongo = await asyncio.to_thread(Mongo)
+    shipper = PredictionLogShipper(mongo)
+    shipper.start()
+    await asyncio.to_thread(registry.start)
+    batcher.start()
+    yield
+    await batcher.stop()
+    registry.stop()
+    await asyncio.to_thread(shipper.stop)
+    mongo.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class Diabetes(BaseModel):
@@ -62,40 +107,133 @@ class ModelName(str, Enum):
     lgbm = "LGBM"
 
 
-selected_model = None
-selected_model_name = None
+async def get_model(model_name: ModelName):
+    """Returns the requested model from the registry, loading it off the event loop if needed."""
+    model = registry.loaded(model_name.value)
+    if model is None:
+        model = await asyncio.to_thread(registry.get, model_name.value)
+    if model is None:
+        logger.error(f"Model {model_name.value} could not be loaded.")
+        raise HTTPException(
+            status_code=503, detail=f"Model {model_name.value} could not be loaded."
+        )
+    return model
+
+
+@app.get("/models")
+async def list_models() -> dict:
+    """Lists the models and whether each one is loaded."""
+    return {"models": registry.models()}
 
 
 @app.get("/models/{model_name}")
 async def choose_model(model_name: ModelName):
-    """Lets user to choose model."""
-    global selected_model
-    global selected_model_name
-    selected_model_name = model_name.value
-    selected_model = load_model(model_name=model_name.value)
-    logger.info(f"Model {model_name.value} selected.")
-    return {"message": f"Model {model_name.value} selected."}
+    """Loads the model if needed. Every prediction picks its model with `model_name`."""
+    await get_model(model_name)
+    logger.info(f"Model {model_name.value} ready.")
+    return {"message": f"Model {model_name.value} ready."}
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> dict:
+    """Returns the hit, miss, eviction and invalidation counters of the prediction cache."""
+    return prediction_cache.stats()
 
 
 @app.post("/predict")
-async def get_prediction(patient_info: Diabetes) -> Response:
-    """Returns the predicted response."""
-    global selected_model
-    global selected_model_name
-    # Check if model is selected or not.
-    if not selected_model:
-        logger.error("No model selected. Please select a model first.")
-        raise HTTPException(
-            status_code=400, detail="No model selected. Please select a model first."
-        )
+async def get_prediction(
+    patient_info: Diabetes, model_name: ModelName = ModelName.lgbm
+) -> Response:
+    """Returns the predicted response of the requested model."""
+    # Read first, so a reload from here on keeps this prediction out of the cache.
+    generation = prediction_cache.generation(model_name.value)
+    model = await get_model(model_name)
     patient_info_dict = patient_info.model_dump()
-    response = make_prediction(
-        model=selected_model,
+    response = await make_prediction(
+        model=model,
         input_dict=patient_info_dict,
-        model_name=selected_model_name,
+        model_name=model_name.value,
+        batcher=batcher,
+        shipper=shipper,
+        cache=prediction_cache,
+        generation=generation,
     )
     return response
 
 
+class BodyStreamingResponse(StreamingResponse):
+    """`StreamingResponse` for content produced while the request body is still
+    being read. The parent watches for the client leaving by reading the
+    request messages, which would take the body from the endpoint."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+@app.post("/predict/batch")
+async def get_batch_prediction(
+    request: Request, model_name: ModelName = ModelName.lgbm
+) -> StreamingResponse:
+    """Scores many records chunk by chunk and streams one NDJSON result per record.
+
+    The body is a JSON array of `Diabetes` records, or a CSV, Parquet or Arrow
+    IPC file, given by its content type. Records are validated like single
+    predictions; invalid ones get an "error" instead of an "output". A batch
+    found over `PREDICT_BATCH_MAX_ROWS` once the answer has started ends it
+    with an "error" line.
+    """
+    model = await get_model(model_name)
+    body = io.BufferedReader(BodyReader(request.stream(), asyncio.get_running_loop()))
+    chunks = read_batches(
+        body,
+        request.headers.get("content-type", ""),
+        PREDICT_BATCH_CHUNK_ROWS,
+        PREDICT_BATCH_MAX_ROWS,
+    )
+    lines = score_chunks(chunks, model, model_name.value)
+    try:
+        first: bytes = await anext(lines, b"")
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=400, detail=f"Could not read the batch: {e}")
+    return BodyStreamingResponse(
+        resume_stream(first, lines), media_type="application/x-ndjson"
+    )
+
+
+async def score_chunks(
+    chunks: Iterator[pd.DataFrame], model, model_name: str
+) -> AsyncIterator[bytes]:
+    """Scores the chunks off the event loop as they are read, yielding the
+    NDJSON lines of each and logging its predictions."""
+    first_row: int = 0
+    while True:
+        records: pd.DataFrame | None = await asyncio.to_thread(next, chunks, None)
+        if records is None:
+            return
+        results, documents = await asyncio.to_thread(
+            score_chunk, model, model_name, records
+        )
+        shipper.log_many(documents)
+        yield encode_results(results, first_row)
+        first_row += len(records)
+
+
+async def resume_stream(
+    first: bytes, lines: AsyncIterator[bytes]
+) -> AsyncIterator[bytes]:
+    """Yields the lines already scored and the rest, ending with an "error"
+    line if the batch fails once the answer has started."""
+    yield first
+    try:
+        async for chunk_lines in lines:
+            yield chunk_lines
+    except Exception as e:
+        logger.error(f"Batch stopped: {e}")
+        yield (json.dumps({"error": f"Could not read the batch: {e}"}) + "\n").encode()
+
+
 if __name__ == "__main__":
     ...
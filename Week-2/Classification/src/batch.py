@@ -0,0 +1,299 @@
+import asyncio
+import codecs
+import io
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import IO, AsyncIterator, Iterator
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .predict import check_if_diabetic
+
+# Model input columns, in the order the models were trained on.
+FEATURES: list[str] = [
+    "Pregnancies",
+    "PlasmaGlucose",
+    "DiastolicBloodPressure",
+    "TricepsThickness",
+    "SerumInsulin",
+    "BMI",
+    "DiabetesPedigree",
+    "Age",
+]
+INTEGER_FEATURES: list[str] = [
+    feature for feature in FEATURES if feature not in ["BMI", "DiabetesPedigree"]
+]
+# Same rules as the `non_negative` and `non_zero` validators of `Diabetes`.
+NON_ZERO_FEATURES: list[str] = [
+    feature for feature in FEATURES if feature != "Pregnancies"
+]
+
+BATCH_FORMATS: dict[str, str] = {
+    "application/json": "json",
+    "text/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.stream": "arrow-stream",
+    "application/vnd.apache.arrow.file": "arrow-file",
+}
+# Bytes asked of the request body at a time by the JSON reader.
+READ_CHUNK_BYTES: int = 64 * 1024
+
+
+class BatchTooLarge(ValueError):
+    """Raised as soon as a batch holds more records than it may."""
+
+
+class BodyReader(io.RawIOBase):
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        """Blocking file over the chunks of a request body, for the parsers
+        running in a worker thread. Each read waits for the next chunk on `loop`."""
+        self._chunks: AsyncIterator[bytes] = chunks
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._pending: bytes = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk: bytes | None = asyncio.run_coroutine_threadsafe(
+                _next_chunk(self._chunks), self._loop
+            ).result()
+            if chunk is None:
+                return 0
+            self._pending = chunk
+        size: int = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+async def _next_chunk(chunks: AsyncIterator[bytes]) -> bytes | None:
+    try:
+        return await anext(chunks)
+    except StopAsyncIteration:
+        return None
+
+
+def read_batches(
+    source: IO[bytes], content_type: str, chunk_rows: int, max_rows: int
+) -> Iterator[pd.DataFrame]:
+    """Reads a batch of patient records sent as a JSON array, CSV, Parquet or
+    Arrow IPC, `chunk_rows` records at a time where the format allows.
+
+    JSON, CSV and Arrow streams are parsed as they are read, and raise
+    `BatchTooLarge` as soon as they go over `max_rows` records. Parquet and
+    Arrow files keep their layout at the end, so they are read whole first.
+    """
+    media_type: str = content_type.split(";")[0].strip().lower()
+    match BATCH_FORMATS.get(media_type):
+        case "json":
+            chunks: Iterator[pd.DataFrame] = _read_json_array(source, chunk_rows)
+        case "csv":
+            chunks = pd.read_csv(source, chunksize=chunk_rows)
+        case "parquet":
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(_spool(source))
+            if parquet_file.metadata.num_rows > max_rows:
+                raise BatchTooLarge(f"At most {max_rows} records per batch.")
+            chunks = (
+                batch.to_pandas()
+                for batch in parquet_file.iter_batches(batch_size=chunk_rows)
+            )
+        case "arrow-stream":
+            import pyarrow as pa
+
+            chunks = (batch.to_pandas() for batch in pa.ipc.open_stream(source))
+        case "arrow-file":
+            import pyarrow as pa
+
+            reader = pa.ipc.open_file(_spool(source))
+            chunks = (
+                reader.get_batch(number).to_pandas()
+                for number in range(reader.num_record_batches)
+            )
+        case _:
+            raise ValueError(
+                f"Content type {media_type} not supported. Options{list(BATCH_FORMATS)}"
+            )
+    rows: int = 0
+    for chunk_df in chunks:
+        rows += len(chunk_df)
+        if rows > max_rows:
+            raise BatchTooLarge(f"At most {max_rows} records per batch.")
+        yield chunk_df
+
+
+def _spool(source: IO[bytes]) -> IO[bytes]:
+    """Copies the body into a seekable temporary file, on disk past a few MiB."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    shutil.copyfileobj(source, spooled)
+    spooled.seek(0)
+    return spooled
+
+
+def _read_json_array(source: IO[bytes], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Parses a JSON array of objects `chunk_rows` records at a time."""
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder("utf-8")()
+    text: str = ""
+    position: int = 0
+    at_end: bool = False
+    records: list[dict] = []
+
+    def read_more() -> None:
+        nonlocal text, position, at_end
+        data: bytes = source.read(READ_CHUNK_BYTES)
+        at_end = not data
+        text, position = text[position:] + reader.decode(data, final=at_end), 0
+
+    def next_char() -> str:
+        """Moves past whitespace and returns the next character, "" at the end."""
+        nonlocal position
+        while True:
+            while position < len(text) and text[position].isspace():
+                position += 1
+            if position < len(text):
+                return text[position]
+            if at_end:
+                return ""
+            read_more()
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array of records.")
+    position += 1
+    if next_char() == "]":
+        return
+    while True:
+        try:
+            record, position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            if at_end:
+                raise ValueError("Invalid JSON array of records.")
+            # The record continues in the next read.
+            read_more()
+            continue
+        if not isinstance(record, dict):
+            raise ValueError("Expected a JSON array of records.")
+        records.append(record)
+        if len(records) >= chunk_rows:
+            yield pd.DataFrame.from_records(records)
+            records = []
+        match next_char():
+            case "]":
+                break
+            case ",":
+                position += 1
+                next_char()
+            case _:
+                raise ValueError("Invalid JSON array of records.")
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def validate_batch(records: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """Checks every record at once, column by column.
+    Params:
+        records(pd.DataFrame): Raw records, missing or empty features default to 0.
+    Returns:
+        tuple[pd.DataFrame, pd.Series]: The features of all records as numbers,
+        and the error of every record, empty for the valid ones.
+    """
+    raw: pd.DataFrame = records.reindex(columns=FEATURES)
+    features: pd.DataFrame = raw.apply(pd.to_numeric, errors="coerce")
+    errors: pd.Series = pd.Series("", index=records.index)
+
+    def reject(invalid: pd.Series, message: str) -> None:
+        errors[invalid & (errors == "")] = message
+
+    for feature in FEATURES:
+        reject(
+            features[feature].isna() & raw[feature].notna(),
+            f"{feature} must be a number",
+        )
+    features = features.fillna(0)
+    for feature in FEATURES:
+        values: pd.Series = features[feature]
+        if feature in INTEGER_FEATURES:
+            reject(values != values.round(), f"{feature} must be an integer")
+        reject(values < 0, f"{feature} cannot be negative")
+        if feature in NON_ZERO_FEATURES:
+            reject(values == 0, f"{feature} must be greater than 0")
+    return features, errors
+
+
+def predict_batch(
+    model, model_name: str, features: pd.DataFrame, errors: pd.Series
+) -> tuple[list[dict], float]:
+    """Scores the valid records in one `predict` call.
+    Returns:
+        tuple[list[dict], float]: One {"row", "output"} or {"row", "error"}
+        result per record, in order, and the time spent in `predict`.
+    """
+    valid: pd.Series = errors == ""
+    outputs: list[str | None] = [None] * len(features)
+    response_time: float = 0.0
+    if valid.any():
+        start_time = time.time()
+        predictions = np.asarray(model.predict(features[valid].to_numpy().tolist()))
+        response_time = time.time() - start_time
+        for position, prediction in zip(np.flatnonzero(valid), predictions):
+            outputs[position] = check_if_diabetic([prediction])
+    logger.info(
+        f"Scored {int(valid.sum())} of {len(features)} records with {model_name}."
+    )
+    return [
+        {"row": row, "output": output} if error == "" else {"row": row, "error": error}
+        for row, (output, error) in enumerate(zip(outputs, errors.tolist()))
+    ], response_time
+
+
+def prediction_records(
+    results: list[dict],
+    features: pd.DataFrame,
+    model_name: str,
+    response_time: float,
+) -> list[dict]:
+    """Builds the documents logged for the scored records, as `make_prediction` does."""
+    timestamp: datetime = datetime.now()
+    inputs: list[dict] = features.to_dict(orient="records")
+    return [
+        {
+            "timestamp": timestamp,
+            "input": inputs[result["row"]],
+            "output": result["output"],
+            "model_used": model_name,
+            "response_time": response_time,
+        }
+        for result in results
+        if "output" in result
+    ]
+
+
+def score_chunk(
+    model, model_name: str, records: pd.DataFrame
+) -> tuple[list[dict], list[dict]]:
+    """Validates and scores one chunk of a batch.
+    Returns:
+        tuple[list[dict], list[dict]]: The results of its records, see
+        `predict_batch`, and the documents logged for them.
+    """
+    features, errors = validate_batch(records)
+    results, response_time = predict_batch(model, model_name, features, errors)
+    return results, prediction_records(results, features, model_name, response_time)
+
+
+def encode_results(results: list[dict], first_row: int = 0) -> bytes:
+    """Encodes the results of one chunk as NDJSON, numbering its records from
+    `first_row`."""
+    return "".join(
+        json.dumps({**result, "row": first_row + result["row"]}) + "\n"
+        for result in results
+    ).encode()
@@ -0,0 +1,136 @@
+import asyncio
+
+import numpy as np
+from loguru import logger
+
+from .config import (
+    PREDICT_MAX_BATCH_SIZE,
+    PREDICT_MAX_QUEUE,
+    PREDICT_MAX_WAIT_MS,
+    PREDICT_STOP_TIMEOUT_SECONDS,
+)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        max_batch_size: int = PREDICT_MAX_BATCH_SIZE,
+        max_wait_ms: float = PREDICT_MAX_WAIT_MS,
+        max_queue: int = PREDICT_MAX_QUEUE,
+        stop_timeout: float = PREDICT_STOP_TIMEOUT_SECONDS,
+    ):
+        """Coalesces concurrent predictions into one vectorized `predict` call.
+
+        A batch is scored as soon as it holds `max_batch_size` rows or its first
+        row has waited `max_wait_ms`. Rows for different models are scored
+        separately. Scoring runs in a thread so the next batch keeps filling
+        meanwhile, and every caller gets back the prediction of its own row.
+        At most `max_queue` rows wait to be batched, callers beyond that wait
+        for room.
+        """
+        self.max_batch_size: int = max_batch_size
+        self.max_wait: float = max_wait_ms / 1000
+        self.max_queue: int = max_queue
+        self.stop_timeout: float = stop_timeout
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._batch: list[tuple] = []
+        self._stopping: bool = False
+
+    def start(self) -> None:
+        """Starts the batching task on the running event loop."""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._batch = []
+        self._stopping = False
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Scores the rows already queued, then stops the batching task.
+
+        Rows not scored within `stop_timeout` seconds, including a batch still
+        in flight, and rows queued after the stop fail instead of waiting
+        forever.
+        """
+        if self._worker is None:
+            return
+        self._stopping = True
+        try:
+            # The marker ends the batching task once the rows before it are scored.
+            await asyncio.wait_for(self._drain(), self.stop_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Predictions still waiting after {self.stop_timeout}s.")
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        waiting: list[tuple] = self._batch
+        while not self._queue.empty():
+            waiting.append(self._queue.get_nowait())
+        for item in waiting:
+            if item is not None and not item[2].done():
+                item[2].set_exception(RuntimeError("Prediction service stopped."))
+        self._batch = []
+
+    async def predict(self, model, row: list) -> np.ndarray:
+        """Queues one row for `model` and returns its prediction as a one element array."""
+        if self._stopping:
+            raise RuntimeError("Prediction service stopped.")
+        self.start()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put((model, row, future))
+        return await future
+
+    async def _drain(self) -> None:
+        await self._queue.put(None)
+        await asyncio.shield(self._worker)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping: bool = False
+        while not stopping:
+            item: tuple | None = await self._queue.get()
+            if item is None:
+                return
+            self._batch = [item]
+            deadline: float = loop.time() + self.max_wait
+            while len(self._batch) < self.max_batch_size:
+                timeout: float = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                self._batch.append(item)
+            await self._score(self._batch)
+            self._batch = []
+
+    @staticmethod
+    async def _score(batch: list[tuple]) -> None:
+        groups: dict[int, list[tuple]] = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), []).append(item)
+        for items in groups.values():
+            model = items[0][0]
+            try:
+                predictions = await asyncio.to_thread(
+                    model.predict, [row for _, row, _ in items]
+                )
+            except Exception as e:
+                logger.error(f"Scoring a batch of {len(items)} rows failed: {e}")
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            predictions = np.asarray(predictions)
+            for position, (_, _, future) in enumerate(items):
+                # The caller may have gone away meanwhile.
+                if not future.done():
+                    future.set_result(predictions[position : position + 1])
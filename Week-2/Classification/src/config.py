@@ -0,0 +1,46 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Most POST /predict requests scored together in one model call, and the longest
+# a request waits, in milliseconds, for others to join its batch.
+PREDICT_MAX_BATCH_SIZE: int = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "64"))
+PREDICT_MAX_WAIT_MS: float = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+# Most rows waiting for a batch, further requests wait for room. On shutdown the
+# rows still waiting get this many seconds to be scored before they fail.
+PREDICT_MAX_QUEUE: int = int(os.getenv("PREDICT_MAX_QUEUE", "4096"))
+PREDICT_STOP_TIMEOUT_SECONDS: float = float(
+    os.getenv("PREDICT_STOP_TIMEOUT_SECONDS", "5")
+)
+# Most records accepted by one POST /predict/batch request.
+PREDICT_BATCH_MAX_ROWS: int = int(os.getenv("PREDICT_BATCH_MAX_ROWS", "100000"))
+# Records of a POST /predict/batch request parsed and scored at a time.
+PREDICT_BATCH_CHUNK_ROWS: int = int(os.getenv("PREDICT_BATCH_CHUNK_ROWS", "5000"))
+
+# Load every model at startup. Otherwise a model is loaded on first use.
+MODEL_PRELOAD: bool = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+# Most models kept in memory, the least recently used one is dropped first.
+MODEL_MAX_LOADED: int = int(os.getenv("MODEL_MAX_LOADED", "3"))
+# Seconds between two checks of the model files for changes.
+MODEL_RELOAD_INTERVAL_SECONDS: float = float(
+    os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", "2")
+)
+
+# MongoDB server the predictions are logged to, and how long to wait for it.
+MONGO_HOST: str = os.getenv("MONGO_HOST", "localhost")
+MONGO_PORT: int = int(os.getenv("MONGO_PORT", "27017"))
+MONGO_TIMEOUT_MS: int = int(os.getenv("MONGO_TIMEOUT_MS", "2000"))
+# Predictions are logged in the background: up to this many per insert_many,
+# at least this often, and at most this many waiting in memory.
+PREDICTION_LOG_BATCH_SIZE: int = int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500"))
+PREDICTION_LOG_FLUSH_INTERVAL_SECONDS: float = float(
+    os.getenv("PREDICTION_LOG_FLUSH_INTERVAL_SECONDS", "1")
+)
+PREDICTION_LOG_MAX_BUFFER: int = int(os.getenv("PREDICTION_LOG_MAX_BUFFER", "10000"))
+
+# Most predictions cached per model name and feature vector. 0 disables the cache.
+PREDICTION_CACHE_MAX_ENTRIES: int = int(
+    os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000")
+)
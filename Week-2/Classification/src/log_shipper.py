@@ -0,0 +1,228 @@
+import os
+import threading
+from pathlib import Path
+
+from bson import json_util
+from bson.errors import BSONError
+from loguru import logger
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .config import (
+    PREDICTION_LOG_BATCH_SIZE,
+    PREDICTION_LOG_FLUSH_INTERVAL_SECONDS,
+    PREDICTION_LOG_MAX_BUFFER,
+)
+from .path import path
+from .save_to_mongodb import Mongo
+
+# Mongo error code of an insert whose _id already exists.
+DUPLICATE_KEY: int = 11000
+
+
+class PredictionLogShipper:
+    def __init__(
+        self,
+        mongo: Mongo,
+        collection_name: str = "Diabetes",
+        batch_size: int = PREDICTION_LOG_BATCH_SIZE,
+        flush_interval: float = PREDICTION_LOG_FLUSH_INTERVAL_SECONDS,
+        max_buffer: int = PREDICTION_LOG_MAX_BUFFER,
+        spill_path: Path = path["log_dir"] / "predictions-spill.jsonl",
+        quarantine_path: Path = path["log_dir"] / "predictions-spill-corrupt.jsonl",
+        dead_letter_path: Path = path["log_dir"] / "predictions-rejected.jsonl",
+    ):
+        """Buffers prediction records and writes them to mongodb in the background.
+
+        `log` only appends to a buffer, so requests never wait for the
+        database or the disk. A thread writes the buffer with `insert_many`,
+        `batch_size` records at a time, every `flush_interval` seconds or as
+        soon as a batch is full. Records mongodb does not take are appended to
+        the `spill_path` JSONL file and inserted again once mongodb accepts
+        writes. Records beyond `max_buffer` while it is slow are handed to the
+        thread, which spills them before and between its inserts. Records
+        carry their own `_id`, so one that was inserted before a failure is
+        not duplicated. Spilled lines that cannot be read back are moved to
+        `quarantine_path` as they are, and records mongodb rejects, which
+        retrying would not change, go to `dead_letter_path`.
+        """
+        self.mongo: Mongo = mongo
+        self.collection_name: str = collection_name
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.max_buffer: int = max_buffer
+        self.spill_path: Path = spill_path
+        self.quarantine_path: Path = quarantine_path
+        self.dead_letter_path: Path = dead_letter_path
+        self._buffer: list[dict] = []
+        # Records beyond `max_buffer`, for the thread to spill.
+        self._overflow: list[dict] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._shipper: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Starts the background thread writing the buffered records."""
+        if self._shipper is not None and self._shipper.is_alive():
+            return
+        self._stopped.clear()
+        self._shipper = threading.Thread(
+            target=self._run, name="prediction-log-shipper", daemon=True
+        )
+        self._shipper.start()
+
+    def stop(self) -> None:
+        """Stops the background thread and writes whatever is still buffered."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._shipper is not None:
+            self._shipper.join()
+            self._shipper = None
+        self.flush()
+
+    def log(self, record: dict) -> None:
+        """Buffers one record. Never touches mongodb on the caller's thread."""
+        self.log_many([record])
+
+    def log_many(self, records: list[dict]) -> None:
+        """Buffers several records, see `log`."""
+        with self._lock:
+            room: int = max(self.max_buffer - len(self._buffer), 0)
+            self._buffer.extend(records[:room])
+            self._overflow.extend(records[room:])
+            wake: bool = len(self._buffer) >= self.batch_size or bool(self._overflow)
+        if wake:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Writes the buffered records, then the spilled ones if mongodb is back."""
+        with self._write_lock:
+            while True:
+                self._spill_overflow()
+                with self._lock:
+                    batch, self._buffer = (
+                        self._buffer[: self.batch_size],
+                        self._buffer[self.batch_size :],
+                    )
+                if not batch:
+                    break
+                if not self._insert(batch):
+                    with self._lock:
+                        rest, self._buffer = self._buffer, []
+                    self._spill(rest)
+                    self._spill_overflow()
+                    return
+            replaying: bool = self._replay_path().is_file()
+            if (replaying or self.spill_path.is_file()) and self._reachable():
+                self._replay_spill()
+
+    def _insert(self, records: list[dict]) -> bool:
+        """Inserts the records, spilling them if mongodb is unavailable and
+        setting aside the ones it rejects. Returns whether mongodb accepted
+        writes."""
+        try:
+            self.mongo.db[self.collection_name].insert_many(records, ordered=False)
+        except BulkWriteError as e:
+            failed: list[dict] = [
+                records[error["index"]]
+                for error in e.details.get("writeErrors", [])
+                if error.get("code") != DUPLICATE_KEY
+            ]
+            if failed:
+                logger.error(
+                    f"{len(failed)} prediction records rejected, "
+                    f"moved to {self.dead_letter_path}: {e}"
+                )
+                self._spill(failed, self.dead_letter_path)
+        except PyMongoError as e:
+            logger.error(f"Logging {len(records)} predictions failed: {e}")
+            self._spill(records)
+            return False
+        else:
+            logger.info(f"{len(records)} prediction records inserted.")
+        return True
+
+    def _reachable(self) -> bool:
+        try:
+            self.mongo.client.admin.command("ping")
+        except PyMongoError:
+            return False
+        return True
+
+    def _spill_overflow(self) -> None:
+        with self._lock:
+            overflow, self._overflow = self._overflow, []
+        if overflow:
+            logger.warning(
+                f"Prediction log buffer full, spilling {len(overflow)} records."
+            )
+            self._spill(overflow)
+
+    def _spill(self, records: list[dict], spill_path: Path | None = None) -> None:
+        """Appends the records to `spill_path`, the spill file by default."""
+        if not records:
+            return
+        lines: bytes = "".join(
+            json_util.dumps(record) + "\n" for record in records
+        ).encode()
+        with self._spill_lock:
+            spill_path = spill_path or self.spill_path
+            spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(spill_path, "a+b") as file:
+                # A line cut short by a crash must not swallow the next one.
+                if file.seek(0, os.SEEK_END):
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b"\n":
+                        lines = b"\n" + lines
+                file.write(lines)
+
+    def _replay_path(self) -> Path:
+        return self.spill_path.with_suffix(".replay")
+
+    def _replay_spill(self) -> None:
+        replaying: Path = self._replay_path()
+        with self._spill_lock:
+            # Records spilled from here on go to a fresh file, replayed next time.
+            if not replaying.exists():
+                if not self.spill_path.is_file():
+                    return
+                self.spill_path.replace(replaying)
+        records: list[dict] = []
+        corrupt: list[str] = []
+        with open(replaying) as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    record = json_util.loads(line)
+                except (ValueError, BSONError):
+                    record = None
+                if isinstance(record, dict):
+                    records.append(record)
+                else:
+                    corrupt.append(line if line.endswith("\n") else line + "\n")
+        if corrupt:
+            logger.error(
+                f"{len(corrupt)} spilled prediction records unreadable, "
+                f"moved to {self.quarantine_path}."
+            )
+            with open(self.quarantine_path, "a") as file:
+                file.writelines(corrupt)
+        logger.info(f"Inserting {len(records)} spilled prediction records.")
+        for start in range(0, len(records), self.batch_size):
+            if not self._insert(records[start : start + self.batch_size]):
+                # The failed batch was spilled again, keep the ones not tried yet.
+                self._spill(records[start + self.batch_size :])
+                break
+        replaying.unlink()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Background prediction log flush failed: {e}")
@@ -1,5 +1,6 @@
 from pathlib import Path
 
 path: dict[str, Path] = {
-    "model_save_dir": Path(".").resolve() / "saved" / "model"
+    "model_save_dir": Path(".").resolve() / "saved" / "model",
+    "log_dir": Path(".").resolve() / "logs",
 }
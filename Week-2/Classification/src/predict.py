@@ -2,10 +2,13 @@ import time
 from datetime import datetime
 
 import numpy as np
+from bson import ObjectId
 from fastapi.responses import JSONResponse
 from loguru import logger
 
-from .save_to_mongodb import Mongo
+from .batcher import MicroBatcher
+from .log_shipper import PredictionLogShipper
+from .prediction_cache import PredictionCache
 
 
 def check_if_diabetic(prediction) -> None | str:
@@ -20,12 +23,26 @@ def check_if_diabetic(prediction) -> None | str:
         logger.error(str(e))
 
 
-def make_prediction(model, input_dict, model_name):
-    """Predicts the outcome for provided data."""
+async def make_prediction(
+    model,
+    input_dict,
+    model_name,
+    batcher: MicroBatcher,
+    shipper: PredictionLogShipper,
+    cache: PredictionCache,
+    generation: int,
+):
+    """Predicts the outcome for provided data, from the cache or scored in a
+    batch with the concurrent requests. `generation` is the cache generation of
+    the model, read before the model was fetched. The record is logged to mongo
+    db in the background, cached or not."""
+    features: list = list(input_dict.values())
     try:
-        input = [list(input_dict.values())]
         start_time = time.time()
-        prediction = model.predict(input)
+        served_from_cache, prediction = cache.get(model_name, features)
+        if not served_from_cache:
+            prediction = await batcher.predict(model, features)
+            cache.put(model_name, features, prediction, generation)
         end_time = time.time()
     except Exception as e:
         logger.error(str(e))
@@ -38,14 +55,12 @@ def make_prediction(model, input_dict, model_name):
             "output": is_diabetic,
             "model_used": model_name,
             "response_time": end_time - start_time,
+            "served_from_cache": served_from_cache,
         }
-        # Inserting record into mongo db.
-        db = Mongo()
-        inserted_id = db.insert_record(
-            collection_name="Diabetes", record=response_content
-        )
-        if inserted_id:
-            response_content["_id"] = str(inserted_id)
+        # Queueing the record for mongo db, with its id set here so it can be returned.
+        response_content["_id"] = ObjectId()
+        shipper.log(dict(response_content))
+        response_content["_id"] = str(response_content["_id"])
 
         # Making timestamp json searealized
         response_content.update({"timestamp": str(response_content["timestamp"])})
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from .config import PREDICTION_CACHE_MAX_ENTRIES
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = PREDICTION_CACHE_MAX_ENTRIES):
+        """LRU cache of predictions keyed on the model name and the exact feature vector.
+
+        At most `max_entries` predictions are kept, least recently used first
+        out, and 0 disables the cache. `invalidate` drops every prediction of a
+        model and is subscribed to the model registry, so a reloaded model never
+        serves the old model's answers. A prediction computed while its model
+        was being reloaded is not stored: `put` takes the model's `generation`
+        read before scoring and ignores the value if it has moved on since.
+        """
+        self.max_entries: int = max_entries
+        self._entries: OrderedDict[tuple[str, Hashable], Any] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._stats: dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+        self._lock = threading.Lock()
+
+    def generation(self, model_name: str) -> int:
+        """Returns how many times the model's predictions were invalidated."""
+        with self._lock:
+            return self._generations.get(model_name, 0)
+
+    def get(self, model_name: str, features: list) -> tuple[bool, Any]:
+        """Returns whether the prediction is cached, and the cached prediction."""
+        key: tuple[str, Hashable] = (model_name, tuple(features))
+        with self._lock:
+            if key not in self._entries:
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, self._entries[key]
+
+    def put(self, model_name: str, features: list, value: Any, generation: int) -> None:
+        """Stores a prediction made with the given generation of the model."""
+        if self.max_entries <= 0:
+            return
+        key: tuple[str, Hashable] = (model_name, tuple(features))
+        with self._lock:
+            if self._generations.get(model_name, 0) != generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, model_name: str) -> None:
+        """Drops every prediction of a model."""
+        with self._lock:
+            self._generations[model_name] = self._generations.get(model_name, 0) + 1
+            stale: list[tuple[str, Hashable]] = [
+                key for key in self._entries if key[0] == model_name
+            ]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+
+    def stats(self) -> dict:
+        """Returns the counters, the hit rate and the number of cached predictions."""
+        with self._lock:
+            lookups: int = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
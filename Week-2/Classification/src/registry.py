@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from loguru import logger
+
+from .config import MODEL_MAX_LOADED, MODEL_PRELOAD, MODEL_RELOAD_INTERVAL_SECONDS
+from .load_model import MODEL_FILES, load_model
+from .path import path
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        preload: bool = MODEL_PRELOAD,
+        max_loaded: int = MODEL_MAX_LOADED,
+        reload_interval: float = MODEL_RELOAD_INTERVAL_SECONDS,
+    ):
+        """Keeps the models in memory, shared by every request.
+
+        With `preload` every model is loaded on `start`, otherwise on first use.
+        At most `max_loaded` models stay loaded, least recently used first out.
+        A background thread checks the model files every `reload_interval`
+        seconds and reloads the loaded models whose file changed. The new model
+        replaces the old one in a single assignment: requests already holding
+        the old one finish with it, new requests get the new one, and none
+        waits for the reload. Subscribed callbacks get the name of every
+        reloaded or dropped model.
+        """
+        self.preload: bool = preload
+        self.max_loaded: int = max_loaded
+        self.reload_interval: float = reload_interval
+        # model name -> (model, modification time of its file when loaded)
+        self._models: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._callbacks: list[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Preloads the models if asked to and starts watching their files."""
+        if self.preload:
+            for model_name in list(MODEL_FILES)[: self.max_loaded]:
+                self.get(model_name)
+        self._stopped.clear()
+        self._watcher = threading.Thread(
+            target=self._run, name="model-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """Registers a callback called with the name of every reloaded or dropped model."""
+        self._callbacks.append(callback)
+
+    def loaded(self, model_name: str):
+        """Returns the model if it is in memory, None otherwise. Never touches the disk."""
+        with self._lock:
+            entry: tuple[object, int] | None = self._models.get(model_name)
+            if entry is None:
+                return None
+            self._models.move_to_end(model_name)
+            return entry[0]
+
+    def get(self, model_name: str):
+        """Returns the model, loading it first if needed. None if it cannot be loaded."""
+        model = self.loaded(model_name)
+        if model is not None:
+            return model
+        with self._load_lock:
+            # Another request may have loaded it meanwhile.
+            model = self.loaded(model_name)
+            if model is None:
+                model = self._load(model_name)
+        return model
+
+    def models(self) -> dict[str, bool]:
+        """Returns every model name and whether it is loaded."""
+        with self._lock:
+            return {
+                model_name: model_name in self._models for model_name in MODEL_FILES
+            }
+
+    def reload(self, model_name: str) -> bool:
+        """Loads the model again from its file and swaps it in, keeping the
+        old one if the file cannot be read."""
+        with self._load_lock:
+            if self._load(model_name) is None:
+                return False
+        logger.info(f"Model {model_name} reloaded.")
+        self._notify(model_name)
+        return True
+
+    def _load(self, model_name: str):
+        modified: int = self._modified(model_name)
+        model = load_model(model_name=model_name)
+        if model is None:
+            return None
+        evicted: list[str] = []
+        with self._lock:
+            self._models[model_name] = (model, modified)
+            self._models.move_to_end(model_name)
+            while len(self._models) > self.max_loaded:
+                evicted.append(self._models.popitem(last=False)[0])
+        for evicted_name in evicted:
+            logger.info(f"Model {evicted_name} dropped from memory.")
+            self._notify(evicted_name)
+        return model
+
+    def _modified(self, model_name: str) -> int:
+        try:
+            return (path["model_save_dir"] / MODEL_FILES[model_name]).stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    def _notify(self, model_name: str) -> None:
+        for callback in self._callbacks:
+            try:
+                callback(model_name)
+            except Exception as e:
+                logger.error(f"Model reload callback failed: {e}")
+
+    def _run(self) -> None:
+        while not self._stopped.wait(timeout=self.reload_interval):
+            with self._lock:
+                loaded: dict[str, int] = {
+                    model_name: modified
+                    for model_name, (_, modified) in self._models.items()
+                }
+            for model_name, modified in loaded.items():
+                if self._modified(model_name) != modified:
+                    self.reload(model_name)
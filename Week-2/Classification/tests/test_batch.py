@@ -0,0 +1,157 @@
+import importlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from src.batch import FEATURES, BatchTooLarge, encode_results, read_batches
+
+# `src` re-exports the names of its modules, `app` among them.
+app_module = importlib.import_module("src.app")
+
+
+class Upload(io.BytesIO):
+    """Request body that stays readable after the parsers close it."""
+
+    def close(self) -> None:
+        pass
+
+
+class ThresholdModel:
+    """Diabetic when PlasmaGlucose is over 100."""
+
+    def predict(self, rows: list[list]) -> np.ndarray:
+        return np.array([int(row[1] > 100) for row in rows])
+
+
+class RecordingShipper:
+    def __init__(self):
+        self.documents: list[dict] = []
+
+    def log_many(self, documents: list[dict]) -> None:
+        self.documents.extend(documents)
+
+
+def patient(**fields) -> dict:
+    return {feature: 1 for feature in FEATURES} | fields
+
+
+def test_content_type_parameters_and_case_are_ignored():
+    body: bytes = b"Age,PlasmaGlucose\n30,120\n40,90\n"
+
+    chunks = list(read_batches(io.BytesIO(body), "Text/CSV; charset=utf-8", 10, 10))
+    assert len(chunks) == 1
+    assert chunks[0]["Age"].tolist() == [30, 40]
+
+
+def test_unknown_content_type_is_refused():
+    with pytest.raises(ValueError, match="not supported"):
+        next(read_batches(io.BytesIO(b""), "text/plain", 10, 10))
+
+
+@pytest.mark.parametrize("media_type", ["json", "csv", "arrow"])
+def test_records_are_read_in_chunks(media_type):
+    records: pd.DataFrame = pd.DataFrame([patient(Age=age) for age in range(1, 6)])
+    match media_type:
+        case "json":
+            content_type: str = "application/json"
+            body: bytes = json.dumps(records.to_dict(orient="records")).encode()
+        case "csv":
+            content_type = "text/csv"
+            body = records.to_csv(index=False).encode()
+        case "arrow":
+            content_type = "application/vnd.apache.arrow.stream"
+            table: pa.Table = pa.Table.from_pandas(records)
+            sink = io.BytesIO()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                for batch in table.to_batches(max_chunksize=2):
+                    writer.write_batch(batch)
+            body = sink.getvalue()
+
+    chunks = list(read_batches(io.BytesIO(body), content_type, 2, 10))
+    assert [len(chunk_df) for chunk_df in chunks] == [2, 2, 1]
+    assert pd.concat(chunks)["Age"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_too_many_records_stop_the_read_early():
+    body: bytes = b"Age\n" + b"30\n" * 1_000_000
+    source = Upload(body)
+    chunks = read_batches(source, "text/csv", 100, 250)
+
+    assert [len(chunk_df) for chunk_df in [next(chunks), next(chunks)]] == [100, 100]
+    with pytest.raises(BatchTooLarge, match="At most 250 records"):
+        next(chunks)
+    assert source.tell() < len(body) // 2
+
+
+def test_results_are_numbered_across_chunks():
+    results: list[dict] = [{"row": 0, "output": "Diabetic"}, {"row": 1, "error": "x"}]
+
+    assert encode_results(results, 10).decode().splitlines() == [
+        '{"row": 10, "output": "Diabetic"}',
+        '{"row": 11, "error": "x"}',
+    ]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def get_model(model_name):
+        return ThresholdModel()
+
+    shipper = RecordingShipper()
+    monkeypatch.setattr(app_module, "get_model", get_model)
+    monkeypatch.setattr(app_module, "shipper", shipper)
+    monkeypatch.setattr(app_module, "PREDICT_BATCH_CHUNK_ROWS", 2)
+    monkeypatch.setattr(app_module, "PREDICT_BATCH_MAX_ROWS", 4)
+    client = TestClient(app_module.app)
+    client.shipper = shipper
+    return client
+
+
+def post_batch(client: TestClient, records: list[dict]):
+    return client.post(
+        "/predict/batch",
+        content=json.dumps(records),
+        headers={"content-type": "application/json"},
+    )
+
+
+def test_batch_is_scored_chunk_by_chunk(client):
+    response = post_batch(
+        client,
+        [patient(PlasmaGlucose=150), patient(Age=0), patient(), patient(BMI="x")],
+    )
+
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"row": 0, "output": "Diabetic"},
+        {"row": 1, "error": "Age must be greater than 0"},
+        {"row": 2, "output": "Non-Diabetic"},
+        {"row": 3, "error": "BMI must be a number"},
+    ]
+    assert [document["output"] for document in client.shipper.documents] == [
+        "Diabetic",
+        "Non-Diabetic",
+    ]
+
+
+def test_batch_found_too_large_midway_ends_with_an_error(client):
+    response = post_batch(client, [patient()] * 5)
+
+    lines: list[dict] = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [line["row"] for line in lines[:-1]] == [0, 1, 2, 3]
+    assert lines[-1] == {
+        "error": "Could not read the batch: At most 4 records per batch."
+    }
+
+
+def test_batch_too_large_in_its_first_chunk_is_refused(client, monkeypatch):
+    monkeypatch.setattr(app_module, "PREDICT_BATCH_MAX_ROWS", 1)
+
+    assert post_batch(client, [patient()] * 3).status_code == 413
+    assert post_batch(client, {"Age": 1}).status_code == 400
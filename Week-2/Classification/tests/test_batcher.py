@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.batcher import MicroBatcher
+
+
+class EchoModel:
+    """Predicts the first feature of every row, recording the size of each call."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay: float = delay
+        self.calls: list[int] = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def predict(self, rows: list[list]) -> np.ndarray:
+        self.release.wait()
+        time.sleep(self.delay)
+        self.calls.append(len(rows))
+        return np.array([row[0] for row in rows])
+
+
+class FailingModel:
+    def predict(self, rows: list[list]) -> np.ndarray:
+        raise ValueError("bad input")
+
+
+async def predict_all(batcher: MicroBatcher, model, count: int) -> list:
+    return await asyncio.gather(
+        *(batcher.predict(model, [value]) for value in range(count)),
+        return_exceptions=True,
+    )
+
+
+def test_concurrent_rows_are_scored_together():
+    model = EchoModel()
+
+    async def run():
+        batcher = MicroBatcher(max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        predictions = await predict_all(batcher, model, 20)
+        await batcher.stop()
+        return predictions
+
+    predictions = asyncio.run(run())
+    assert [prediction.tolist() for prediction in predictions] == [
+        [value] for value in range(20)
+    ]
+    assert model.calls == [8, 8, 4]
+
+
+def test_rows_for_different_models_are_scored_separately():
+    first, second = EchoModel(), EchoModel()
+
+    async def run():
+        batcher = MicroBatcher(max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        predictions = await asyncio.gather(
+            batcher.predict(first, [1]),
+            batcher.predict(second, [2]),
+            batcher.predict(first, [3]),
+        )
+        await batcher.stop()
+        return predictions
+
+    assert [prediction.tolist() for prediction in asyncio.run(run())] == [
+        [1],
+        [2],
+        [3],
+    ]
+    assert (first.calls, second.calls) == ([2], [1])
+
+
+def test_scoring_error_reaches_every_caller_of_the_batch():
+    async def run():
+        batcher = MicroBatcher(max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        results = await predict_all(batcher, FailingModel(), 3)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_stop_scores_the_rows_already_queued():
+    model = EchoModel(delay=0.01)
+
+    async def run():
+        batcher = MicroBatcher(max_batch_size=4, max_wait_ms=1, max_queue=8)
+        batcher.start()
+        callers = asyncio.gather(
+            *(batcher.predict(model, [value]) for value in range(20)),
+            return_exceptions=True,
+        )
+        await asyncio.sleep(0.005)
+        await batcher.stop()
+        return await callers
+
+    predictions = asyncio.run(run())
+    assert [prediction.tolist() for prediction in predictions] == [
+        [value] for value in range(20)
+    ]
+
+
+def test_stop_fails_the_rows_it_could_not_score_in_time():
+    model = EchoModel()
+    model.release.clear()
+
+    async def run():
+        batcher = MicroBatcher(max_batch_size=2, max_wait_ms=1, stop_timeout=0.1)
+        batcher.start()
+        callers = asyncio.gather(
+            *(batcher.predict(model, [value]) for value in range(5)),
+            return_exceptions=True,
+        )
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        results = await callers
+        model.release.set()
+        with pytest.raises(RuntimeError, match="stopped"):
+            await batcher.predict(model, [0])
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_queue_is_bounded():
+    model = EchoModel()
+    model.release.clear()
+
+    async def run():
+        batcher = MicroBatcher(max_batch_size=2, max_wait_ms=1, max_queue=3)
+        batcher.start()
+        callers = [
+            asyncio.ensure_future(batcher.predict(model, [value]))
+            for value in range(10)
+        ]
+        await asyncio.sleep(0.05)
+        queued: int = batcher._queue.qsize()
+        model.release.set()
+        results = await asyncio.gather(*callers)
+        await batcher.stop()
+        return queued, results
+
+    queued, results = asyncio.run(run())
+    assert queued == 3
+    assert [result.tolist() for result in results] == [[value] for value in range(10)]
@@ -0,0 +1,154 @@
+import json
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from src.log_shipper import DUPLICATE_KEY, PredictionLogShipper
+
+
+class FakeCollection:
+    """Keeps inserted records by _id, raising like mongodb when down or rejecting."""
+
+    def __init__(self):
+        self.records: dict[str, dict] = {}
+        self.calls: list[int] = []
+        self.down: bool = False
+        self.rejected: set[str] = set()
+
+    def insert_many(self, records: list[dict], ordered: bool = True) -> None:
+        if self.down:
+            raise AutoReconnect("mongodb is down")
+        self.calls.append(len(records))
+        errors: list[dict] = []
+        for index, record in enumerate(records):
+            if record["_id"] in self.rejected:
+                errors.append({"index": index, "code": 121})
+            elif record["_id"] in self.records:
+                errors.append({"index": index, "code": DUPLICATE_KEY})
+            else:
+                self.records[record["_id"]] = record
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+class FakeMongo:
+    def __init__(self):
+        self.collection = FakeCollection()
+        self.db: dict[str, FakeCollection] = {"Diabetes": self.collection}
+        self.client = self
+        self.admin = self
+
+    def command(self, name: str) -> dict:
+        if self.collection.down:
+            raise AutoReconnect("mongodb is down")
+        return {"ok": 1}
+
+
+@pytest.fixture
+def mongo() -> FakeMongo:
+    return FakeMongo()
+
+
+@pytest.fixture
+def shipper(mongo, tmp_path) -> PredictionLogShipper:
+    return PredictionLogShipper(
+        mongo,
+        batch_size=2,
+        max_buffer=3,
+        spill_path=tmp_path / "spill.jsonl",
+        quarantine_path=tmp_path / "spill-corrupt.jsonl",
+        dead_letter_path=tmp_path / "rejected.jsonl",
+    )
+
+
+def records(*ids: str) -> list[dict]:
+    return [{"_id": record_id, "prediction": 1} for record_id in ids]
+
+
+def read_lines(file) -> list[dict]:
+    return [json.loads(line) for line in file.read_text().splitlines()]
+
+
+def test_records_are_inserted_in_batches_off_the_caller(mongo, shipper):
+    shipper.log_many(records("r1", "r2", "r3"))
+    assert mongo.collection.calls == []
+
+    shipper.flush()
+
+    assert mongo.collection.calls == [2, 1]
+    assert list(mongo.collection.records) == ["r1", "r2", "r3"]
+
+
+def test_records_are_spilled_while_mongodb_is_down_and_replayed_after(mongo, shipper):
+    mongo.collection.down = True
+    shipper.log_many(records("r1", "r2", "r3"))
+    shipper.flush()
+    assert [record["_id"] for record in read_lines(shipper.spill_path)] == [
+        "r1",
+        "r2",
+        "r3",
+    ]
+
+    mongo.collection.down = False
+    shipper.log(records("r4")[0])
+    shipper.flush()
+
+    assert sorted(mongo.collection.records) == ["r1", "r2", "r3", "r4"]
+    assert not shipper.spill_path.exists()
+
+
+def test_overflow_is_spilled_by_the_flush_not_the_caller(mongo, shipper):
+    mongo.collection.down = True
+    shipper.log_many(records("r1", "r2", "r3", "r4", "r5"))
+    assert not shipper.spill_path.exists()
+
+    shipper.flush()
+
+    assert sorted(record["_id"] for record in read_lines(shipper.spill_path)) == [
+        "r1",
+        "r2",
+        "r3",
+        "r4",
+        "r5",
+    ]
+
+
+def test_unreadable_spilled_lines_are_quarantined(mongo, shipper):
+    # The last line was cut short by a crash.
+    shipper.spill_path.write_text('{"_id": "r1"}\nnot json\n{"_id": "r2", "pre')
+    mongo.collection.down = True
+    shipper.log_many(records("r3"))
+    shipper.flush()
+
+    mongo.collection.down = False
+    shipper.flush()
+
+    assert sorted(mongo.collection.records) == ["r1", "r3"]
+    assert shipper.quarantine_path.read_text() == 'not json\n{"_id": "r2", "pre\n'
+    assert not shipper.spill_path.exists()
+
+
+def test_rejected_records_go_to_the_dead_letter_file(mongo, shipper):
+    mongo.collection.records["r1"] = records("r1")[0]
+    mongo.collection.rejected = {"r2"}
+    shipper.log_many(records("r1", "r2", "r3"))
+
+    shipper.flush()
+
+    assert sorted(mongo.collection.records) == ["r1", "r3"]
+    assert [record["_id"] for record in read_lines(shipper.dead_letter_path)] == ["r2"]
+    assert not shipper.spill_path.exists()
+
+
+def test_background_thread_ships_a_full_batch(mongo, shipper):
+    shipper.flush_interval = 60
+    shipper.start()
+    try:
+        shipper.log_many(records("r1", "r2"))
+        deadline: float = time.monotonic() + 5
+        while not mongo.collection.records and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert list(mongo.collection.records) == ["r1", "r2"]
+    finally:
+        shipper.stop()
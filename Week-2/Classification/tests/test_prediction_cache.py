@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import numpy as np
+
+from src.predict import make_prediction
+from src.prediction_cache import PredictionCache
+
+
+class CountingBatcher:
+    """Scores every row as Diabetic, counting the rows it was asked for."""
+
+    def __init__(self):
+        self.calls: int = 0
+
+    async def predict(self, model, features: list) -> np.ndarray:
+        self.calls += 1
+        return np.array([1])
+
+
+class RecordingShipper:
+    def __init__(self):
+        self.records: list[dict] = []
+
+    def log(self, record: dict) -> None:
+        self.records.append(record)
+
+
+def test_predictions_are_cached_per_model_and_features():
+    cache = PredictionCache(max_entries=10)
+    cache.put("LGBM", [1, 2], "a", cache.generation("LGBM"))
+
+    assert cache.get("LGBM", [1, 2]) == (True, "a")
+    assert cache.get("LGBM", [1, 3]) == (False, None)
+    assert cache.get("Decision Tree", [1, 2]) == (False, None)
+    stats: dict = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 1 / 3
+
+
+def test_least_recently_used_prediction_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    for features, value in [([1], "a"), ([2], "b")]:
+        cache.put("LGBM", features, value, 0)
+    cache.get("LGBM", [1])
+    cache.put("LGBM", [3], "c", 0)
+
+    assert [cache.get("LGBM", [value])[0] for value in [1, 2, 3]] == [
+        True,
+        False,
+        True,
+    ]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_reloaded_model_drops_its_predictions_and_late_puts():
+    cache = PredictionCache(max_entries=10)
+    cache.put("LGBM", [1], "old", 0)
+    cache.put("Decision Tree", [1], "tree", 0)
+    # Scored with the old model, finished after the reload.
+    generation: int = cache.generation("LGBM")
+
+    cache.invalidate("LGBM")
+    cache.put("LGBM", [2], "stale", generation)
+
+    assert cache.get("LGBM", [1]) == (False, None)
+    assert cache.get("LGBM", [2]) == (False, None)
+    assert cache.get("Decision Tree", [1]) == (True, "tree")
+    cache.put("LGBM", [2], "new", cache.generation("LGBM"))
+    assert cache.get("LGBM", [2]) == (True, "new")
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_zero_entries_disables_the_cache():
+    cache = PredictionCache(max_entries=0)
+    cache.put("LGBM", [1], "a", 0)
+
+    assert cache.get("LGBM", [1]) == (False, None)
+
+
+def test_repeated_request_is_served_from_the_cache_and_still_logged():
+    cache = PredictionCache(max_entries=10)
+    batcher, shipper = CountingBatcher(), RecordingShipper()
+    input_dict: dict = {"Pregnancies": 1, "Glucose": 148, "Age": 50}
+
+    async def predict() -> dict:
+        response = await make_prediction(
+            model=None,
+            input_dict=input_dict,
+            model_name="LGBM",
+            batcher=batcher,
+            shipper=shipper,
+            cache=cache,
+            generation=cache.generation("LGBM"),
+        )
+        return json.loads(response.body)["message"]
+
+    first, second = asyncio.run(predict()), asyncio.run(predict())
+
+    assert batcher.calls == 1
+    assert (first["served_from_cache"], second["served_from_cache"]) == (False, True)
+    assert first["output"] == second["output"] == "Diabetic"
+    assert [record["served_from_cache"] for record in shipper.records] == [
+        False,
+        True,
+    ]
@@ -0,0 +1,93 @@
+import os
+import pickle
+import time
+
+import pytest
+
+from src.load_model import MODEL_FILES
+from src.path import path
+from src.registry import ModelRegistry
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """Saves a plain dict as every model, under a temporary model folder."""
+    monkeypatch.setitem(path, "model_save_dir", tmp_path)
+    for model_name in MODEL_FILES:
+        save(model_name, {"name": model_name, "version": 1})
+    return tmp_path
+
+
+def save(model_name: str, model, content: bytes | None = None) -> None:
+    model_file = path["model_save_dir"] / MODEL_FILES[model_name]
+    model_file.write_bytes(pickle.dumps(model) if content is None else content)
+    # Files saved within the same clock tick would look unchanged.
+    modified: int = time.time_ns() + 1_000_000_000
+    os.utime(model_file, ns=(modified, modified))
+
+
+def test_models_are_loaded_once_and_shared(model_dir):
+    registry = ModelRegistry(preload=False, max_loaded=3)
+
+    assert registry.loaded("LGBM") is None
+    model = registry.get("LGBM")
+    assert model == {"name": "LGBM", "version": 1}
+    assert registry.get("LGBM") is model
+    assert registry.models() == {
+        "Logistic Regression": False,
+        "Decision Tree": False,
+        "LGBM": True,
+    }
+
+
+def test_least_recently_used_model_is_dropped(model_dir):
+    registry = ModelRegistry(preload=False, max_loaded=2)
+    dropped: list[str] = []
+    registry.subscribe(dropped.append)
+
+    registry.get("LGBM")
+    registry.get("Decision Tree")
+    registry.get("LGBM")
+    registry.get("Logistic Regression")
+
+    assert dropped == ["Decision Tree"]
+    assert [name for name, loaded in registry.models().items() if loaded] == [
+        "Logistic Regression",
+        "LGBM",
+    ]
+
+
+def test_changed_model_file_is_swapped_in(model_dir):
+    registry = ModelRegistry(preload=True, max_loaded=3, reload_interval=0.01)
+    reloaded: list[str] = []
+    registry.subscribe(reloaded.append)
+    registry.start()
+    try:
+        old_model = registry.loaded("LGBM")
+        save("LGBM", {"name": "LGBM", "version": 2})
+        deadline: float = time.monotonic() + 5
+        while registry.loaded("LGBM") is old_model and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        registry.stop()
+
+    assert registry.loaded("LGBM") == {"name": "LGBM", "version": 2}
+    assert old_model == {"name": "LGBM", "version": 1}
+    assert reloaded == ["LGBM"]
+
+
+def test_unreadable_model_file_keeps_the_loaded_model(model_dir):
+    registry = ModelRegistry(preload=False, max_loaded=3)
+    model = registry.get("LGBM")
+    save("LGBM", None, content=b"not a pickle")
+
+    assert registry.reload("LGBM") is False
+    assert registry.loaded("LGBM") is model
+
+
+def test_missing_model_file_loads_nothing(model_dir):
+    (model_dir / MODEL_FILES["Decision Tree"]).unlink()
+    registry = ModelRegistry(preload=False, max_loaded=3)
+
+    assert registry.get("Decision Tree") is None
+    assert registry.models()["Decision Tree"] is False